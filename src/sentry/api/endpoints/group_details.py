@@ -396,10 +396,15 @@ class GroupDetailsEndpoint(GroupEndpoint, EnvironmentMixin):
             eventstream_state = eventstream.start_delete_groups(group.project_id, [group.id])
             transaction_id = uuid4().hex
 
+            hashes = list(GroupHash.objects.filter(
+                project_id=group.project_id,
+                group__id=group.id,
+            ).values_list('hash', flat=True))
             GroupHash.objects.filter(
                 project_id=group.project_id,
                 group__id=group.id,
             ).delete()
+            GroupHash.clear_cache(group.project_id, hashes)
 
             delete_groups.apply_async(
                 kwargs={
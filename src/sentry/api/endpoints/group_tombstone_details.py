@@ -31,6 +31,10 @@ class GroupTombstoneDetailsEndpoint(ProjectEndpoint):
         except GroupTombstone.DoesNotExist:
             raise ResourceDoesNotExist
 
+        hashes = list(GroupHash.objects.filter(
+            project_id=project.id,
+            group_tombstone_id=tombstone_id,
+        ).values_list('hash', flat=True))
         GroupHash.objects.filter(
             project_id=project.id,
             group_tombstone_id=tombstone_id,
@@ -38,6 +42,7 @@ class GroupTombstoneDetailsEndpoint(ProjectEndpoint):
             # will allow new events to be captured
             group_tombstone_id=None,
         )
+        GroupHash.clear_cache(project.id, hashes)
 
         tombstone.delete()
 
@@ -516,12 +516,16 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint, EnvironmentMixin):
                     else:
                         groups_to_delete.append(group)
 
+                        hashes = list(GroupHash.objects.filter(
+                            group=group,
+                        ).values_list('hash', flat=True))
                         GroupHash.objects.filter(
                             group=group,
                         ).update(
                             group=None,
                             group_tombstone_id=tombstone.id,
                         )
+                        GroupHash.clear_cache(project.id, hashes)
 
             self._delete_groups(request, project, groups_to_delete, delete_type='discard')
 
@@ -1052,10 +1056,15 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint, EnvironmentMixin):
         eventstream_state = eventstream.start_delete_groups(project.id, group_ids)
         transaction_id = uuid4().hex
 
+        hashes = list(GroupHash.objects.filter(
+            project_id=project.id,
+            group__id__in=group_ids,
+        ).values_list('hash', flat=True))
         GroupHash.objects.filter(
             project_id=project.id,
             group__id__in=group_ids,
         ).delete()
+        GroupHash.clear_cache(project.id, hashes)
 
         delete_groups.apply_async(
             kwargs={
@@ -10,10 +10,15 @@ from __future__ import absolute_import
 import logging
 import six
 
+from collections import defaultdict
+from django.db import router, transaction
 from django.db.models import F
 
+from sentry.db.models.query import bulk_update_values
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
+from sentry.utils import metrics
+from sentry.utils.db import is_postgres
 from sentry.utils.services import Service
 
 
@@ -83,3 +88,91 @@ class Buffer(Service):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, model, batch):
+        """
+        Processes many pending increments for a single model at once.
+
+        ``batch`` is a sequence of ``(columns, filters, extra)`` tuples. Rows
+        which are addressed only by their primary key are applied with one
+        bulk ``UPDATE`` per distinct set of columns when running on
+        PostgreSQL; everything else (including rows which do not exist yet)
+        goes through ``process``.
+
+        The counters have usually been removed from the buffer already, so
+        a failing bulk update falls back to ``process`` for its rows, and a
+        failing row is logged without affecting the rest of the batch.
+        """
+        from sentry.models import Group
+
+        using = router.db_for_write(model)
+        pk_names = ('pk', model._meta.pk.name)
+
+        pending = []
+        grouped = defaultdict(list)
+        for columns, filters, extra in batch:
+            extra = extra or {}
+            if is_postgres(using) and len(filters) == 1 and list(filters)[0] in pk_names:
+                pk = list(filters.values())[0]
+                grouped[(tuple(sorted(columns)), tuple(sorted(extra)))].append(
+                    (getattr(pk, 'pk', pk), columns, extra),
+                )
+            else:
+                pending.append((columns, filters, extra))
+
+        for (increments, values), rows in six.iteritems(grouped):
+            expressions = None
+            # HACK(dcramer): see ``process`` for why score is computed here
+            if model is Group and 'last_seen' in values and 'times_seen' in increments:
+                expressions = {
+                    'score': 'log(t.times_seen + v.times_seen) * 600 + '
+                             'floor(extract(epoch from v.last_seen))',
+                }
+                values = tuple(c for c in values if c != 'score')
+
+            try:
+                with transaction.atomic(using=using):
+                    updated = bulk_update_values(
+                        model,
+                        rows,
+                        increments=increments,
+                        values=values,
+                        expressions=expressions,
+                        using=using,
+                    )
+            except Exception:
+                self.logger.exception('buffer.batch-failed', extra={
+                    'model': model.__name__,
+                    'size': len(rows),
+                })
+                updated = ()
+
+            for pk, columns, extra in rows:
+                filters = {model._meta.pk.name: pk}
+                if pk not in updated:
+                    pending.append((columns, filters, extra))
+                    continue
+
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        tags = {'model': model.__name__}
+        metrics.timing('buffer.batch-size', len(batch), tags=tags)
+        metrics.timing('buffer.batch-fallback-size', len(pending), tags=tags)
+
+        for columns, filters, extra in pending:
+            # Call the base implementation directly since subclasses may
+            # override ``process`` with a different signature.
+            try:
+                Buffer.process(self, model, columns, filters, extra)
+            except Exception:
+                self.logger.exception('buffer.batch-row-failed', extra={
+                    'model': model.__name__,
+                    'filters': filters,
+                })
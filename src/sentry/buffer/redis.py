@@ -9,6 +9,10 @@ from __future__ import absolute_import
 
 import six
 
+import atexit
+
+from collections import defaultdict
+from threading import Lock
 from time import time
 from binascii import crc32
 
@@ -22,9 +26,12 @@ from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import json, metrics
 from sentry.utils.compat import pickle
+from sentry.utils.dates import to_timestamp
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+drain = load_script('buffer/drain.lua')
 
 
 class PendingBuffer(object):
@@ -54,16 +61,94 @@ class PendingBuffer(object):
         return rv
 
 
+class LocalBuffer(object):
+    """
+    Coalesces increments for identical keys within a single process before
+    they are written to Redis. Counters are summed and extra values are last
+    write wins, matching the semantics of the Redis hash they end up in.
+    """
+
+    def __init__(self, size, interval):
+        assert size > 0
+        self.size = size
+        self.interval = interval
+        self.lock = Lock()
+        self.entries = {}
+        self.incr_count = 0
+        self.last_flush = time()
+
+    def add(self, key, model, columns, filters, extra=None):
+        """
+        Adds an increment to the buffer, returning whether the buffer should
+        be flushed.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = (model, dict(columns), filters, dict(extra or {}))
+            else:
+                entry_columns, entry_extra = entry[1], entry[3]
+                for column, amount in six.iteritems(columns):
+                    entry_columns[column] = entry_columns.get(column, 0) + amount
+                if extra:
+                    entry_extra.update(extra)
+            self.incr_count += 1
+            return len(self.entries) >= self.size or self.expired()
+
+    def expired(self):
+        return time() - self.last_flush >= self.interval
+
+    def flush(self):
+        """
+        Empties the buffer, returning the coalesced entries and the number of
+        increments they represent.
+        """
+        with self.lock:
+            entries, self.entries = self.entries, {}
+            incr_count, self.incr_count = self.incr_count, 0
+            self.last_flush = time()
+        return entries, incr_count
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = 'b:p'
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(self, pending_partitions=1, incr_batch_size=2, bulk_flush=False,
+                 bulk_batch_size=500, codec='json', local_buffer_size=0,
+                 local_buffer_interval=1, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_BUFFER_OPTIONS', options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        # When enabled, pending counters are drained and applied to the
+        # database in bulk directly from ``process_pending`` rather than
+        # being fanned out into individual ``process_incr`` tasks.
+        self.bulk_flush = bulk_flush
+        self.bulk_batch_size = bulk_batch_size
+        # The codec used to write filters and extra values. Both formats are
+        # always readable, ``pickle`` only exists to allow rolling back.
+        self.codec = codec
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.bulk_batch_size > 0
+        assert self.codec in ('json', 'pickle')
+
+        # When enabled, increments are coalesced in process (up to
+        # ``local_buffer_size`` distinct keys, for at most
+        # ``local_buffer_interval`` seconds) before being written to Redis.
+        if local_buffer_size > 0:
+            self.local_buffer = LocalBuffer(local_buffer_size, local_buffer_interval)
+            self.connect_signals()
+        else:
+            self.local_buffer = None
+
+    def connect_signals(self):
+        from celery.signals import task_postrun, worker_process_shutdown
+        from django.core.signals import request_finished
+        task_postrun.connect(self.maybe_flush_local_buffer, weak=False)
+        request_finished.connect(self.maybe_flush_local_buffer, weak=False)
+        worker_process_shutdown.connect(self.flush_local_buffer, weak=False)
+        atexit.register(self.flush_local_buffer)
 
     def validate(self):
         try:
@@ -119,15 +204,36 @@ class RedisBuffer(Buffer):
         return result
 
     def _dump_value(self, value):
-        if isinstance(value, six.string_types):
+        if value is None:
+            type_ = 'n'
+            value = ''
+        elif isinstance(value, bool):
+            type_ = 'b'
+            value = int(value)
+        elif isinstance(value, six.binary_type):
+            # Bytestrings are stored as text, the same way Django decodes
+            # them when they are used in a query.
+            type_ = 's'
+            value = value.decode('utf-8', 'replace')
+        elif isinstance(value, six.string_types):
             type_ = 's'
         elif isinstance(value, datetime):
             type_ = 'd'
-            value = value.strftime('%s.%f')
-        elif isinstance(value, int):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            value = '%.6f' % to_timestamp(value)
+        elif isinstance(value, models.Model):
+            type_ = 'i'
+            value = value.pk
+        elif isinstance(value, six.integer_types):
             type_ = 'i'
         elif isinstance(value, float):
             type_ = 'f'
+            value = repr(value)
+        elif isinstance(value, (dict, list)):
+            # JSON-compatible structures (e.g. ``Group.data``) are embedded
+            # as-is rather than being stringified a second time
+            return ('j', value)
         else:
             raise TypeError(type(value))
         return (type_, six.text_type(value))
@@ -143,16 +249,32 @@ class RedisBuffer(Buffer):
         if type_ == 's':
             return value
         elif type_ == 'd':
-            return datetime.fromtimestamp(float(value)).replace(
+            return datetime.utcfromtimestamp(float(value)).replace(
                 tzinfo=timezone.utc
             )
         elif type_ == 'i':
             return int(value)
         elif type_ == 'f':
             return float(value)
+        elif type_ == 'b':
+            return bool(int(value))
+        elif type_ == 'n':
+            return None
+        elif type_ == 'j':
+            return value
         else:
             raise TypeError('invalid type: {}'.format(type_))
 
+    def _dump_filters(self, filters):
+        if self.codec == 'pickle':
+            return pickle.dumps(filters)
+        return json.dumps(self._dump_values(filters))
+
+    def _dump_extra_value(self, value):
+        if self.codec == 'pickle':
+            return pickle.dumps(value)
+        return json.dumps(self._dump_value(value))
+
     def incr(self, model, columns, filters, extra=None):
         """
         Increment the key by doing the following:
@@ -161,37 +283,75 @@ class RedisBuffer(Buffer):
             - Perform an incrby on counters
             - Perform a set (last write wins) on extra
         - Add hashmap key to pending flushes
+
+        If the local buffer is enabled, the increment is coalesced in process
+        first and only written to Redis when the local buffer is flushed.
         """
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
         key = self._make_key(model, filters)
+        if self.local_buffer is not None:
+            if self.local_buffer.add(key, model, columns, filters, extra):
+                self.flush_local_buffer()
+            return
+
+        self._write_incrs({key: (model, columns, filters, extra)})
+
+    def maybe_flush_local_buffer(self, **kwargs):
+        # Ensure increments don't linger in the local buffer when the process
+        # doesn't see any further increments for a while.
+        if self.local_buffer.entries and self.local_buffer.expired():
+            self.flush_local_buffer()
+
+    def flush_local_buffer(self, **kwargs):
+        entries, incr_count = self.local_buffer.flush()
+        if not entries:
+            return
+
+        self._write_incrs(entries)
+
+        metrics.timing('buffer.local-flush.incrs', incr_count)
+        metrics.timing('buffer.local-flush.keys', len(entries))
+
+    def _write_incrs(self, entries):
+        """
+        Writes a mapping of ``{key: (model, columns, filters, extra)}`` to
+        Redis, using one pipeline per host.
+        """
+        router = self.cluster.get_router()
+        hosts = defaultdict(list)
+        for key in entries:
+            hosts[router.get_host_for_key(key)].append(key)
+
+        for host_id, keys in six.iteritems(hosts):
+            # We can't use conn.map() due to wanting to support multiple
+            # pending keys (one per Redis partition)
+            pipe = self.cluster.get_local_client(host_id).pipeline()
+            for key in keys:
+                self._queue_incr(pipe, key, *entries[key])
+            pipe.execute()
+
+    def _queue_incr(self, pipe, key, model, columns, filters, extra=None):
         pending_key = self._make_pending_key_from_key(key)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis partition)
-        conn = self.cluster.get_local_client_for_key(key)
 
-        pipe = conn.pipeline()
+        encoded_filters = self._dump_filters(filters)
+        payload_size = len(encoded_filters)
+
         pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
-        # TODO(dcramer): once this goes live in production, we can kill the pickle path
-        # (this is to ensure a zero downtime deploy where we can transition event processing)
-        pipe.hsetnx(key, 'f', pickle.dumps(filters))
-        # pipe.hsetnx(key, 'f', json.dumps(self._dump_values(filters)))
+        pipe.hsetnx(key, 'f', encoded_filters)
         for column, amount in six.iteritems(columns):
             pipe.hincrby(key, 'i+' + column, amount)
 
         if extra:
-            # Group tries to serialize 'score', so we'd need some kind of processing
-            # hook here
-            # e.g. "update score if last_seen or times_seen is changed"
             for column, value in six.iteritems(extra):
-                # TODO(dcramer): once this goes live in production, we can kill the pickle path
-                # (this is to ensure a zero downtime deploy where we can transition event processing)
-                pipe.hset(key, 'e+' + column, pickle.dumps(value))
-                # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
+                encoded_value = self._dump_extra_value(value)
+                payload_size += len(encoded_value)
+                pipe.hset(key, 'e+' + column, encoded_value)
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, time(), key)
-        pipe.execute()
 
+        metrics.timing('buffer.incr.payload-size', payload_size, tags={
+            'codec': self.codec,
+            'model': model.__name__,
+        })
         metrics.incr('buffer.incr', skip_internal=True, tags={
             'module': model.__module__,
             'model': model.__name__,
@@ -214,38 +374,94 @@ class RedisBuffer(Buffer):
         if not client.set(lock_key, '1', nx=True, ex=60):
             return
 
-        pending_buffer = PendingBuffer(self.incr_batch_size)
-
         try:
-            keycount = 0
-            with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
-
-            with self.cluster.all() as conn:
-                for host_id, keys in six.iteritems(results.value):
-                    if not keys:
-                        continue
-                    keycount += len(keys)
-                    for key in keys:
-                        pending_buffer.append(key)
-                        if pending_buffer.full():
-                            process_incr.apply_async(
-                                kwargs={
-                                    'batch_keys': pending_buffer.flush(),
-                                }
-                            )
-                    conn.target([host_id]).zrem(pending_key, *keys)
-
-            # queue up remainder of pending keys
-            if not pending_buffer.empty():
-                process_incr.apply_async(kwargs={
-                    'batch_keys': pending_buffer.flush(),
-                })
-
-            metrics.timing('buffer.pending-size', keycount)
+            if self.bulk_flush:
+                self._process_pending_bulk(pending_key)
+            else:
+                self._process_pending_batches(pending_key)
         finally:
             client.delete(lock_key)
 
+    def _process_pending_batches(self, pending_key):
+        pending_buffer = PendingBuffer(self.incr_batch_size)
+
+        keycount = 0
+        with self.cluster.all() as conn:
+            results = conn.zrange(pending_key, 0, -1)
+
+        with self.cluster.all() as conn:
+            for host_id, keys in six.iteritems(results.value):
+                if not keys:
+                    continue
+                keycount += len(keys)
+                for key in keys:
+                    pending_buffer.append(key)
+                    if pending_buffer.full():
+                        process_incr.apply_async(
+                            kwargs={
+                                'batch_keys': pending_buffer.flush(),
+                            }
+                        )
+                conn.target([host_id]).zrem(pending_key, *keys)
+
+        # queue up remainder of pending keys
+        if not pending_buffer.empty():
+            process_incr.apply_async(kwargs={
+                'batch_keys': pending_buffer.flush(),
+            })
+
+        metrics.timing('buffer.pending-size', keycount)
+
+    def _process_pending_bulk(self, pending_key):
+        keycount = 0
+        with self.cluster.all() as conn:
+            results = conn.zrange(pending_key, 0, -1)
+
+        for host_id, keys in six.iteritems(results.value):
+            if not keys:
+                continue
+            keycount += len(keys)
+            # Counter keys are always registered in the pending set that
+            # lives on the same host, so they can be drained together.
+            conn = self.cluster.get_local_client(host_id)
+            for i in range(0, len(keys), self.bulk_batch_size):
+                chunk = keys[i:i + self.bulk_batch_size]
+                with metrics.timer('buffer.bulk-flush.drain'):
+                    payloads = drain(conn, [pending_key] + chunk, [])
+                self._process_payloads(zip(chunk, payloads))
+
+        metrics.timing('buffer.pending-size', keycount)
+
+    def _process_payloads(self, payloads):
+        batches = defaultdict(list)
+        for key, payload in payloads:
+            if not payload:
+                metrics.incr('buffer.revoked', tags={'reason': 'empty'}, skip_internal=False)
+                self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+                continue
+
+            values = dict(zip(payload[::2], payload[1::2]))
+            try:
+                model, incr_values, filters, extra_values = self._load_payload(values)
+            except Exception:
+                metrics.incr('buffer.revoked', tags={'reason': 'invalid'}, skip_internal=False)
+                self.logger.exception('buffer.revoked.invalid', extra={'redis_key': key})
+                continue
+            batches[model].append((incr_values, filters, extra_values))
+
+        for model, batch in six.iteritems(batches):
+            # The counters have already been removed from Redis at this
+            # point, so make sure one failing model doesn't prevent the
+            # remaining ones from being written.
+            try:
+                with metrics.timer('buffer.bulk-flush.process', tags={'model': model.__name__}):
+                    self.process_batch(model, batch)
+            except Exception:
+                self.logger.exception('buffer.bulk-flush.failed', extra={
+                    'model': model.__name__,
+                    'size': len(batch),
+                })
+
     def process(self, key=None, batch_keys=None):
         assert not (key is None and batch_keys is None)
         assert not (key is not None and batch_keys is not None)
@@ -256,6 +472,29 @@ class RedisBuffer(Buffer):
         for key in batch_keys:
             self._process_single_incr(key)
 
+    def _load_payload(self, values):
+        values = values.copy()
+        model = import_string(values.pop('m'))
+        if values['f'].startswith('{'):
+            filters = self._load_values(json.loads(values.pop('f')))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop('f'))
+
+        incr_values = {}
+        extra_values = {}
+        for k, v in six.iteritems(values):
+            if k.startswith('i+'):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith('e+'):
+                if v.startswith('['):
+                    extra_values[k[2:]] = self._load_value(json.loads(v))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+
+        return model, incr_values, filters, extra_values
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -281,25 +520,7 @@ class RedisBuffer(Buffer):
                 self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
                 return
 
-            model = import_string(values.pop('m'))
-            if values['f'].startswith('{'):
-                filters = self._load_values(json.loads(values.pop('f')))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop('f'))
-
-            incr_values = {}
-            extra_values = {}
-            for k, v in six.iteritems(values):
-                if k.startswith('i+'):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith('e+'):
-                    if v.startswith('['):
-                        extra_values[k[2:]] = self._load_value(json.loads(v))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-
+            model, incr_values, filters, extra_values = self._load_payload(values)
             super(RedisBuffer, self).process(model, incr_values, filters, extra_values)
         finally:
             client.delete(lock_key)
@@ -36,3 +36,19 @@ class BaseCache(local):
 
     def get(self, key, version=None, raw=False):
         raise NotImplementedError
+
+    def get_many(self, keys, version=None, raw=False):
+        """
+        Fetch multiple keys at once, returning a mapping of the keys that
+        were found to their values.
+        """
+        results = {}
+        for key in keys:
+            value = self.get(key, version=version, raw=raw)
+            if value is not None:
+                results[key] = value
+        return results
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
@@ -56,6 +56,24 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def get_many(self, keys, version=None, raw=False):
+        with self.client.map() as client:
+            promises = [
+                (key, client.get(self.make_key(key, version=version)))
+                for key in keys
+            ]
+
+        results = {}
+        for key, promise in promises:
+            if promise.value is not None:
+                results[key] = promise.value if raw else json.loads(promise.value)
+        return results
+
+    def delete_many(self, keys, version=None):
+        with self.client.map() as client:
+            for key in keys:
+                client.delete(self.make_key(key, version=version))
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
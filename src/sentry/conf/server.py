@@ -446,7 +446,8 @@ CELERY_IMPORTS = (
     'sentry.tasks.digests', 'sentry.tasks.email', 'sentry.tasks.merge',
     'sentry.tasks.options', 'sentry.tasks.ping', 'sentry.tasks.post_process',
     'sentry.tasks.process_buffer', 'sentry.tasks.reports', 'sentry.tasks.reprocessing',
-    'sentry.tasks.scheduler', 'sentry.tasks.signals', 'sentry.tasks.store', 'sentry.tasks.unmerge',
+    'sentry.tasks.scheduler', 'sentry.tasks.signals', 'sentry.tasks.similarity',
+    'sentry.tasks.store', 'sentry.tasks.unmerge',
     'sentry.tasks.symcache_update', 'sentry.tasks.servicehooks',
     'sentry.tagstore.tasks', 'sentry.tasks.assemble', 'sentry.tasks.integrations',
     'sentry.tasks.files', 'sentry.tasks.app_platform',
@@ -480,6 +481,7 @@ CELERY_QUEUES = [
     Queue('reports.deliver', routing_key='reports.deliver'),
     Queue('reports.prepare', routing_key='reports.prepare'),
     Queue('search', routing_key='search'),
+    Queue('similarity', routing_key='similarity'),
     Queue('stats', routing_key='stats'),
     Queue('unmerge', routing_key='unmerge'),
     Queue('update', routing_key='update'),
@@ -1084,6 +1086,9 @@ SENTRY_MAX_EXTRA_VARIABLE_SIZE = 4096 * 4  # 16kb
 # For changing the amount of data seen in Http Response Body part.
 SENTRY_MAX_HTTP_BODY_SIZE = 4096 * 4  # 16kb
 
+# Reject events whose (decompressed) request body exceeds this size in bytes
+SENTRY_MAX_EVENT_SIZE = 1024 * 1024 * 20  # 20mb
+
 # For various attributes we don't limit the entire attribute on size, but the
 # individual item. In those cases we also want to limit the maximum number of
 # keys
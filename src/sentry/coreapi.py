@@ -17,21 +17,20 @@ import re
 import six
 import zlib
 
+from django.conf import settings
 from django.core.exceptions import SuspiciousOperation
 from django.utils.crypto import constant_time_compare
-from gzip import GzipFile
-from six import BytesIO
 from time import time
 
+from sentry import options
 from sentry.attachments import attachment_cache
 from sentry.cache import default_cache
 from sentry.models import ProjectKey
 from sentry.tasks.store import preprocess_event, \
     preprocess_event_from_reprocessing
-from sentry.utils import json
+from sentry.utils import json, metrics
 from sentry.utils.auth import parse_auth_header
 from sentry.utils.http import origin_from_request
-from sentry.utils.strings import decompress
 from sentry.utils.sdk import configure_scope
 from sentry.utils.canonical import CANONICAL_TYPES
 
@@ -39,6 +38,9 @@ from sentry.utils.canonical import CANONICAL_TYPES
 _dist_re = re.compile(r'^[a-zA-Z0-9_.-]+$')
 logger = logging.getLogger("sentry.api")
 
+# Compressed request bodies are inflated in chunks of this many bytes.
+INFLATE_CHUNK_SIZE = 64 * 1024
+
 
 class APIError(Exception):
     http_status = 400
@@ -64,6 +66,11 @@ class APIForbidden(APIError):
     http_status = 403
 
 
+class APIPayloadTooLarge(APIError):
+    http_status = 413
+    msg = 'Event payload exceeds the maximum size'
+
+
 class APIRateLimited(APIError):
     http_status = 429
     msg = 'Creation of this event was denied due to rate limiting'
@@ -159,7 +166,7 @@ class ClientApiHelper(object):
             data['sdk'].pop('client_ip', None)
 
     def insert_data_to_database(self, data, start_time=None,
-                                from_reprocessing=False, attachments=None):
+                                from_reprocessing=False, attachments=None, data_size=None):
         if start_time is None:
             start_time = time()
 
@@ -167,6 +174,22 @@ class ClientApiHelper(object):
         if isinstance(data, CANONICAL_TYPES):
             data = dict(data.items())
 
+        task = from_reprocessing and \
+            preprocess_event_from_reprocessing or preprocess_event
+
+        # Small events without attachments are passed to the task inline.
+        # They are only stored in the cache if they need processing, which
+        # saves the cache round trips for all other events. The size is that
+        # of the received payload (``data_size``), since serializing the event
+        # again just to measure it would cost more than the cache write saves,
+        # so events of unknown size always go through the cache.
+        inline_max_size = options.get('store.inline-event-max-size')
+        if inline_max_size and data_size is not None and not attachments and \
+                data_size <= inline_max_size:
+            metrics.incr('events.inline', skip_internal=False)
+            task.delay(data=data, start_time=start_time, event_id=data['event_id'])
+            return
+
         cache_timeout = 3600
         cache_key = cache_key_for_event(data)
         default_cache.set(cache_key, data, cache_timeout)
@@ -177,8 +200,6 @@ class ClientApiHelper(object):
         if attachments is not None:
             attachment_cache.set(cache_key, attachments, cache_timeout)
 
-        task = from_reprocessing and \
-            preprocess_event_from_reprocessing or preprocess_event
         task.delay(cache_key=cache_key, start_time=start_time,
                    event_id=data['event_id'])
 
@@ -278,9 +299,47 @@ def cache_key_for_event(data):
     return u'e:{1}:{0}'.format(data['project'], data['event_id'])
 
 
+def _check_size(size):
+    if size > settings.SENTRY_MAX_EVENT_SIZE:
+        raise APIPayloadTooLarge()
+
+
+def inflate(encoded_data, wbits=zlib.MAX_WBITS):
+    """
+    Decompresses ``encoded_data`` in chunks of ``INFLATE_CHUNK_SIZE`` bytes.
+    Raises ``APIPayloadTooLarge`` as soon as the output exceeds
+    ``SENTRY_MAX_EVENT_SIZE``, so the whole payload is never inflated into
+    memory. Concatenated gzip members are supported like in ``GzipFile``.
+    """
+    chunks = []
+    size = 0
+    while encoded_data:
+        decompressor = zlib.decompressobj(wbits)
+        while encoded_data:
+            chunks.append(decompressor.decompress(encoded_data, INFLATE_CHUNK_SIZE))
+            size += len(chunks[-1])
+            _check_size(size)
+            if decompressor.unused_data:
+                # The stream ended, and whatever follows it is left in
+                # ``unused_data`` (but also in ``unconsumed_tail``).
+                break
+            encoded_data = decompressor.unconsumed_tail
+        else:
+            # The input is used up, but some output may still be pending.
+            chunks.append(decompressor.flush())
+            size += len(chunks[-1])
+            _check_size(size)
+        # Trailing data after a zlib stream is ignored like in
+        # ``zlib.decompress``, only gzip can have multiple members.
+        encoded_data = decompressor.unused_data if wbits & 16 else None
+    return b''.join(chunks)
+
+
 def decompress_deflate(encoded_data):
     try:
-        return zlib.decompress(encoded_data).decode("utf-8")
+        return inflate(encoded_data).decode("utf-8")
+    except APIError:
+        raise
     except Exception as e:
         # This error should be caught as it suggests that there's a
         # bug somewhere in the client's code.
@@ -290,12 +349,9 @@ def decompress_deflate(encoded_data):
 
 def decompress_gzip(encoded_data):
     try:
-        fp = BytesIO(encoded_data)
-        try:
-            f = GzipFile(fileobj=fp)
-            return f.read().decode("utf-8")
-        finally:
-            f.close()
+        return inflate(encoded_data, 16 + zlib.MAX_WBITS).decode("utf-8")
+    except APIError:
+        raise
     except Exception as e:
         # This error should be caught as it suggests that there's a
         # bug somewhere in the client's code.
@@ -305,10 +361,14 @@ def decompress_gzip(encoded_data):
 
 def decode_and_decompress_data(encoded_data):
     try:
+        encoded_data = base64.b64decode(encoded_data)
         try:
-            return decompress(encoded_data).decode("utf-8")
+            return inflate(encoded_data).decode("utf-8")
         except zlib.error:
-            return base64.b64decode(encoded_data).decode("utf-8")
+            _check_size(len(encoded_data))
+            return encoded_data.decode("utf-8")
+    except APIError:
+        raise
     except Exception as e:
         # This error should be caught as it suggests that there's a
         # bug somewhere in the client's code.
@@ -317,6 +377,7 @@ def decode_and_decompress_data(encoded_data):
 
 
 def decode_data(encoded_data):
+    _check_size(len(encoded_data))
     try:
         return encoded_data.decode("utf-8")
     except UnicodeDecodeError as e:
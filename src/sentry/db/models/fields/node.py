@@ -27,7 +27,7 @@ from sentry.utils.canonical import CANONICAL_TYPES, CanonicalKeyDict
 
 from .gzippeddict import GzippedDictField
 
-__all__ = ('NodeField', )
+__all__ = ('NodeField', 'save_node_data_multi')
 
 logger = logging.getLogger('sentry')
 
@@ -57,6 +57,8 @@ class NodeData(collections.MutableMapping):
         # (this does not mean the Event is mutable, it just removes ref checking
         #  in the case of something changing on the data model)
         self.ref_version = None
+        # set when the data was written ahead by ``save_node_data_multi``
+        self.saved = False
         self._node_data = data
 
     def __getstate__(self):
@@ -147,23 +149,50 @@ class NodeData(collections.MutableMapping):
             self.data['_ref'] = ref
             self.data['_ref_version'] = self.field.ref_version
 
-    def save(self):
+    def get_write_data(self):
         """
-        Write current data back to nodestore.
+        Get the data to write to nodestore, or ``None`` if there is nothing
+        to write.
         """
 
         # We never loaded any data for reading or writing, so there
         # is nothing to save.
         if self._node_data is None:
-            return
+            return None
 
         # We can't put our wrappers into the nodestore, so we need to
         # ensure that the data is converted into a plain old dict
         to_write = self._node_data
         if isinstance(to_write, CANONICAL_TYPES):
             to_write = dict(to_write.items())
+        return to_write
+
+    def save(self):
+        """
+        Write current data back to nodestore.
+        """
+        to_write = self.get_write_data()
+        if to_write is not None:
+            nodestore.set(self.id, to_write)
 
-        nodestore.set(self.id, to_write)
+
+def save_node_data_multi(nodes):
+    """
+    Write the data of several nodes to nodestore at once. The nodes are not
+    written again when the models that hold them are saved next.
+    """
+    values = {}
+    for node in nodes:
+        to_write = node.get_write_data()
+        if to_write is None:
+            continue
+        if node.id is None:
+            node.id = node.field.id_func()
+        values[node.id] = to_write
+        node.saved = True
+
+    if values:
+        nodestore.set_multi(values)
 
 
 class NodeField(GzippedDictField):
@@ -242,7 +271,10 @@ class NodeField(GzippedDictField):
         if value.id is None:
             value.id = self.id_func()
 
-        value.save()
+        if getattr(value, 'saved', False):
+            value.saved = False
+        else:
+            value.save()
         return compress(pickle.dumps({'node_id': value.id}))
 
 
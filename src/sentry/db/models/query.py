@@ -11,14 +11,14 @@ from __future__ import absolute_import
 import itertools
 import six
 
-from django.db import IntegrityError, router, transaction
+from django.db import IntegrityError, connections, router, transaction
 from django.db.models import Model, Q
 from django.db.models.signals import post_save
 from six.moves import reduce
 
 from .utils import ExpressionNode, resolve_expression_node
 
-__all__ = ('update', 'create_or_update')
+__all__ = ('update', 'create_or_update', 'bulk_update_values')
 
 
 def update(self, using=None, **kwargs):
@@ -100,6 +100,93 @@ def create_or_update(model, using=None, **kwargs):
     return affected, False
 
 
+def _cast_type(field, connection):
+    # Postgres emits inline CHECK constraints as part of some column types
+    # (e.g. positive integers) which aren't valid in a cast expression.
+    return field.db_type(connection).split(' CHECK', 1)[0]
+
+
+def bulk_update_values(model, rows, increments=(), values=(), expressions=None, using=None):
+    """
+    Applies many primary key addressed updates to ``model`` as a single
+    ``UPDATE ... FROM (VALUES ...)`` statement. This is only supported on
+    PostgreSQL.
+
+    Each row is a tuple of ``(pk, {column: delta}, {column: value})``, where
+    every row must provide the same ``increments`` and ``values`` columns.
+    ``expressions`` optionally maps additional columns to raw SQL which may
+    refer to the current row as ``t`` and the supplied row as ``v``.
+
+    Returns the set of primary keys that matched an existing row.
+
+    >>> bulk_update_values(Group, [
+    >>>     (1, {'times_seen': 2}, {'last_seen': now}),
+    >>>     (2, {'times_seen': 1}, {'last_seen': now}),
+    >>> ], increments=('times_seen',), values=('last_seen',))
+    """
+    if not rows:
+        return set()
+
+    if not using:
+        using = router.db_for_write(model)
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+
+    increment_fields = [opts.get_field(c) for c in increments]
+    value_fields = [opts.get_field(c) for c in values]
+
+    row_sql = '(%s)' % ', '.join(
+        ['%s::bigint'] +
+        ['%s::bigint'] * len(increment_fields) +
+        ['%%s::%s' % _cast_type(f, connection) for f in value_fields]
+    )
+
+    params = []
+    for pk, row_increments, row_values in rows:
+        params.append(int(pk))
+        for field in increment_fields:
+            params.append(int(row_increments[field.name]))
+        for field in value_fields:
+            params.append(field.get_db_prep_save(row_values[field.name], connection))
+
+    assignments = [
+        '%s = COALESCE(t.%s, 0) + v.%s' % (qn(f.column), qn(f.column), qn(f.column))
+        for f in increment_fields
+    ] + [
+        '%s = v.%s' % (qn(f.column), qn(f.column))
+        for f in value_fields
+    ] + [
+        '%s = %s' % (qn(opts.get_field(c).column), sql)
+        for c, sql in six.iteritems(expressions or {})
+    ]
+
+    pk_column = qn(opts.pk.column)
+    sql = """
+        UPDATE %(table)s AS t
+           SET %(assignments)s
+          FROM (VALUES %(rows)s) AS v (%(columns)s)
+         WHERE t.%(pk)s = v.%(pk)s
+     RETURNING t.%(pk)s
+    """ % {
+        'table': qn(opts.db_table),
+        'assignments': ', '.join(assignments),
+        'rows': ', '.join([row_sql] * len(rows)),
+        'columns': ', '.join(
+            [pk_column] + [qn(f.column) for f in increment_fields + value_fields]
+        ),
+        'pk': pk_column,
+    }
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return set(r[0] for r in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
 def in_iexact(column, values):
     from operator import or_
 
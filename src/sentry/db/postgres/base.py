@@ -13,6 +13,7 @@ from .decorators import (
 )
 from .operations import DatabaseOperations
 
+from sentry.utils.db import query_counter
 from sentry.utils.strings import strip_lone_surrogates
 
 __all__ = ('DatabaseWrapper', )
@@ -70,6 +71,7 @@ class CursorWrapper(object):
     @auto_reconnect_cursor
     @less_shitty_error_messages
     def execute(self, sql, params=None):
+        query_counter.count += 1
         if params is not None:
             return self.cursor.execute(sql, clean_bad_params(params))
         return self.cursor.execute(sql)
@@ -78,6 +80,7 @@ class CursorWrapper(object):
     @auto_reconnect_cursor
     @less_shitty_error_messages
     def executemany(self, sql, paramlist=()):
+        query_counter.count += 1
         return self.cursor.executemany(sql, paramlist)
 
 
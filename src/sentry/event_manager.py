@@ -11,6 +11,7 @@ import os
 import six
 import jsonschema
 
+from collections import defaultdict
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.db import connection, IntegrityError, router, transaction
@@ -31,6 +32,7 @@ from sentry.coreapi import (
     decode_data,
     safely_load_json_string,
 )
+from sentry.db.models.fields.node import save_node_data_multi
 from sentry.interfaces.base import get_interface, prune_empty_keys
 from sentry.interfaces.exception import normalize_mechanism_meta
 from sentry.interfaces.schemas import validate_and_default_interface
@@ -347,6 +349,11 @@ def add_meta_errors(errors, meta):
 
 
 def _decode_event(data, content_encoding):
+    """
+    Return the decoded event and the length of its JSON payload, which is
+    ``None`` if the event was not passed as JSON.
+    """
+    size = None
     if isinstance(data, six.binary_type):
         if content_encoding == 'gzip':
             data = decompress_gzip(data)
@@ -357,9 +364,10 @@ def _decode_event(data, content_encoding):
         else:
             data = decode_data(data)
     if isinstance(data, six.text_type):
+        size = len(data)
         data = safely_load_json_string(data)
 
-    return CanonicalKeyDict(data)
+    return CanonicalKeyDict(data), size
 
 
 class EventManager(object):
@@ -380,7 +388,7 @@ class EventManager(object):
         content_encoding=None,
         for_store=True,
     ):
-        self._data = _decode_event(data, content_encoding=content_encoding)
+        self._data, self._data_size = _decode_event(data, content_encoding=content_encoding)
         self.version = version
         self._project = project
         self._client_ip = client_ip
@@ -728,6 +736,14 @@ class EventManager(object):
     def get_data(self):
         return self._data
 
+    def get_data_size(self):
+        """
+        Return the size of the event as it was received, or ``None`` if it
+        was not received as JSON. Normalization can change the size of the
+        event, so this is only an estimate of the size of its current data.
+        """
+        return self._data_size
+
     def _get_event_instance(self, project_id=None):
         data = self._data
         event_id = data.get('event_id')
@@ -792,17 +808,104 @@ class EventManager(object):
         return trim(message.strip(), settings.SENTRY_MAX_MESSAGE_LENGTH)
 
     def save(self, project_id, raw=False, assume_normalized=False):
+        project = Project.objects.get_from_cache(id=project_id)
+
+        event, job = self.prepare_save(project, raw=raw, assume_normalized=assume_normalized)
+        if job is None:
+            return event
+
+        # save the event unless its been sampled
+        if not job['is_sample']:
+            try:
+                with transaction.atomic(using=router.db_for_write(Event)):
+                    event.save()
+            except IntegrityError:
+                self._log_duplicate(event, Event)
+                return event
+
+        self.finish_save(job)
+        return event
+
+    @classmethod
+    def save_prepared(cls, jobs):
+        """
+        Writes the ``Event`` rows and nodestore payloads of several prepared
+        events at once and finishes saving them. Returns the events that
+        were saved, leaving out duplicates.
+        """
+        jobs = [job for job in jobs if job is not None]
+        events = [job['event'] for job in jobs if not job['is_sample']]
+
+        if events:
+            save_node_data_multi([event.data for event in events])
+
+            try:
+                with transaction.atomic(using=router.db_for_write(Event)):
+                    Event.objects.bulk_create(events)
+            except IntegrityError:
+                # A duplicate fails the whole insert, so the rows are written
+                # one by one to skip just the duplicates.
+                duplicates = set()
+                for event in events:
+                    try:
+                        with transaction.atomic(using=router.db_for_write(Event)):
+                            event.save()
+                    except IntegrityError:
+                        cls._log_duplicate(event, Event)
+                        duplicates.add(event.event_id)
+                jobs = [
+                    job for job in jobs
+                    if job['is_sample'] or job['event'].event_id not in duplicates
+                ]
+            else:
+                # Rows created with ``bulk_create`` don't get their ids back.
+                event_ids = defaultdict(dict)
+                for event in events:
+                    event_ids[event.project_id][event.event_id] = event
+                for project_id, project_events in six.iteritems(event_ids):
+                    ids = Event.objects.filter(
+                        project_id=project_id,
+                        event_id__in=list(project_events),
+                    ).values_list('event_id', 'id')
+                    for event_id, id in ids:
+                        project_events[event_id].id = id
+
+        for job in jobs:
+            job['manager'].finish_save(job)
+
+        return [job['event'] for job in jobs]
+
+    @staticmethod
+    def _log_duplicate(event, model):
+        logger.info(
+            'duplicate.found',
+            exc_info=True,
+            extra={
+                'event_uuid': event.event_id,
+                'project_id': event.project_id,
+                'group_id': event.group_id,
+                'model': model.__name__,
+            }
+        )
+
+    def prepare_save(self, project, raw=False, assume_normalized=False, releases=None):
+        """
+        Runs the part of ``save`` that comes before the ``Event`` row is
+        written, which groups the event and updates the aggregates.
+
+        Returns the event and a job that ``finish_save`` completes once the
+        row was written, or ``None`` in place of the job when the event turned
+        out to be a duplicate. ``releases`` can be shared between calls to
+        look up each release version only once.
+        """
         # Normalize if needed
         if not self._normalized:
             if not assume_normalized:
                 self.normalize()
             self._normalized = True
 
-        from sentry.tasks.post_process import index_event_tags
-
         data = self._data
-
-        project = Project.objects.get_from_cache(id=project_id)
+        project_id = project.id
 
         # Check to make sure we're not about to do a bunch of work that's
         # already been done if we've processed an event with this ID. (This
@@ -826,7 +929,7 @@ class EventManager(object):
                     'model': Event.__name__,
                 }
             )
-            return event
+            return event, None
 
         # Pull out the culprit
         culprit = self.get_culprit()
@@ -880,11 +983,15 @@ class EventManager(object):
             # dont allow a conflicting 'release' tag
             if 'release' in tags:
                 del tags['release']
-            release = Release.get_or_create(
-                project=project,
-                version=release,
-                date_added=date,
-            )
+            if releases is None:
+                releases = {}
+            if (project.id, release) not in releases:
+                releases[(project.id, release)] = Release.get_or_create(
+                    project=project,
+                    version=release,
+                    date_added=date,
+                )
+            release = releases[(project.id, release)]
 
             tags['sentry:release'] = release.version
 
@@ -1014,7 +1121,7 @@ class EventManager(object):
                         'model': EventMapping.__name__,
                     }
                 )
-                return event
+                return event, None
 
         environment = Environment.get_or_create(
             project=project,
@@ -1098,24 +1205,44 @@ class EventManager(object):
             environment=environment,
         )
 
-        # save the event unless its been sampled
-        if not is_sample:
-            try:
-                with transaction.atomic(using=router.db_for_write(Event)):
-                    event.save()
-            except IntegrityError:
-                logger.info(
-                    'duplicate.found',
-                    exc_info=True,
-                    extra={
-                        'event_uuid': event_id,
-                        'project_id': project.id,
-                        'group_id': group.id,
-                        'model': Event.__name__,
-                    }
-                )
-                return event
+        return event, {
+            'manager': self,
+            'event': event,
+            'project': project,
+            'group': group,
+            'environment': environment,
+            'release': release,
+            'event_user': event_user,
+            'tags': tags,
+            'hashes': hashes,
+            'raw': raw,
+            'is_new': is_new,
+            'is_sample': is_sample,
+            'is_regression': is_regression,
+            'is_new_group_environment': is_new_group_environment,
+            'received_timestamp': received_timestamp,
+            'recorded_timestamp': recorded_timestamp,
+        }
 
+    def finish_save(self, job):
+        """
+        Runs the part of ``save`` that needs the ``Event`` row to be written,
+        for a job returned by ``prepare_save``.
+        """
+        from sentry.tasks.post_process import index_event_tags
+
+        event = job['event']
+        project = job['project']
+        group = job['group']
+        environment = job['environment']
+        release = job['release']
+        event_user = job['event_user']
+        tags = job['tags']
+        is_new = job['is_new']
+        is_new_group_environment = job['is_new_group_environment']
+        raw = job['raw']
+
+        if not job['is_sample']:
             index_event_tags.delay(
                 organization_id=project.organization_id,
                 project_id=project.id,
@@ -1156,17 +1283,17 @@ class EventManager(object):
 
         if not raw:
             if not project.first_event:
-                project.update(first_event=date)
+                project.update(first_event=event.datetime)
                 first_event_received.send_robust(project=project, group=group, sender=Project)
 
         eventstream.insert(
             group=group,
             event=event,
             is_new=is_new,
-            is_sample=is_sample,
-            is_regression=is_regression,
+            is_sample=job['is_sample'],
+            is_regression=job['is_regression'],
             is_new_group_environment=is_new_group_environment,
-            primary_hash=hashes[0],
+            primary_hash=job['hashes'][0],
             # We are choosing to skip consuming the event back
             # in the eventstream if it's flagged as raw.
             # This means that we want to publish the event
@@ -1177,14 +1304,12 @@ class EventManager(object):
 
         metrics.timing(
             'events.latency',
-            received_timestamp - recorded_timestamp,
+            job['received_timestamp'] - job['recorded_timestamp'],
             tags={
                 'project_id': project.id,
             },
         )
 
-        return event
-
     def _get_event_user(self, project, data):
         user_data = data.get('user')
         if not user_data:
@@ -1230,13 +1355,15 @@ class EventManager(object):
         return euser
 
     def _find_hashes(self, project, hash_list):
-        return map(
-            lambda hash: GroupHash.objects.get_or_create(
-                project=project,
-                hash=hash,
-            )[0],
-            hash_list,
-        )
+        return GroupHash.get_or_create_many(project, hash_list)
+
+    def _find_existing_group_id(self, hashes):
+        for h in hashes:
+            if h.group_id is not None:
+                return h.group_id
+            if h.group_tombstone_id is not None:
+                raise HashDiscarded('Matches group tombstone %s' % h.group_tombstone_id)
+        return None
 
     def _save_aggregate(self, event, hashes, release, **kwargs):
         project = event.project
@@ -1244,13 +1371,19 @@ class EventManager(object):
         # attempt to find a matching hash
         all_hashes = self._find_hashes(project, hashes)
 
-        existing_group_id = None
-        for h in all_hashes:
-            if h.group_id is not None:
-                existing_group_id = h.group_id
-                break
-            if h.group_tombstone_id is not None:
-                raise HashDiscarded('Matches group tombstone %s' % h.group_tombstone_id)
+        existing_group_id = self._find_existing_group_id(all_hashes)
+
+        if existing_group_id is not None:
+            try:
+                group = Group.objects.get(id=existing_group_id)
+            except Group.DoesNotExist:
+                # The cached hashes may still refer to a group that has been
+                # deleted since, so resolve them from the database once more.
+                GroupHash.clear_cache(project.id, hashes)
+                all_hashes = self._find_hashes(project, hashes)
+                existing_group_id = self._find_existing_group_id(all_hashes)
+                if existing_group_id is not None:
+                    group = Group.objects.get(id=existing_group_id)
 
         # XXX(dcramer): this has the opportunity to create duplicate groups
         # it should be resolved by the hash merging function later but this
@@ -1279,8 +1412,6 @@ class EventManager(object):
             )
 
         else:
-            group = Group.objects.get(id=existing_group_id)
-
             group_is_new = False
 
         # If all hashes are brand new we treat this event as new
@@ -1433,7 +1564,6 @@ class EventManager(object):
         date = max(event.datetime, group.last_seen)
         extra = {
             'last_seen': date,
-            'score': ScoreClause(group),
             'data': data['data'],
         }
         if event.message and event.message != group.message:
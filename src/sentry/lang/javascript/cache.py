@@ -1,10 +1,27 @@
 from __future__ import absolute_import, print_function
 
+import errno
+import os
+import tempfile
+
+from time import time
+
 from six import text_type
 from symbolic import SourceView
+from sentry import options
 from sentry.utils.strings import codec_lookup
 
-__all__ = ['SourceCache', 'SourceMapCache']
+__all__ = ['SourceCache', 'SourceMapCache', 'ReleaseFileDiskCache']
+
+# Artifacts are written to temporary files with this prefix first, which
+# eviction leaves alone unless they have been abandoned for this long.
+TEMP_FILE_PREFIX = 'tmp'
+TEMP_FILE_MAX_AGE = 60 * 60
+
+# Walking the cache directory is expensive, so a process only evicts once it
+# has written this fraction of the limit, or at most every so many seconds.
+EVICT_WRITE_RATIO = 0.1
+EVICT_INTERVAL = 60
 
 
 def is_utf8(codec):
@@ -84,3 +101,123 @@ class SourceMapCache(object):
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ReleaseFileDiskCache(object):
+    """
+    A local on-disk cache of compressed release artifacts, addressed by the
+    checksum of their contents.
+
+    The total size of the cache is bounded by ``releasefile.cache-limit``
+    bytes, evicting the least recently read artifacts first. A limit of zero
+    disables the cache. Since eviction runs only periodically, the cache can
+    briefly grow beyond the limit.
+    """
+
+    def __init__(self):
+        self._written = 0
+        self._last_evicted = 0
+
+    @property
+    def cache_path(self):
+        return options.get('releasefile.cache-path')
+
+    @property
+    def cache_limit(self):
+        return options.get('releasefile.cache-limit')
+
+    @property
+    def enabled(self):
+        return bool(self.cache_path) and self.cache_limit > 0
+
+    def get_path(self, checksum):
+        return os.path.join(self.cache_path, checksum[:2], checksum)
+
+    def get(self, checksum):
+        if not self.enabled:
+            return None
+
+        path = self.get_path(checksum)
+        try:
+            with open(path, 'rb') as f:
+                rv = f.read()
+            # The modification time is used to track recency for eviction.
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return rv
+
+    def set(self, checksum, z_body):
+        """
+        Store the compressed body of an artifact, returning whether it was
+        written to the cache.
+        """
+        if not self.enabled or len(z_body) > self.cache_limit:
+            return False
+
+        path = self.get_path(checksum)
+        try:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+            # Write to a temporary file first so that concurrent readers never
+            # observe a partially written artifact.
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=TEMP_FILE_PREFIX, dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(z_body)
+                os.rename(tmp_path, path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except (IOError, OSError):
+            return False
+
+        self._written += len(z_body)
+        if self._written >= self.cache_limit * EVICT_WRITE_RATIO or \
+                time() - self._last_evicted >= EVICT_INTERVAL:
+            self.evict()
+        return True
+
+    def evict(self):
+        now = time()
+        self._written = 0
+        self._last_evicted = now
+
+        entries = []
+        total_size = 0
+        for root, _, filenames in os.walk(self.cache_path):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                # Temporary files may still be written to by another process.
+                if filename.startswith(TEMP_FILE_PREFIX):
+                    if now - stat.st_mtime > TEMP_FILE_MAX_AGE:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size <= self.cache_limit:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            if total_size <= self.cache_limit:
+                break
@@ -7,6 +7,7 @@ import re
 import sys
 import base64
 import six
+import time
 import zlib
 
 from django.conf import settings
@@ -28,6 +29,7 @@ from sentry import http
 from sentry.interfaces.stacktrace import Stacktrace
 from sentry.models import EventError, ReleaseFile
 from sentry.utils.cache import cache
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
 from sentry.utils.http import is_valid_origin
@@ -35,7 +37,7 @@ from sentry.utils.safe import get_path
 from sentry.utils import metrics
 from sentry.stacktraces import StacktraceProcessor
 
-from .cache import SourceCache, SourceMapCache
+from .cache import ReleaseFileDiskCache, SourceCache, SourceMapCache
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -58,6 +60,9 @@ CLEAN_MODULE_RE = re.compile(
 VERSION_RE = re.compile(r'^[a-f0-9]{32}|[a-f0-9]{40}$', re.I)
 NODE_MODULES_RE = re.compile(r'\bnode_modules/')
 SOURCE_MAPPING_URL_RE = re.compile(r'\/\/# sourceMappingURL=(.*)$')
+# the largest compressed artifact that is stored in the shared cache when it
+# is also stored in the disk cache
+CACHE_MAX_VALUE_SIZE = 1000 * 1000
 CACHE_CONTROL_RE = re.compile(r'max-age=(\d+)')
 CACHE_CONTROL_MAX = 7200
 CACHE_CONTROL_MIN = 60
@@ -65,8 +70,24 @@ CACHE_CONTROL_MIN = 60
 # fetched
 MAX_RESOURCE_FETCHES = 100
 
+# the approximate number of bytes of parsed sources and sourcemaps kept in
+# memory, per process, for reuse by subsequent events of the same release
+PARSED_SOURCE_CACHE_SIZE = 100 * 1024 * 1024
+# the time parsed sources are reused for before being fetched again (this
+# matches the minimum time scraped sources are cached for)
+PARSED_SOURCE_CACHE_TTL = CACHE_CONTROL_MIN
+
 logger = logging.getLogger(__name__)
 
+release_file_disk_cache = ReleaseFileDiskCache()
+
+# Entries are ``(value, size, parse_duration)`` tuples.
+parsed_source_cache = LRUCache(
+    PARSED_SOURCE_CACHE_SIZE,
+    weigher=lambda entry: entry[1],
+    ttl=PARSED_SOURCE_CACHE_TTL,
+)
+
 
 class UnparseableSourcemap(http.BadSource):
     error_type = EventError.JS_INVALID_SOURCEMAP
@@ -199,81 +220,113 @@ def discover_sourcemap(result):
     return sourcemap
 
 
-def fetch_release_file(filename, release, dist=None):
-    cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
+def get_release_file_cache_key(checksum):
+    return 'releasefile:body:v1:%s' % (checksum, )
 
-    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
-    result = cache.get(cache_key)
 
-    dist_name = dist and dist.name or None
+def get_cached_release_file_body(checksum):
+    """
+    Returns the compressed body of a release artifact, consulting the local
+    disk cache before the shared cache.
+    """
+    z_body = release_file_disk_cache.get(checksum)
+    if z_body is not None:
+        metrics.incr('sourcemaps.release_file.cache', tags={'tier': 'disk'})
+        return z_body
 
-    if result is None:
-        filename_choices = ReleaseFile.normalize(filename)
-        filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
+    z_body = cache.get(get_release_file_cache_key(checksum))
+    if z_body is not None:
+        metrics.incr('sourcemaps.release_file.cache', tags={'tier': 'shared'})
+        release_file_disk_cache.set(checksum, z_body)
+    return z_body
 
-        logger.debug(
-            'Checking database for release artifact %r (release_id=%s)', filename, release.id
-        )
 
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release,
-                dist=dist,
-                ident__in=filename_idents,
-            ).select_related('file')
-        )
+def cache_release_file_body(checksum, z_body):
+    # Large artifacts exceed the item size limit of most cache backends, so
+    # they're only kept on disk when the disk cache could store them. If it
+    # is disabled, they're written to the shared cache like any other.
+    stored = release_file_disk_cache.set(checksum, z_body)
+    if not stored or len(z_body) <= CACHE_MAX_VALUE_SIZE:
+        cache.set(get_release_file_cache_key(checksum), z_body, 3600)
 
-        if len(possible_files) == 0:
-            logger.debug(
-                'Release artifact %r not found in database (release_id=%s)', filename, release.id
-            )
-            cache.set(cache_key, -1, 60)
-            return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Pick first one that matches in priority order.
-            # This is O(N*M) but there are only ever at most 4 things here
-            # so not really worth optimizing.
-            releasefile = next((
-                rf
-                for ident in filename_idents
-                for rf in possible_files
-                if rf.ident == ident
-            ))
 
+def fetch_release_file(filename, release, dist=None):
+    cache_key = 'releasefile:v2:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
+
+    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
+    result = cache.get(cache_key)
+
+    dist_name = dist and dist.name or None
+
+    if result == -1:
+        # We cached an error, so normalize
+        # it down to None
+        return None
+    elif result is not None:
+        headers, checksum, encoding = result
+        z_body = get_cached_release_file_body(checksum)
+        if z_body is not None:
+            return http.UrlResult(filename, headers, zlib.decompress(z_body), 200, encoding)
+
+    filename_choices = ReleaseFile.normalize(filename)
+    filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
+
+    logger.debug(
+        'Checking database for release artifact %r (release_id=%s)', filename, release.id
+    )
+
+    possible_files = list(
+        ReleaseFile.objects.filter(
+            release=release,
+            dist=dist,
+            ident__in=filename_idents,
+        ).select_related('file')
+    )
+
+    if len(possible_files) == 0:
         logger.debug(
-            'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
+            'Release artifact %r not found in database (release_id=%s)', filename, release.id
         )
+        cache.set(cache_key, -1, 60)
+        return None
+    elif len(possible_files) == 1:
+        releasefile = possible_files[0]
+    else:
+        # Pick first one that matches in priority order.
+        # This is O(N*M) but there are only ever at most 4 things here
+        # so not really worth optimizing.
+        releasefile = next((
+            rf
+            for ident in filename_idents
+            for rf in possible_files
+            if rf.ident == ident
+        ))
+
+    logger.debug(
+        'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
+    )
+
+    # Files are immutable, so the contents can be shared between all
+    # releases referencing them. Older files may not have a checksum.
+    checksum = releasefile.file.checksum or 'file-%s' % (releasefile.file.id, )
+    headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
+    encoding = get_encoding_from_headers(headers)
+
+    z_body = get_cached_release_file_body(checksum)
+    if z_body is not None:
+        body = zlib.decompress(z_body)
+    else:
         try:
             with metrics.timer('sourcemaps.release_file_read'):
                 with releasefile.file.getfile() as fp:
                     z_body, body = compress_file(fp)
         except Exception:
             logger.error('sourcemap.compress_read_failed', exc_info=sys.exc_info())
-            result = None
-        else:
-            headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
-            encoding = get_encoding_from_headers(headers)
-            result = http.UrlResult(filename, headers, body, 200, encoding)
-            cache.set(cache_key, (headers, z_body, 200, encoding), 3600)
+            return None
+        cache_release_file_body(checksum, z_body)
 
-    elif result == -1:
-        # We cached an error, so normalize
-        # it down to None
-        result = None
-    else:
-        # Previous caches would be a 3-tuple instead of a 4-tuple,
-        # so this is being maintained for backwards compatibility
-        try:
-            encoding = result[3]
-        except IndexError:
-            encoding = None
-        result = http.UrlResult(
-            filename, result[0], zlib.decompress(result[1]), result[2], encoding
-        )
-
-    return result
+    cache.set(cache_key, (headers, checksum, encoding), 3600)
+    return http.UrlResult(filename, headers, body, 200, encoding)
 
 
 def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True):
@@ -403,7 +456,8 @@ def get_max_age(headers):
     return min(max_age, CACHE_CONTROL_MAX)
 
 
-def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True):
+def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True,
+                    with_size=False):
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -420,7 +474,8 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
         )
         body = result.body
     try:
-        return SourceMapView.from_json_bytes(body)
+        with metrics.timer('sourcemaps.parse'):
+            view = SourceMapView.from_json_bytes(body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(six.text_type(exc), exc_info=True)
@@ -428,6 +483,10 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             'url': http.expose_url(url),
         })
 
+    if with_size:
+        return view, len(body)
+    return view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -769,44 +828,78 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             })
             return
 
-        # TODO: respect cache-control/max-age headers to some extent
-        logger.debug('Fetching remote source %r', filename)
-        try:
-            result = fetch_file(
-                filename,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping
-            )
-        except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
-            return
-
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
+        cache_key = self.get_parsed_source_cache_key('source', filename)
+        entry = parsed_source_cache.get(cache_key) if cache_key else None
+        if entry is not None:
+            (source_view, url, sourcemap_url), _, duration = entry
+            metrics.incr('sourcemaps.parsed_cache.hit', tags={'type': 'source'})
+            metrics.timing('sourcemaps.parsed_cache.saved', duration, tags={'type': 'source'})
+            cache.add(filename, source_view)
+            cache.alias(url, filename)
+        else:
+            # TODO: respect cache-control/max-age headers to some extent
+            logger.debug('Fetching remote source %r', filename)
+            try:
+                result = fetch_file(
+                    filename,
+                    project=self.project,
+                    release=self.release,
+                    dist=self.dist,
+                    allow_scraping=self.allow_scraping
+                )
+            except http.BadSource as exc:
+                cache.add_error(filename, exc.data)
+                return
+
+            start = time.time()
+            cache.add(filename, result.body, result.encoding)
+            cache.alias(result.url, filename)
+            sourcemap_url = discover_sourcemap(result)
+
+            if cache_key is not None:
+                metrics.incr('sourcemaps.parsed_cache.miss', tags={'type': 'source'})
+                parsed_source_cache.set(cache_key, (
+                    (cache.get(filename), result.url, sourcemap_url),
+                    len(result.body),
+                    time.time() - start,
+                ))
 
-        sourcemap_url = discover_sourcemap(result)
         if not sourcemap_url:
             return
 
-        logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
+        logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], filename)
         sourcemaps.link(filename, sourcemap_url)
         if sourcemap_url in sourcemaps:
             return
 
-        # pull down sourcemap
-        try:
-            sourcemap_view = fetch_sourcemap(
-                sourcemap_url,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping,
-            )
-        except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
-            return
+        sourcemap_cache_key = self.get_parsed_source_cache_key('sourcemap', sourcemap_url)
+        entry = parsed_source_cache.get(sourcemap_cache_key) if sourcemap_cache_key else None
+        if entry is not None:
+            sourcemap_view, _, duration = entry
+            metrics.incr('sourcemaps.parsed_cache.hit', tags={'type': 'sourcemap'})
+            metrics.timing('sourcemaps.parsed_cache.saved', duration, tags={'type': 'sourcemap'})
+        else:
+            # pull down sourcemap
+            try:
+                start = time.time()
+                sourcemap_view, size = fetch_sourcemap(
+                    sourcemap_url,
+                    project=self.project,
+                    release=self.release,
+                    dist=self.dist,
+                    allow_scraping=self.allow_scraping,
+                    with_size=True,
+                )
+            except http.BadSource as exc:
+                cache.add_error(filename, exc.data)
+                return
+
+            if sourcemap_cache_key is not None:
+                metrics.incr('sourcemaps.parsed_cache.miss', tags={'type': 'sourcemap'})
+                parsed_source_cache.set(
+                    sourcemap_cache_key,
+                    (sourcemap_view, size, time.time() - start),
+                )
 
         sourcemaps.add(sourcemap_url, sourcemap_view)
 
@@ -819,6 +912,24 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                     source_view
                 )
 
+    def get_parsed_source_cache_key(self, type, url):
+        """
+        Returns the key under which the parsed version of ``url`` is shared
+        with other events in this process. Only sources that belong to a
+        release are shared, and inlined sourcemaps are never shared.
+
+        Releases can be shared by several projects of an organization, so
+        the key is scoped to the project and its scraping setting; a file
+        scraped for one project must never be served to a project that does
+        not allow scraping it.
+        """
+        if self.release is None or is_data_uri(url):
+            return None
+        return (
+            type, self.project.id, self.allow_scraping, self.release.id,
+            self.dist.id if self.dist else None, url,
+        )
+
     def populate_source_cache(self, frames):
         """
         Fetch all sources that we know are required (being referenced directly
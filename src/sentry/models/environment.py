@@ -8,6 +8,7 @@ sentry.models.environment
 from __future__ import absolute_import, print_function
 
 from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete
 from django.utils import timezone
 
 from sentry.constants import (
@@ -15,7 +16,7 @@ from sentry.constants import (
     ENVIRONMENT_NAME_MAX_LENGTH
 )
 from sentry.db.models import (BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr)
-from sentry.utils.cache import cache
+from sentry.utils.cache import cache, relation_cache
 from sentry.utils.hashlib import md5_text
 import re
 
@@ -34,6 +35,10 @@ class EnvironmentProject(Model):
         db_table = 'sentry_environmentproject'
         unique_together = (('project', 'environment'), )
 
+    @classmethod
+    def get_cache_key(cls, environment_id, project_id):
+        return 'envproj:c:%s:%s' % (environment_id, project_id)
+
 
 class Environment(Model):
     __core__ = False
@@ -93,29 +98,31 @@ class Environment(Model):
 
         cache_key = cls.get_cache_key(project.organization_id, name)
 
-        env = cache.get(cache_key)
+        # Environments are kept in process memory, so other workers can use a
+        # deleted environment for up to a minute (see ``relation_cache``).
+        env = relation_cache.get(cache_key)
         if env is None:
             env = cls.objects.get_or_create(
                 name=name,
                 organization_id=project.organization_id,
             )[0]
-            cache.set(cache_key, env, 3600)
+            relation_cache.set(cache_key, env, 3600)
 
         env.add_project(project)
 
         return env
 
     def add_project(self, project):
-        cache_key = 'envproj:c:%s:%s' % (self.id, project.id)
+        cache_key = EnvironmentProject.get_cache_key(self.id, project.id)
 
-        if cache.get(cache_key) is None:
+        if relation_cache.get(cache_key) is None:
             try:
                 with transaction.atomic():
                     EnvironmentProject.objects.create(project=project, environment=self)
-                cache.set(cache_key, 1, 3600)
+                relation_cache.set(cache_key, 1, 3600)
             except IntegrityError:
                 # We've already created the object, should still cache the action.
-                cache.set(cache_key, 1, 3600)
+                relation_cache.set(cache_key, 1, 3600)
 
     @staticmethod
     def get_name_from_path_segment(segment):
@@ -125,3 +132,20 @@ class Environment(Model):
         # other contexts (incl. request query string parameters), the empty
         # string should be used.
         return segment if segment != 'none' else ''
+
+
+post_delete.connect(
+    lambda instance, **kwargs: relation_cache.delete(
+        Environment.get_cache_key(instance.organization_id, instance.name),
+    ),
+    sender=Environment,
+    weak=False,
+)
+
+post_delete.connect(
+    lambda instance, **kwargs: relation_cache.delete(
+        EnvironmentProject.get_cache_key(instance.environment_id, instance.project_id),
+    ),
+    sender=EnvironmentProject,
+    weak=False,
+)
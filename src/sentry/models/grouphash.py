@@ -7,13 +7,16 @@ sentry.models.grouphash
 """
 from __future__ import absolute_import
 
+from uuid import uuid4
+
 from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_delete
 from django.utils.translation import ugettext_lazy as _
 
 from sentry.db.models import BoundedPositiveIntegerField, FlexibleForeignKey, Model
-from sentry.utils import redis
+from sentry.utils import metrics, redis
+from sentry.utils.cache import cache
 
 
 class GroupHash(Model):
@@ -39,6 +42,85 @@ class GroupHash(Model):
         db_table = 'sentry_grouphash'
         unique_together = (('project', 'hash'), )
 
+    @classmethod
+    def get_cache_key(cls, project_id, hash):
+        return u'gh:g:{}:{}'.format(project_id, hash)
+
+    @classmethod
+    def get_version_cache_key(cls, project_id, hash):
+        return u'gh:v:{}:{}'.format(project_id, hash)
+
+    @classmethod
+    def get_or_create_many(cls, project, hash_list):
+        """
+        Return a ``GroupHash`` for every hash in ``hash_list``, creating any
+        that don't exist yet.
+
+        Hashes that are associated with a group or a tombstone rarely change,
+        so their association is cached. Instances built from the cache are not
+        fetched from the database and only carry the ``id``, ``project``,
+        ``hash``, ``group_id``, ``group_tombstone_id`` and ``state`` fields.
+        Anything that changes these associations must call ``clear_cache``.
+        """
+        cache_keys = [cls.get_cache_key(project.id, hash) for hash in hash_list]
+        version_keys = [cls.get_version_cache_key(project.id, hash) for hash in hash_list]
+        cached = cache.get_many(cache_keys + version_keys)
+
+        results = []
+        to_cache = {}
+        hits = 0
+        for cache_key, version_key, hash in zip(cache_keys, version_keys, hash_list):
+            # Associations are only valid for the version they were read at,
+            # which ``clear_cache`` replaces.
+            version = cached.get(version_key)
+            value = cached.get(cache_key)
+            if value is not None and value[0] == version:
+                _, id, group_id, group_tombstone_id, state = value
+                instance = cls(
+                    id=id,
+                    project=project,
+                    hash=hash,
+                    group_id=group_id,
+                    group_tombstone_id=group_tombstone_id,
+                    state=state,
+                )
+                hits += 1
+            else:
+                instance = cls.objects.get_or_create(
+                    project=project,
+                    hash=hash,
+                )[0]
+                if instance.group_id is not None or instance.group_tombstone_id is not None:
+                    to_cache[cache_key] = (
+                        version,
+                        instance.id,
+                        instance.group_id,
+                        instance.group_tombstone_id,
+                        instance.state,
+                    )
+            results.append(instance)
+
+        if to_cache:
+            cache.set_many(to_cache, 3600)
+
+        if hits:
+            metrics.incr('grouphash.cache.hit', amount=hits)
+        if hits < len(hash_list):
+            metrics.incr('grouphash.cache.miss', amount=len(hash_list) - hits)
+        return results
+
+    @classmethod
+    def clear_cache(cls, project_id, hash_list):
+        # Deleting the cached associations would race with concurrent calls
+        # to ``get_or_create_many`` that read the association before it was
+        # changed and cache it afterwards. Setting a new version instead makes
+        # them cache it for a version that is no longer current. Versions
+        # outlive the associations cached for them.
+        version = uuid4().hex
+        cache.set_many({
+            cls.get_version_cache_key(project_id, hash): version for hash in hash_list
+        }, 7200)
+
     @classmethod
     def __get_last_processed_event_id_cluster(cls):
         cluster_name = getattr(settings, 'GROUP_HASH_LAST_PROCESSED_EVENT_CLUSTER_NAME', 'default')
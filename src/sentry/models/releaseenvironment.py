@@ -2,9 +2,10 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.db import models
+from django.db.models.signals import post_delete
 from django.utils import timezone
 
-from sentry.utils.cache import cache
+from sentry.utils.cache import transient_relation_cache
 from sentry.db.models import (
     FlexibleForeignKey,
     Model,
@@ -40,9 +41,9 @@ class ReleaseEnvironment(Model):
 
     @classmethod
     def get_or_create(cls, project, release, environment, datetime, **kwargs):
-        cache_key = cls.get_cache_key(project.id, release.id, environment.id)
+        cache_key = cls.get_cache_key(project.organization_id, release.id, environment.id)
 
-        instance = cache.get(cache_key)
+        instance = transient_relation_cache.get(cache_key)
         if instance is None:
             instance, created = cls.objects.get_or_create(
                 release_id=release.id,
@@ -53,7 +54,7 @@ class ReleaseEnvironment(Model):
                     'last_seen': datetime,
                 }
             )
-            cache.set(cache_key, instance, 3600)
+            transient_relation_cache.set(cache_key, instance, 3600)
         else:
             created = False
 
@@ -68,5 +69,18 @@ class ReleaseEnvironment(Model):
                 last_seen=datetime,
             )
             instance.last_seen = datetime
-            cache.set(cache_key, instance, 3600)
+            transient_relation_cache.set(cache_key, instance, 3600)
         return instance
+
+
+post_delete.connect(
+    lambda instance, **kwargs: transient_relation_cache.delete(
+        ReleaseEnvironment.get_cache_key(
+            instance.organization_id,
+            instance.release_id,
+            instance.environment_id,
+        ),
+    ),
+    sender=ReleaseEnvironment,
+    weak=False,
+)
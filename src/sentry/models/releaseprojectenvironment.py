@@ -2,9 +2,10 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.db import models
+from django.db.models.signals import post_delete
 from django.utils import timezone
 
-from sentry.utils.cache import cache
+from sentry.utils.cache import transient_relation_cache
 from sentry.db.models import (BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr)
 
 
@@ -36,9 +37,9 @@ class ReleaseProjectEnvironment(Model):
 
     @classmethod
     def get_or_create(cls, release, project, environment, datetime, **kwargs):
-        cache_key = cls.get_cache_key(project.id, release.id, environment.id)
+        cache_key = cls.get_cache_key(release.id, project.id, environment.id)
 
-        instance = cache.get(cache_key)
+        instance = transient_relation_cache.get(cache_key)
         if instance is None:
             instance, created = cls.objects.get_or_create(
                 release=release,
@@ -49,7 +50,7 @@ class ReleaseProjectEnvironment(Model):
                     'last_seen': datetime,
                 }
             )
-            cache.set(cache_key, instance, 3600)
+            transient_relation_cache.set(cache_key, instance, 3600)
         else:
             created = False
 
@@ -62,5 +63,18 @@ class ReleaseProjectEnvironment(Model):
                 last_seen=datetime,
             )
             instance.last_seen = datetime
-            cache.set(cache_key, instance, 3600)
+            transient_relation_cache.set(cache_key, instance, 3600)
         return instance
+
+
+post_delete.connect(
+    lambda instance, **kwargs: transient_relation_cache.delete(
+        ReleaseProjectEnvironment.get_cache_key(
+            instance.release_id,
+            instance.project_id,
+            instance.environment_id,
+        ),
+    ),
+    sender=ReleaseProjectEnvironment,
+    weak=False,
+)
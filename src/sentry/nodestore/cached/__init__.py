@@ -0,0 +1,10 @@
+"""
+sentry.nodestore.cached
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from .backend import CachedNodeStorage  # NOQA
@@ -0,0 +1,164 @@
+"""
+sentry.nodestore.cached.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import six
+import threading
+
+from weakref import WeakKeyDictionary
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics, redis
+from sentry.utils.compat import pickle
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.imports import import_string
+
+# ``NodeStorage`` is thread local, so the in-process LRU is kept here instead
+# of on the instance to share it (and its invalidations) between threads.
+_local_caches = WeakKeyDictionary()
+_local_caches_lock = threading.Lock()
+
+
+class CachedNodeStorage(NodeStorage):
+    """
+    A backend which wraps another backend with a read-through cache.
+
+    Nodes are cached in a bounded in-process LRU and, if a Redis cluster is
+    provided, in a shared Redis tier. Both tiers are updated when nodes are
+    written and invalidated when they are deleted. Cached values are stored
+    pickled (but not compressed), so callers always receive their own copy of
+    the node data.
+
+    The in-process LRU is shared by all threads, but writes made by other
+    processes only invalidate the Redis tier, so a local entry may be stale
+    for at most ``local_cache_ttl`` seconds.
+
+    >>> CachedNodeStorage(
+    >>>     backend=('sentry.nodestore.django.backend.DjangoNodeStorage', {}),
+    >>>     cache_size=1000,
+    >>>     cluster='default',
+    >>> )
+    """
+
+    def __init__(self, backend, cache_size=1000, cache_ttl=60 * 60, local_cache_ttl=60,
+                 cluster=None, cache_prefix='ns:c:', **kwargs):
+        backend, backend_options = backend
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)
+        self.backend = backend(**backend_options)
+        self.local_cache = None
+        if cache_size:
+            with _local_caches_lock:
+                self.local_cache = _local_caches.get(self)
+                if self.local_cache is None:
+                    self.local_cache = _local_caches[self] = LRUCache(
+                        cache_size, ttl=local_cache_ttl)
+        self.cluster = redis.clusters.get(cluster) if cluster is not None else None
+        self.cache_ttl = cache_ttl
+        self.cache_prefix = cache_prefix
+        super(CachedNodeStorage, self).__init__(**kwargs)
+
+    def validate(self):
+        self.backend.validate()
+
+    def __get_cache_key(self, id):
+        return u'{}{}'.format(self.cache_prefix, id)
+
+    def __encode(self, data):
+        return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def __decode(self, payload):
+        return pickle.loads(payload)
+
+    def __set_cached(self, values):
+        if self.local_cache is not None:
+            for id, payload in six.iteritems(values):
+                self.local_cache.set(id, payload)
+
+        if self.cluster is not None:
+            with self.cluster.map() as client:
+                for id, payload in six.iteritems(values):
+                    client.setex(self.__get_cache_key(id), self.cache_ttl, payload)
+
+    def __delete_cached(self, id_list):
+        if self.local_cache is not None:
+            for id in id_list:
+                self.local_cache.delete(id)
+
+        if self.cluster is not None:
+            with self.cluster.map() as client:
+                for id in id_list:
+                    client.delete(self.__get_cache_key(id))
+
+    def get(self, id):
+        return self.get_multi([id]).get(id)
+
+    def get_multi(self, id_list):
+        payloads = {}
+        pending = set(id_list)
+
+        if self.local_cache is not None:
+            for id in pending:
+                payload = self.local_cache.get(id)
+                if payload is not None:
+                    payloads[id] = payload
+            pending.difference_update(payloads)
+            if payloads:
+                metrics.incr('nodestore.cache.hit', amount=len(payloads), tags={'tier': 'local'})
+
+        if pending and self.cluster is not None:
+            with self.cluster.map() as client:
+                promises = {id: client.get(self.__get_cache_key(id)) for id in pending}
+
+            shared = {id: p.value for id, p in six.iteritems(promises) if p.value is not None}
+            if shared:
+                if self.local_cache is not None:
+                    for id, payload in six.iteritems(shared):
+                        self.local_cache.set(id, payload)
+                payloads.update(shared)
+                pending.difference_update(shared)
+                metrics.incr('nodestore.cache.hit', amount=len(shared), tags={'tier': 'shared'})
+
+        results = {id: self.__decode(payload) for id, payload in six.iteritems(payloads)}
+
+        if pending:
+            metrics.incr('nodestore.cache.miss', amount=len(pending))
+            fetched = {
+                id: data for id, data in six.iteritems(self.backend.get_multi(list(pending)))
+                if data is not None
+            }
+            self.__set_cached({id: self.__encode(data) for id, data in six.iteritems(fetched)})
+            results.update(fetched)
+
+        return results
+
+    def set(self, id, data):
+        self.set_multi({id: data})
+
+    def set_multi(self, values):
+        try:
+            self.backend.set_multi(values)
+        except Exception:
+            # The write may have partially succeeded, so make sure we don't
+            # continue serving a previous version of these nodes.
+            self.__delete_cached(list(values))
+            raise
+
+        self.__set_cached({id: self.__encode(data) for id, data in six.iteritems(values)})
+
+    def delete(self, id):
+        self.delete_multi([id])
+
+    def delete_multi(self, id_list):
+        self.backend.delete_multi(id_list)
+        self.__delete_cached(id_list)
+
+    def cleanup(self, cutoff_timestamp):
+        # Cached nodes expire on their own after ``cache_ttl`` seconds.
+        self.backend.cleanup(cutoff_timestamp)
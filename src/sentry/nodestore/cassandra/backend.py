@@ -47,8 +47,16 @@ class CassandraNodeStorage(NodeStorage):
     def get(self, id):
         return self.connection.get(id)
 
+    def delete_multi(self, id_list):
+        self.connection.delete_multi(id_list)
+
     def get_multi(self, id_list):
         return self.connection.get_multi(id_list)
 
     def set(self, id, data):
         self.connection.set(id, data)
+
+    def set_multi(self, values):
+        # Uses the prepared insert statement for all nodes, executing them
+        # concurrently rather than waiting on each round trip in turn.
+        self.connection.set_multi(values)
@@ -9,11 +9,14 @@ sentry.nodestore.django.backend
 from __future__ import absolute_import
 
 import math
+import six
 
+from django.db import connections, router
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
+from sentry.utils.db import is_postgres
 
 from .models import Node
 
@@ -44,6 +47,46 @@ class DjangoNodeStorage(NodeStorage):
             },
         )
 
+    def set_multi(self, values):
+        if not values:
+            return
+
+        using = router.db_for_write(Node)
+        if not is_postgres(using):
+            return super(DjangoNodeStorage, self).set_multi(values)
+
+        # Write all nodes with a single upsert statement rather than the
+        # UPDATE (and potential INSERT) per node that ``set`` requires.
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        data_field = Node._meta.get_field('data')
+        timestamp_field = Node._meta.get_field('timestamp')
+        timestamp = timestamp_field.get_db_prep_save(timezone.now(), connection)
+
+        params = []
+        for id, data in six.iteritems(values):
+            params.extend([id, data_field.get_db_prep_save(data, connection), timestamp])
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                '''
+                INSERT INTO %(table)s (%(id)s, %(data)s, %(timestamp)s)
+                     VALUES %(rows)s
+                ON CONFLICT (%(id)s) DO UPDATE
+                        SET %(data)s = EXCLUDED.%(data)s,
+                            %(timestamp)s = EXCLUDED.%(timestamp)s
+            ''' % {
+                    'table': qn(Node._meta.db_table),
+                    'id': qn(Node._meta.pk.column),
+                    'data': qn(data_field.column),
+                    'timestamp': qn(timestamp_field.column),
+                    'rows': ', '.join(['(%s, %s, %s)'] * len(values)),
+                }, params
+            )
+        finally:
+            cursor.close()
+
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
 
@@ -60,6 +60,10 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
 
+# Release artifact on-disk cache (a limit of 0 disables the cache)
+register('releasefile.cache-path', type=String, default='/tmp/sentry-releasefile-cache')
+register('releasefile.cache-limit', type=Int, default=0)
+
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
 register('mail.host', default='localhost', flags=FLAG_REQUIRED | FLAG_PRIORITIZE_DISK)
@@ -156,3 +160,10 @@ register('eventstream.kafka.send-post_process-task', type=Bool, default=True)
 # Ingest refactor
 register('store.process-in-kafka', type=Bool, default=False)
 register('store.kafka-sample-rate', default=0.0)
+# Pass events received as JSON of up to this size (after decompression) to the
+# store tasks directly instead of through the cache, disabled when 0
+register('store.inline-event-max-size', default=0)
+# Save events in batches of this size, disabled when 1 or lower
+register('store.save-event-batch-size', default=1)
+# Record similarity features in batches of this size, disabled when 1 or lower
+register('similarity.record-batch-size', default=1)
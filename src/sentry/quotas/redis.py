@@ -10,13 +10,17 @@ from __future__ import absolute_import
 import functools
 import six
 
+from threading import Lock
 from time import time
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.quotas.base import NotRateLimited, Quota, RateLimited
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.redis import get_cluster_from_options, load_script
 
 is_rate_limited = load_script('quotas/is_rate_limited.lua')
+lease_quota = load_script('quotas/lease.lua')
 
 
 class BasicRedisQuota(object):
@@ -40,11 +44,32 @@ class RedisQuota(Quota):
     #: metrics may not be in sync with the computer running this code.
     grace = 60
 
-    def __init__(self, **options):
+    def __init__(self, quota_cache_ttl=0, quota_cache_size=10000,
+                 lease_size=0, lease_ttl=5, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_QUOTA_OPTIONS', options)
         super(RedisQuota, self).__init__(**options)
         self.namespace = 'quota'
 
+        # The resolved quotas for a (project, key) pair require several option
+        # lookups, so they can optionally be cached in process for a few
+        # seconds. Limit changes take up to ``quota_cache_ttl`` to apply.
+        if quota_cache_ttl > 0:
+            self.quota_cache = LRUCache(quota_cache_size, ttl=quota_cache_ttl)
+        else:
+            self.quota_cache = None
+
+        # When ``lease_size`` is greater than one, items are leased from Redis
+        # in chunks of up to that size and handed out locally until the lease
+        # is exhausted or ``lease_ttl`` seconds have passed. Leased items are
+        # counted against the quota as soon as they are acquired, so unused
+        # items may cause other processes to be rate limited slightly early.
+        self.lease_size = lease_size
+        if lease_size > 1:
+            self.leases = LRUCache(quota_cache_size, ttl=lease_ttl)
+            self.lease_lock = Lock()
+        else:
+            self.leases = None
+
     def validate(self):
         try:
             with self.cluster.all() as client:
@@ -60,6 +85,17 @@ class RedisQuota(Quota):
         )
 
     def get_quotas_with_limits(self, project, key=None):
+        if self.quota_cache is None:
+            return self.__get_quotas_with_limits(project, key=key)
+
+        cache_key = (project.id, key.id if key else None)
+        quotas = self.quota_cache.get(cache_key)
+        if quotas is None:
+            quotas = self.__get_quotas_with_limits(project, key=key)
+            self.quota_cache.set(cache_key, quotas)
+        return quotas
+
+    def __get_quotas_with_limits(self, project, key=None):
         return [
             quota for quota in self.get_quotas(project, key=key)
             # x = (key, limit, interval)
@@ -186,7 +222,33 @@ class RedisQuota(Quota):
             args.extend((quota.limit, int(expiry)))
 
         client = self.cluster.get_local_client_for_key(six.text_type(project.organization_id))
+        if self.leases is not None:
+            return self.__is_rate_limited_leased(project, quotas, client, keys, args, timestamp)
+
         rejections = is_rate_limited(client, keys, args)
+        return self.__get_rate_limit(project, quotas, rejections, timestamp)
+
+    def __is_rate_limited_leased(self, project, quotas, client, keys, args, timestamp):
+        # The Redis keys include the window, so a new window always starts
+        # with a fresh lease.
+        lease_key = tuple(keys)
+        with self.lease_lock:
+            lease = self.leases.get(lease_key)
+            if lease is not None and lease[0] > 0:
+                lease[0] -= 1
+                metrics.incr('quotas.lease.hit')
+                return NotRateLimited()
+
+        metrics.incr('quotas.lease.miss')
+        granted, rejections = lease_quota(client, keys, args + [self.lease_size])
+        if granted > 0:
+            with self.lease_lock:
+                self.leases.set(lease_key, [granted - 1])
+            return NotRateLimited()
+
+        return self.__get_rate_limit(project, quotas, rejections, timestamp)
+
+    def __get_rate_limit(self, project, quotas, rejections, timestamp):
         if any(rejections):
             enforce = False
             worst_case = (0, None)
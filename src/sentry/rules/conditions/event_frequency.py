@@ -53,6 +53,9 @@ class BaseEventFrequencyCondition(EventCondition):
 
     def __init__(self, *args, **kwargs):
         self.tsdb = kwargs.pop('tsdb', tsdb)
+        # Conditions of the same type that are evaluated for the same event
+        # can share a cache, so that every rate is only queried once.
+        self.rate_cache = kwargs.pop('rate_cache', None)
 
         super(BaseEventFrequencyCondition, self).__init__(*args, **kwargs)
 
@@ -80,6 +83,14 @@ class BaseEventFrequencyCondition(EventCondition):
         raise NotImplementedError  # subclass must implement
 
     def get_rate(self, event, interval, environment_id):
+        if self.rate_cache is not None:
+            key = (type(self), event.group_id, interval, environment_id)
+            if key not in self.rate_cache:
+                self.rate_cache[key] = self.query_rate(event, interval, environment_id)
+            return self.rate_cache[key]
+        return self.query_rate(event, interval, environment_id)
+
+    def query_rate(self, event, interval, environment_id):
         _, duration = intervals[interval]
         end = timezone.now()
         return self.query(
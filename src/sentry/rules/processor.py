@@ -9,6 +9,7 @@ from django.utils import timezone
 
 from sentry.models import GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
+from sentry.rules.conditions.event_frequency import BaseEventFrequencyCondition
 from sentry.utils.safe import safe_execute
 
 RuleFuture = namedtuple('RuleFuture', ['rule', 'kwargs'])
@@ -51,11 +52,18 @@ class RuleProcessor(object):
         self.has_reappeared = has_reappeared
 
         self.grouped_futures = {}
+        self.rule_statuses = {}
+        # Rates queried by frequency conditions, shared between all rules.
+        self.rate_cache = {}
 
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
     def get_rule_status(self, rule):
+        rule_status = self.rule_statuses.get(rule.id)
+        if rule_status is not None:
+            return rule_status
+
         rule_status, _ = GroupRuleStatus.objects.get_or_create(
             rule=rule,
             group=self.group,
@@ -66,13 +74,47 @@ class RuleProcessor(object):
 
         return rule_status
 
+    def get_rule_statuses(self, rules):
+        """
+        Returns the statuses of the given rules for the group, keyed by rule
+        ID, with a single query. Only the statuses that don't exist yet are
+        created one at a time.
+        """
+        rule_statuses = {
+            rule_status.rule_id: rule_status
+            for rule_status in GroupRuleStatus.objects.filter(
+                group=self.group,
+                rule__in=[rule.id for rule in rules],
+            )
+        }
+        for rule in rules:
+            if rule.id not in rule_statuses:
+                rule_statuses[rule.id] = self.get_rule_status(rule)
+        return rule_statuses
+
+    def should_apply(self, rule):
+        # XXX(dcramer): if theres no condition should we really skip it,
+        # or should we just apply it blindly?
+        if not rule.data.get('conditions', ()):
+            return False
+
+        if rule.environment_id is not None \
+                and self.event.get_environment().id != rule.environment_id:
+            return False
+
+        return True
+
     def condition_matches(self, condition, state, rule):
         condition_cls = rules.get(condition['id'])
         if condition_cls is None:
             self.logger.warn('Unregistered condition %r', condition['id'])
             return
 
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
+        kwargs = {}
+        if issubclass(condition_cls, BaseEventFrequencyCondition):
+            kwargs['rate_cache'] = self.rate_cache
+
+        condition_inst = condition_cls(self.project, data=condition, rule=rule, **kwargs)
         return safe_execute(condition_inst.passes, self.event, state, _with_transaction=False)
 
     def get_state(self):
@@ -88,13 +130,7 @@ class RuleProcessor(object):
         condition_list = rule.data.get('conditions', ())
         frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
 
-        # XXX(dcramer): if theres no condition should we really skip it,
-        # or should we just apply it blindly?
-        if not condition_list:
-            return
-
-        if rule.environment_id is not None \
-                and self.event.get_environment().id != rule.environment_id:
+        if not self.should_apply(rule):
             return
 
         status = self.get_rule_status(rule)
@@ -154,6 +190,13 @@ class RuleProcessor(object):
 
     def apply(self):
         self.grouped_futures.clear()
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+        self.rate_cache.clear()
+
+        rules = [rule for rule in self.get_rules() if self.should_apply(rule)]
+        self.rule_statuses = self.get_rule_statuses(rules)
+        try:
+            for rule in rules:
+                self.apply_rule(rule)
+        finally:
+            self.rule_statuses = {}
         return six.itervalues(self.grouped_futures)
@@ -55,6 +55,7 @@ list(
     map(
         lambda cmd: cli.add_command(import_string(cmd)), (
             'sentry.runner.commands.backup.export', 'sentry.runner.commands.backup.import_',
+            'sentry.runner.commands.bench.bench',
             'sentry.runner.commands.cleanup.cleanup', 'sentry.runner.commands.config.config',
             'sentry.runner.commands.createuser.createuser',
             'sentry.runner.commands.devserver.devserver', 'sentry.runner.commands.django.django',
@@ -62,6 +63,7 @@ list(
             'sentry.runner.commands.help.help', 'sentry.runner.commands.init.init',
             'sentry.runner.commands.plugins.plugins', 'sentry.runner.commands.queues.queues',
             'sentry.runner.commands.repair.repair', 'sentry.runner.commands.run.run',
+            'sentry.runner.commands.search.search',
             'sentry.runner.commands.start.start', 'sentry.runner.commands.tsdb.tsdb',
             'sentry.runner.commands.upgrade.upgrade',
             'sentry.runner.commands.permissions.permissions',
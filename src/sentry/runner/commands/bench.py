@@ -0,0 +1,239 @@
+"""
+sentry.runner.commands.bench
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import, print_function
+
+import click
+import os
+import six
+
+from time import time
+
+from sentry.runner.decorators import configuration
+from sentry.utils.math import percentile
+
+STAGES = ('store', 'normalize', 'process', 'save')
+
+
+class StageTimer(object):
+    """\
+    Records the latency and, when allocation tracing is enabled, the peak
+    amount of memory allocated for every run of a benchmark stage.
+    """
+
+    def __init__(self, name, trace_allocations=False):
+        self.name = name
+        self.trace_allocations = trace_allocations
+        self.durations = []
+        self.allocations = []
+
+    def run(self, func, *args, **kwargs):
+        if self.trace_allocations:
+            import tracemalloc
+            tracemalloc.clear_traces()
+
+        start = time()
+        result = func(*args, **kwargs)
+        self.durations.append(time() - start)
+
+        if self.trace_allocations:
+            self.allocations.append(tracemalloc.get_traced_memory()[1])
+
+        return result
+
+    def summarize(self):
+        durations = sorted(self.durations)
+        total = sum(durations)
+        return {
+            'stage': self.name,
+            'events': len(durations),
+            'events_per_second': len(durations) / total if total else 0,
+            'p50_ms': percentile(durations, 50) * 1000,
+            'p99_ms': percentile(durations, 99) * 1000,
+            'allocated_bytes': (
+                sum(self.allocations) // len(self.allocations)
+                if self.allocations else None
+            ),
+        }
+
+
+def load_payloads(platforms, paths):
+    from sentry.utils import json
+    from sentry.utils.samples import load_data
+
+    payloads = []
+    for platform in platforms:
+        data = load_data(platform)
+        if data is None:
+            raise click.ClickException(u'No sample event for platform {!r}.'.format(platform))
+        payloads.append((platform, dict(data)))
+
+    for path in paths:
+        with open(path) as fp:
+            payloads.append((os.path.basename(path), json.load(fp)))
+
+    return payloads
+
+
+def get_project_key(project):
+    from sentry.models import ProjectKey, ProjectKeyStatus
+
+    key = ProjectKey.objects.filter(
+        project=project,
+        status=ProjectKeyStatus.ACTIVE,
+    ).first()
+    if key is None:
+        key = ProjectKey.objects.create(project=project)
+    return key
+
+
+@click.command()
+@click.option(
+    '--project', 'project_id', type=int, default=None,
+    help='Project to store events in. Defaults to the internal project.'
+)
+@click.option(
+    '--platform', 'platforms', multiple=True, metavar='PLATFORM',
+    help='Replay the sample event for this platform. Can be provided multiple times.'
+)
+@click.option(
+    '--file', 'paths', multiple=True, type=click.Path(exists=True, dir_okay=False),
+    help='Replay the JSON event payload from this file. Can be provided multiple times.'
+)
+@click.option(
+    '--stage', 'stages', multiple=True, type=click.Choice(STAGES),
+    help='Only run this stage. Can be provided multiple times. Defaults to all stages.'
+)
+@click.option('--iterations', '-n', default=100, show_default=True,
+              help='Number of times every payload is replayed.')
+@click.option('--allocations', is_flag=True, default=False,
+              help='Trace memory allocations (requires tracemalloc).')
+@click.option('--jsonschema', 'use_jsonschema', is_flag=True, default=False,
+              help='Validate events with jsonschema only, instead of the compiled validators.')
+@click.option('--format', 'format_', default='human', type=click.Choice(('human', 'json')))
+@configuration
+def bench(project_id, platforms, paths, stages, iterations, allocations, use_jsonschema,
+          format_):
+    """
+    Benchmark the event ingestion pipeline.
+
+    Replays sample events (and payloads from --file, for instance those in
+    tests/fixtures) through the store endpoint, normalization, stacktrace
+    processing and saving, and reports the throughput, latency percentiles
+    and allocations of every stage.
+
+    This runs against the configured databases and writes events to the
+    selected project, so it should only be used with local or disposable
+    services.
+
+    Run the normalize stage with and without --jsonschema to compare the
+    compiled schema validators to jsonschema.
+    """
+    from uuid import uuid4
+
+    from django.conf import settings
+    from django.core.urlresolvers import reverse
+    from django.test import RequestFactory
+
+    from sentry.event_manager import EventManager
+    from sentry.models import Project
+    from sentry.stacktraces import process_stacktraces
+    from sentry.utils import json
+    from sentry.web.api import StoreView
+
+    if use_jsonschema:
+        from sentry.interfaces import schemas
+        schemas.ENABLE_COMPILED_VALIDATORS = False
+
+    if allocations:
+        try:
+            import tracemalloc
+        except ImportError:
+            raise click.ClickException('Tracing allocations requires tracemalloc.')
+        tracemalloc.start()
+
+    if not platforms and not paths:
+        platforms = ('python', 'javascript', 'java', 'cocoa')
+    payloads = load_payloads(platforms, paths)
+
+    try:
+        project = Project.objects.get(id=project_id or settings.SENTRY_PROJECT)
+    except Project.DoesNotExist:
+        raise click.ClickException('Project does not exist.')
+
+    key = get_project_key(project)
+    store_view = StoreView.as_view()
+    store_path = reverse('sentry-api-store', kwargs={'project_id': project.id})
+    store_auth = 'Sentry sentry_client=sentry-bench/0.0.0, sentry_version=6, ' \
+        'sentry_key=%s, sentry_secret=%s' % (key.public_key, key.secret_key)
+    factory = RequestFactory()
+
+    def store(data):
+        request = factory.post(
+            store_path,
+            json.dumps(data),
+            content_type='application/json',
+            HTTP_X_SENTRY_AUTH=store_auth,
+        )
+        response = store_view(request, project_id=six.text_type(project.id))
+        if response.status_code != 200:
+            raise click.ClickException(
+                u'Store request failed ({}): {}'.format(response.status_code, response.content)
+            )
+
+    def normalize(data):
+        manager = EventManager(data)
+        manager.normalize()
+        return manager.get_data()
+
+    def save(data):
+        manager = EventManager(data)
+        manager.normalize()
+        return manager.save(project.id)
+
+    timers = [StageTimer(stage, allocations) for stage in STAGES if not stages or stage in stages]
+    handlers = {
+        'store': store,
+        'normalize': normalize,
+        'process': process_stacktraces,
+        'save': save,
+    }
+
+    for _ in six.moves.xrange(iterations):
+        for name, payload in payloads:
+            for timer in timers:
+                # Every stage gets its own copy with a fresh event ID, since
+                # stages mutate their input and saving skips known events.
+                data = json.loads(json.dumps(payload))
+                data['event_id'] = uuid4().hex
+                if timer.name == 'process':
+                    data = normalize(data)
+                timer.run(handlers[timer.name], data)
+
+    results = [timer.summarize() for timer in timers]
+
+    if format_ == 'json':
+        click.echo(json.dumps(results))
+        return
+
+    click.echo(
+        u'{:<12}{:>10}{:>12}{:>12}{:>12}{:>16}'.format(
+            'stage', 'events', 'events/s', 'p50 (ms)', 'p99 (ms)', 'alloc (KiB)',
+        )
+    )
+    for result in results:
+        click.echo(
+            u'{:<12}{:>10}{:>12.1f}{:>12.2f}{:>12.2f}{:>16}'.format(
+                result['stage'],
+                result['events'],
+                result['events_per_second'],
+                result['p50_ms'],
+                result['p99_ms'],
+                '-' if result['allocated_bytes'] is None
+                else '%.1f' % (result['allocated_bytes'] / 1024.0),
+            )
+        )
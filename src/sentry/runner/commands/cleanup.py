@@ -156,7 +156,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     configure()
 
     from django.db import router as db_router
-    from sentry.app import nodestore
+    from sentry.app import nodestore, tsdb
     from sentry.db.deletion import BulkDeleteQuery
     from sentry import models
 
@@ -239,6 +239,15 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             click.echo(
                 "NodeStore backend does not support cleanup operation", err=True)
 
+        if not silent:
+            click.echo("Removing expired TSDB values")
+
+        try:
+            tsdb.cleanup()
+        except NotImplementedError:
+            if not silent:
+                click.echo("TSDB backend does not need cleanup")
+
     for bqd in BULK_QUERY_DELETES:
         if len(bqd) == 4:
             model, dtfield, order_by, chunk_size = bqd
@@ -0,0 +1,142 @@
+"""
+sentry.runner.commands.search
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import, print_function
+
+import click
+import six
+
+from time import time
+
+from sentry.runner.decorators import configuration
+from sentry.utils.math import percentile
+
+
+@click.group()
+def search():
+    "Manage the issue search indexes."
+
+
+@search.command('create-index')
+@configuration
+def create_index():
+    """
+    Create trigram indexes for message and culprit search.
+
+    Requires PostgreSQL with the pg_trgm extension available. Once the
+    indexes exist, enable them with ``SENTRY_SEARCH_OPTIONS =
+    {'use_trigram_index': True}``.
+    """
+    from sentry.models import Group
+    from sentry.search.django.indexes import create_trigram_indexes
+
+    try:
+        create_trigram_indexes(Group)
+    except RuntimeError as e:
+        raise click.ClickException(six.text_type(e))
+    click.echo('Created trigram indexes.')
+
+
+@search.command('drop-index')
+@configuration
+def drop_index():
+    "Drop the trigram indexes for message and culprit search."
+    from sentry.models import Group
+    from sentry.search.django.indexes import drop_trigram_indexes
+
+    try:
+        drop_trigram_indexes(Group)
+    except RuntimeError as e:
+        raise click.ClickException(six.text_type(e))
+    click.echo('Dropped trigram indexes.')
+
+
+def populate_groups(project, count):
+    "Insert ``count`` synthetic groups into ``project``."
+    from contextlib import closing
+    from django.db import connections, router
+    from sentry.models import Group
+
+    using = router.db_for_write(Group)
+    with closing(connections[using].cursor()) as cursor:
+        cursor.execute(
+            """
+            INSERT INTO sentry_groupedmessage (
+                project_id, logger, level, message, view, num_comments, platform,
+                status, times_seen, last_seen, first_seen, active_at,
+                time_spent_total, time_spent_count, score, is_public
+            )
+            SELECT
+                %s, '', 40,
+                'SyntheticError: ' || md5(i::text) || ' ' || md5((i + 1)::text),
+                'synthetic.module_' || (i %% 1000) || ' in handle_' || (i %% 97),
+                0, 'python', 0, 1,
+                now() - (i || ' seconds')::interval,
+                now() - (i || ' seconds')::interval,
+                now() - (i || ' seconds')::interval,
+                0, 0, 0, false
+            FROM generate_series(1, %s) AS i
+            """,
+            [project.id, count],
+        )
+
+
+@search.command()
+@click.option('--project', 'project_id', type=int, required=True,
+              help='Project to search in.')
+@click.option('--populate', type=int, default=0,
+              help='Insert this many synthetic groups into the project first (PostgreSQL only).')
+@click.option('--query', 'queries', multiple=True,
+              help='Search for this text. Can be provided multiple times.')
+@click.option('--iterations', '-n', default=20, show_default=True,
+              help='Number of times every query is run.')
+@configuration
+def bench(project_id, populate, queries, iterations):
+    """
+    Benchmark free text issue search.
+
+    Runs every query with both the default (sequential scan) and trigram
+    index search paths and reports latency percentiles for each. Create
+    the indexes with ``sentry search create-index`` first, and use
+    --populate to build a large synthetic project, for instance with
+    10000000 groups.
+    """
+    from sentry.models import Project
+    from sentry.search.django.backend import DjangoSearchBackend
+
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        raise click.ClickException('Project does not exist.')
+
+    if populate:
+        click.echo(u'Inserting {} synthetic groups...'.format(populate))
+        populate_groups(project, populate)
+
+    if not queries:
+        queries = ('c4ca4238a0b9', 'module_42 in handle', 'no such issue')
+
+    click.echo(u'{:<24}{:<10}{:>12}{:>12}'.format('query', 'path', 'p50 (ms)', 'p99 (ms)'))
+    for query in queries:
+        for name, backend in (
+            ('scan', DjangoSearchBackend()),
+            ('trigram', DjangoSearchBackend(use_trigram_index=True)),
+        ):
+            durations = []
+            for _ in six.moves.xrange(iterations):
+                start = time()
+                backend.query([project], query=query, limit=100)
+                durations.append(time() - start)
+            durations.sort()
+            click.echo(
+                u'{:<24}{:<10}{:>12.2f}{:>12.2f}'.format(
+                    query[:23],
+                    name,
+                    percentile(durations, 50) * 1000,
+                    percentile(durations, 99) * 1000,
+                )
+            )
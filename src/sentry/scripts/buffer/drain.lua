@@ -0,0 +1,25 @@
+-- Atomically drain a collection of buffered counters. The first value
+-- provided as ``KEYS`` specifies the pending set that the counters are
+-- registered with, and the remaining ``KEYS`` specify the counter hashes to
+-- be drained. No ``ARGV`` values are used.
+--
+-- For example, to drain the counters ``b:k:foo`` and ``b:k:bar`` that are
+-- registered in the pending set ``b:p:0``, the ``KEYS`` would be as follows:
+--
+--   KEYS = {"b:p:0", "b:k:foo", "b:k:bar"}
+--
+-- Each counter hash is read, deleted and removed from the pending set. The
+-- result is a Lua table/array (Redis multi bulk reply) containing the
+-- flattened ``HGETALL`` reply for each counter in the same order as the
+-- provided keys. Counters which no longer exist (e.g. because they were
+-- already processed) are returned as empty arrays.
+local pending_key = KEYS[1]
+
+local results = {}
+for i=2, #KEYS do
+    results[i - 1] = redis.call('HGETALL', KEYS[i])
+    redis.call('DEL', KEYS[i])
+    redis.call('ZREM', pending_key, KEYS[i])
+end
+
+return results
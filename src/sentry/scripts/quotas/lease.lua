@@ -0,0 +1,49 @@
+-- Lease a number of items from a collection of quota counters so that they
+-- can be handed out without consulting Redis for every item. ``KEYS`` and
+-- ``ARGV`` are provided in the same format as ``is_rate_limited.lua``, with
+-- one additional trailing argument: the maximum number of items to lease.
+--
+-- For example, to lease up to 10 items from a quota ``foo`` that has a
+-- corresponding refund/negative counter "subtract_from_foo", a limit of 100
+-- items and expires at the Unix timestamp ``100``, the ``KEYS`` and ``ARGV``
+-- values would be as follows:
+--
+--   KEYS = {"foo", "subtract_from_foo"}
+--   ARGV = {100, 100, 10}
+--
+-- The number of items granted is bounded by half of the smallest remaining
+-- quota (rounded up), so concurrent lease holders can never take more than
+-- the quota allows and the final items of a window are always granted one at
+-- a time. If any quota has no capacity left, no items are granted and the
+-- counters for all quotas are unaffected. The result is a Lua table/array
+-- (Redis multi bulk reply) containing the number of items granted, followed
+-- by a table/array that specifies whether or not each quota *rejected* the
+-- lease.
+assert(#KEYS + 1 == #ARGV, "incorrect number of keys and arguments provided")
+assert(#KEYS % 2 == 0, "there must be an even number of keys")
+
+local granted = tonumber(ARGV[#ARGV])
+local results = {}
+local failed = false
+for i=1, #KEYS, 2 do
+    local limit = tonumber(ARGV[i])
+    local remaining = limit - ((redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0))
+    local rejected = remaining < 1
+    if rejected then
+        failed = true
+    else
+        granted = math.min(granted, math.ceil(remaining / 2))
+    end
+    results[(i + 1) / 2] = rejected
+end
+
+if failed then
+    granted = 0
+else
+    for i=1, #KEYS, 2 do
+        redis.call('INCRBY', KEYS[i], granted)
+        redis.call('EXPIREAT', KEYS[i], ARGV[i + 1])
+    end
+end
+
+return {granted, results}
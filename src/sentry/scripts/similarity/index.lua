@@ -542,6 +542,20 @@ local function fetch_candidates(configuration, index, frequencies)
     return results
 end
 
+local function record(configuration, key, signatures)
+    return table.imap(
+        signatures,
+        function (signature)
+            set_frequencies(configuration, signature.index, key, signature.frequencies)
+            for band, buckets in ipairs(signature.frequencies) do
+                for bucket in pairs(buckets) do
+                    get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
+                end
+            end
+        end
+    )
+end
+
 local function search(configuration, parameters, limit)
     local possible_candidates = {}
     local create_table = function ()
@@ -618,15 +632,30 @@ local commands = {
             )
         )(cursor, arguments)
 
+        return record(configuration, key, signatures)
+    end,
+    RECORD_MULTI = function (configuration, cursor, arguments)
+        --[[
+        Records signatures for multiple keys at once. Every key is followed
+        by the number of signatures provided for it, and the signatures
+        themselves (in the same format as the ``RECORD`` command.)
+        ]]--
+        local cursor, entries = variadic_argument_parser(
+            object_argument_parser({
+                {"key", argument_parser(validate_value)},
+                {"signatures", repeated_argument_parser(
+                    object_argument_parser({
+                        {"index", argument_parser(validate_value)},
+                        {"frequencies", frequencies_argument_parser(configuration)},
+                    })
+                )},
+            })
+        )(cursor, arguments)
+
         return table.imap(
-            signatures,
-            function (signature)
-                set_frequencies(configuration, signature.index, key, signature.frequencies)
-                for band, buckets in ipairs(signature.frequencies) do
-                    for bucket in pairs(buckets) do
-                        get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
-                    end
-                end
+            entries,
+            function (entry)
+                return record(configuration, entry.key, entry.signatures)
             end
         )
     end,
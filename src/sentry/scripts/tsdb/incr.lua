@@ -0,0 +1,36 @@
+-- Increment a collection of counters stored in hashes. Values provided as
+-- ``KEYS`` specify the hash keys to increment. The first value provided as
+-- ``ARGV`` is the amount to increment by, followed by the expiration
+-- timestamp, the number of fields, and the fields to increment for each key.
+--
+-- For example, to increment the fields ``1`` and ``2`` of the hash ``foo``
+-- that should expire at the Unix timestamp ``100``, and the field ``3`` of the
+-- hash ``bar`` that should expire at the Unix timestamp ``200`` by ``1``, the
+-- ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {1, 100, 2, 1, 2, 200, 1, 3}
+--
+-- The expiration time is only set if the hash does not have one already (for
+-- example, because the hash did not exist before.)
+local count = ARGV[1]
+local position = 2
+
+for i = 1, #KEYS do
+    local key = KEYS[i]
+    local expiry = ARGV[position]
+    local fields = tonumber(ARGV[position + 1])
+    local ttl = redis.call('TTL', key)
+
+    for j = 1, fields do
+        redis.call('HINCRBY', key, ARGV[position + 1 + j], count)
+    end
+
+    if ttl < 0 then
+        redis.call('EXPIREAT', key, expiry)
+    end
+
+    position = position + 2 + fields
+end
+
+assert(position == #ARGV + 1, "incorrect number of arguments provided")
@@ -9,10 +9,11 @@ sentry.search.django.backend
 from __future__ import absolute_import
 
 import functools
-from datetime import timedelta
+import six
+from datetime import datetime, timedelta
 
 from django.db import router
-from django.db.models import Q
+from django.db.models import Model, Q
 from django.utils import timezone
 
 from sentry import quotas, tagstore
@@ -22,8 +23,12 @@ from sentry.search.django.constants import (
     MSSQL_ENGINES, MSSQL_SORT_CLAUSES, MYSQL_SORT_CLAUSES, ORACLE_SORT_CLAUSES, SORT_CLAUSES,
     SQLITE_SORT_CLAUSES
 )
+from sentry.utils import json, metrics
+from sentry.utils.cache import cache
+from sentry.utils.cursors import CursorResult
 from sentry.utils.dates import to_timestamp
-from sentry.utils.db import get_db_engine
+from sentry.utils.db import get_db_engine, is_postgres
+from sentry.utils.hashlib import md5_text
 
 
 class QuerySetBuilder(object):
@@ -186,6 +191,33 @@ def assigned_to_filter(queryset, actor, projects):
     )
 
 
+def escape_like(value):
+    "Escape the wildcard characters of a ``LIKE`` pattern."
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def message_filter(queryset, query, use_trigram_index=False):
+    if not query:
+        return queryset
+
+    model = queryset.model
+    if use_trigram_index and is_postgres(router.db_for_read(model)):
+        # ``icontains`` compares ``UPPER(column)``, which cannot use the
+        # trigram indexes on the plain columns, while ``ILIKE`` can.
+        pattern = u'%{}%'.format(escape_like(query))
+        return queryset.extra(
+            where=[u'({} ILIKE %s OR {} ILIKE %s)'.format(
+                get_sql_column(model, 'message'),
+                get_sql_column(model, 'culprit'),
+            )],
+            params=[pattern, pattern],
+        )
+
+    return queryset.filter(
+        Q(message__icontains=query) | Q(culprit__icontains=query),
+    )
+
+
 def get_latest_release(projects, environments):
     from sentry.models import Release
 
@@ -207,9 +239,98 @@ def get_latest_release(projects, environments):
     )[:1].get()
 
 
+def normalize_cache_value(value):
+    "Convert a search parameter to a stable, JSON serializable value."
+    if value is ANY:
+        return '__any__'
+    elif isinstance(value, Model):
+        return u'{}.{}:{}'.format(value._meta.app_label, value._meta.object_name, value.pk)
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    elif isinstance(value, dict):
+        return {six.text_type(k): normalize_cache_value(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [normalize_cache_value(v) for v in value]
+    elif isinstance(value, (set, frozenset)):
+        return sorted((normalize_cache_value(v) for v in value), key=json.dumps)
+    elif value is None or isinstance(value, (bool, float) + six.integer_types):
+        return value
+    return six.text_type(value)
+
+
+def get_result_cache_key(projects, environments, **kwargs):
+    value = normalize_cache_value(kwargs)
+    value['projects'] = sorted(p.id for p in projects)
+    value['environments'] = (
+        sorted(e.id for e in environments) if environments is not None else None
+    )
+    return 'search:results:{}'.format(
+        md5_text(json.dumps(value, sort_keys=True)).hexdigest(),
+    )
+
+
 class DjangoSearchBackend(SearchBackend):
+    def __init__(self, use_trigram_index=False, result_cache_ttl=0, **options):
+        # Enable after creating the indexes with ``sentry search create-index``.
+        self.use_trigram_index = use_trigram_index
+        # Results (the group IDs of a page and the pagination state) can be
+        # cached for a short time, so that many users looking at (and
+        # polling) the same stream are served without repeating the search.
+        # Group attributes are always fetched fresh.
+        self.result_cache_ttl = result_cache_ttl
+        super(DjangoSearchBackend, self).__init__(**options)
+
     def query(self, projects, tags=None, environments=None, sort_by='date', limit=100,
               cursor=None, count_hits=False, paginator_options=None, **parameters):
+        if not self.result_cache_ttl:
+            return self.__query(projects, tags, environments, sort_by, limit, cursor,
+                                count_hits, paginator_options, **parameters)
+
+        from sentry.models import Group
+
+        cache_key = get_result_cache_key(
+            projects,
+            environments,
+            tags=tags,
+            sort_by=sort_by,
+            limit=limit,
+            cursor=cursor,
+            count_hits=count_hits,
+            paginator_options=paginator_options,
+            parameters=parameters,
+        )
+
+        cached = cache.get(cache_key)
+        if cached is None:
+            metrics.incr('search.cache.miss')
+            result = self.__query(projects, tags, environments, sort_by, limit, cursor,
+                                  count_hits, paginator_options, **parameters)
+            cache.set(
+                cache_key,
+                (
+                    [group.id for group in result.results],
+                    result.next,
+                    result.prev,
+                    result.hits,
+                    result.max_hits,
+                ),
+                self.result_cache_ttl,
+            )
+            return result
+
+        metrics.incr('search.cache.hit')
+        group_ids, next, prev, hits, max_hits = cached
+        groups = Group.objects.in_bulk(group_ids)
+        return CursorResult(
+            [groups[id] for id in group_ids if id in groups],
+            next,
+            prev,
+            hits=hits,
+            max_hits=max_hits,
+        )
+
+    def __query(self, projects, tags, environments, sort_by, limit, cursor, count_hits,
+                paginator_options, **parameters):
 
         from sentry.models import Group, GroupAssignee, GroupStatus, GroupSubscription, Release
 
@@ -235,9 +356,7 @@ class DjangoSearchBackend(SearchBackend):
 
         group_queryset = QuerySetBuilder({
             'query': CallbackCondition(
-                lambda queryset, query: queryset.filter(
-                    Q(message__icontains=query) | Q(culprit__icontains=query),
-                ) if query else queryset,
+                functools.partial(message_filter, use_trigram_index=self.use_trigram_index),
             ),
             'status': CallbackCondition(
                 lambda queryset, status: queryset.filter(status=status),
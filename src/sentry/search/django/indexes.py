@@ -0,0 +1,59 @@
+"""
+sentry.search.django.indexes
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from contextlib import closing
+
+from django.db import connections, router
+
+from sentry.utils.db import is_postgres
+
+# Fields of ``Group`` that are searched by the free text ``query`` parameter.
+TRIGRAM_FIELDS = ('message', 'culprit')
+
+
+def get_trigram_indexes(model):
+    "Return ``(index name, column)`` pairs for the trigram indexes of a model."
+    table = model._meta.db_table
+    return [
+        (u'{}_{}_trgm'.format(table, field), model._meta.get_field_by_name(field)[0].column)
+        for field in TRIGRAM_FIELDS
+    ]
+
+
+def create_trigram_indexes(model):
+    """
+    Create the ``pg_trgm`` GIN indexes that allow searching the message and
+    culprit of groups with ``ILIKE`` without scanning the entire table.
+
+    The indexes are built concurrently, so this can be run while Sentry is
+    serving traffic, but creating the ``pg_trgm`` extension requires a
+    database user with the appropriate privileges.
+    """
+    using = router.db_for_write(model)
+    if not is_postgres(using):
+        raise RuntimeError('Trigram indexes are only supported with PostgreSQL.')
+
+    with closing(connections[using].cursor()) as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, column in get_trigram_indexes(model):
+            cursor.execute(
+                u'CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING gin ({} gin_trgm_ops)'.format(
+                    name, model._meta.db_table, column,
+                )
+            )
+
+
+def drop_trigram_indexes(model):
+    using = router.db_for_write(model)
+    if not is_postgres(using):
+        raise RuntimeError('Trigram indexes are only supported with PostgreSQL.')
+
+    with closing(connections[using].cursor()) as cursor:
+        for name, _ in get_trigram_indexes(model):
+            cursor.execute(u'DROP INDEX CONCURRENTLY IF EXISTS {}'.format(name))
@@ -86,6 +86,11 @@ def _make_index_backend(cluster=None):
             60 * 60 * 24 * 30,
             3,
             5000,
+            signature_cache_size=getattr(
+                settings,
+                'SENTRY_SIMILARITY_SIGNATURE_CACHE_SIZE',
+                100000,
+            ),
         ),
         scope_tag_name='project_id',
     )
@@ -13,6 +13,9 @@ class DummyIndexBackend(AbstractIndexBackend):
     def record(self, scope, key, items, timestamp=None):
         return {}
 
+    def record_multi(self, scope, items, timestamp=None):
+        return []
+
     def merge(self, scope, destination, items, timestamp=None):
         return False
 
@@ -4,6 +4,7 @@ import itertools
 import time
 
 from sentry.similarity.backends.abstract import AbstractIndexBackend
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.iterators import chunked
 from sentry.utils.redis import load_script
 
@@ -22,7 +23,8 @@ def flatten(value):
 
 class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
     def __init__(self, cluster, namespace, signature_builder,
-                 bands, interval, retention, candidate_set_limit):
+                 bands, interval, retention, candidate_set_limit,
+                 signature_cache_size=0):
         self.cluster = cluster
         self.namespace = namespace
         self.signature_builder = signature_builder
@@ -31,10 +33,36 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
         self.retention = retention
         self.candidate_set_limit = candidate_set_limit
 
+        # Events of the same issue frequently have identical features, so
+        # the band signatures of recently seen feature sets can be kept to
+        # avoid hashing every feature again. The feature sets themselves are
+        # used as keys, since that costs a small fraction of building the
+        # signature (unlike a digest of the features), so the cache is
+        # bounded by the total number of features it holds.
+        if signature_cache_size > 0:
+            self.signature_cache = LRUCache(
+                signature_cache_size,
+                weigher=lambda value: value[0],
+            )
+        else:
+            self.signature_cache = None
+
     def _build_signature_arguments(self, features):
         if not features:
             return [0] * self.bands
 
+        if self.signature_cache is None:
+            return self.__build_signature_arguments(features)
+
+        # Duplicate features and their order don't affect the signature.
+        features = frozenset(features)
+        value = self.signature_cache.get(features)
+        if value is None:
+            value = (len(features), self.__build_signature_arguments(features))
+            self.signature_cache.set(features, value)
+        return value[1]
+
+    def __build_signature_arguments(self, features):
         arguments = []
         for bucket in band(self.bands, self.signature_builder(features)):
             arguments.extend([1, ','.join(map('{}'.format, bucket)), 1])
@@ -151,6 +179,33 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
 
         return self.__index(scope, arguments)
 
+    def record_multi(self, scope, items, timestamp=None):
+        items = [(key, signatures) for key, signatures in items if signatures]
+        if not items:
+            return []  # nothing to do
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        arguments = [
+            'RECORD_MULTI',
+            timestamp,
+            self.namespace,
+            self.bands,
+            self.interval,
+            self.retention,
+            self.candidate_set_limit,
+            scope,
+        ]
+
+        for key, signatures in items:
+            arguments.extend([key, len(signatures)])
+            for idx, features in signatures:
+                arguments.append(idx)
+                arguments.extend(self._build_signature_arguments(features))
+
+        return self.__index(scope, arguments)
+
     def merge(self, scope, destination, items, timestamp=None):
         if timestamp is None:
             timestamp = int(time.time())
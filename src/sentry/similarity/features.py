@@ -4,6 +4,8 @@ import functools
 import itertools
 import logging
 
+from collections import OrderedDict
+
 from sentry.utils.dates import to_timestamp
 
 logger = logging.getLogger('sentry.similarity')
@@ -93,14 +95,16 @@ class FeatureSet(object):
                 )
         return results
 
-    def record(self, events):
-        if not events:
-            return []
-
+    def encode(self, events):
+        """
+        Extract and encode the features of events. The events may belong to
+        different groups, but all groups must be part of the same project.
+        Returns the scope of the project and a mapping of group keys to the
+        ``(alias, features)`` items that can be recorded in the index.
+        """
         scope = None
-        key = None
 
-        items = []
+        items = OrderedDict()
         for event in events:
             for label, features in self.extract(event).items():
                 if scope is None:
@@ -110,13 +114,6 @@ class FeatureSet(object):
                         event.project
                     ) == scope, 'all events must be associated with the same project'
 
-                if key is None:
-                    key = self.__get_key(event.group)
-                else:
-                    assert self.__get_key(
-                        event.group
-                    ) == key, 'all events must be associated with the same group'
-
                 try:
                     features = map(self.encoder.dumps, features)
                 except Exception as error:
@@ -132,14 +129,27 @@ class FeatureSet(object):
                     )
                 else:
                     if features:
-                        items.append((self.aliases[label], features, ))
+                        items.setdefault(self.__get_key(event.group), []).append(
+                            (self.aliases[label], features, ),
+                        )
 
-        return self.index.record(
-            scope,
-            key,
-            items,
-            timestamp=int(to_timestamp(event.datetime)),
-        )
+        return scope, items
+
+    def record(self, events):
+        if not events:
+            return []
+
+        scope, items = self.encode(events)
+        if not items:
+            return []
+
+        timestamp = int(to_timestamp(events[-1].datetime))
+
+        if len(items) == 1:
+            (key, signatures), = items.items()
+            return self.index.record(scope, key, signatures, timestamp=timestamp)
+
+        return self.index.record_multi(scope, list(items.items()), timestamp=timestamp)
 
     def classify(self, events, limit=None, thresholds=None):
         if not events:
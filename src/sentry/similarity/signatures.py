@@ -9,15 +9,16 @@ class MinHashSignatureBuilder(object):
         self.rows = rows
 
     def __call__(self, features):
-        return map(
-            lambda column: min(
-                map(
-                    lambda feature: mmh3.hash(
-                        feature,
-                        column,
-                    ) % self.rows,
-                    features,
-                ),
-            ),
-            range(self.columns),
-        )
+        # Duplicate features can't change the minimum for any column, so
+        # they're removed up front (shingles frequently repeat.) This also
+        # allows ``features`` to be any iterable, including generators.
+        features = set(features)
+
+        # This is a hot path when recording events, so avoid attribute
+        # lookups and function call overhead inside of the inner loop.
+        rows = self.rows
+        hash = mmh3.hash
+        return [
+            min([hash(feature, column) % rows for feature in features])
+            for column in range(self.columns)
+        ]
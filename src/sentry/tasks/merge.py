@@ -119,6 +119,12 @@ def merge_groups(
             transaction_id=transaction_id,
         )
 
+        # Drop any cached associations of the moved hashes with the old group.
+        GroupHash.clear_cache(
+            new_group.project_id,
+            list(GroupHash.objects.filter(group=new_group).values_list('hash', flat=True)),
+        )
+
         if not has_more:
             # There are no more objects to merge for *this* "from" group, remove it
             # from the list of "from" groups that are being merged, and finish the
@@ -0,0 +1,85 @@
+"""
+sentry.tasks.similarity
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+
+from sentry import options
+from sentry.similarity import features
+from sentry.tasks.base import instrumented_task
+from sentry.utils import json, metrics, redis
+from sentry.utils.dates import to_timestamp
+
+
+def record(event):
+    """
+    Records the features of an event in the similarity index, either right
+    away or, if batching is enabled, as part of a batch of events from the
+    same project.
+    """
+    batch_size = options.get('similarity.record-batch-size')
+    if batch_size <= 1:
+        features.record([event])
+        return
+
+    # Features are extracted here (rather than in the batch) since the event
+    # may not have been stored in the database, but signatures are built by
+    # the index when the batch is recorded.
+    scope, items = features.encode([event])
+    if not items:
+        return
+
+    # Feature values are arbitrary bytes, so they are base64 encoded to be
+    # stored as JSON.
+    record_batch_queue.push(json.dumps({
+        'scope': scope,
+        'timestamp': int(to_timestamp(event.datetime)),
+        'items': [
+            (group, [
+                (alias, [b64encode(value).decode('ascii') for value in values])
+                for alias, values in signatures
+            ]) for group, signatures in items.items()
+        ],
+    }), batch_size, project_id=event.project_id)
+
+
+@instrumented_task(name='sentry.tasks.similarity.record_batch', queue='similarity')
+def record_batch(project_id, **kwargs):
+    """
+    Records a batch of queued event features in the similarity index with
+    a single index call per scope.
+    """
+    batch_size = max(options.get('similarity.record-batch-size'), 1)
+    payloads = record_batch_queue.pop(batch_size, project_id=project_id)
+    if not payloads:
+        return
+
+    metrics.timing('similarity.record-batch.size', len(payloads))
+
+    batches = OrderedDict()
+    for payload in map(json.loads, payloads):
+        timestamp, items = batches.get(payload['scope'], (0, OrderedDict()))
+        for group, signatures in payload['items']:
+            items.setdefault(group, []).extend(
+                (alias, [b64decode(value) for value in values])
+                for alias, values in signatures
+            )
+        batches[payload['scope']] = (max(timestamp, payload['timestamp']), items)
+
+    for scope, (timestamp, items) in batches.items():
+        features.index.record_multi(scope, list(items.items()), timestamp=timestamp)
+
+
+record_batch_queue = redis.BatchQueue(
+    getattr(settings, 'SENTRY_SIMILARITY_BATCH_CLUSTER', 'default'),
+    u'similarity:record-batch:{project_id}',
+    record_batch,
+)
@@ -13,24 +13,30 @@ from datetime import datetime
 import six
 
 from time import time
+from django.conf import settings
 from django.utils import timezone
 
-from sentry import features, reprocessing
+from sentry import features, options, reprocessing
 from sentry.attachments import attachment_cache
 from sentry.cache import default_cache
 from sentry.tasks.base import instrumented_task
-from sentry.utils import metrics
+from sentry.utils import json, metrics, redis
 from sentry.utils.safe import safe_execute
 from sentry.stacktraces import process_stacktraces, \
     should_process_for_stacktraces
 from sentry.utils.canonical import CanonicalKeyDict, CANONICAL_TYPES
 from sentry.utils.dates import to_datetime
+from sentry.utils.db import query_counter
 from sentry.utils.sdk import configure_scope
 from sentry.models import EventAttachment, File, ProjectOption, Activity, Project
 
 error_logger = logging.getLogger('sentry.errors.events')
 info_logger = logging.getLogger('sentry.store')
 
+# Events queued for a batched save are spread over this many batches, by
+# project.
+SAVE_EVENT_BATCH_PARTITIONS = 16
+
 # Is reprocessing on or off by default?
 REPROCESSING_DEFAULT = False
 
@@ -75,6 +81,13 @@ def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
         scope.set_tag("project", project)
 
     if should_process(data):
+        if not cache_key:
+            # Events that were passed inline are only stored in the cache
+            # once they turn out to need processing, which works on the
+            # cached payload.
+            from sentry.coreapi import cache_key_for_event
+            cache_key = cache_key_for_event(data)
+            default_cache.set(cache_key, dict(data.items()), 3600)
         process_event.delay(cache_key=cache_key, start_time=start_time, event_id=event_id)
         return
 
@@ -82,10 +95,10 @@ def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
     # so we can jump directly to save_event
     if cache_key:
         data = None
-    save_event.delay(
-        cache_key=cache_key, data=data, start_time=start_time, event_id=event_id,
-        project_id=project
-    )
+    else:
+        # We cannot pass canonical types to tasks, so we need to downgrade this.
+        data = dict(data.items())
+    _enqueue_save_event(cache_key, data, start_time, event_id, project)
 
 
 @instrumented_task(
@@ -190,10 +203,7 @@ def _do_process_event(cache_key, start_time, event_id, process_task):
             data = dict(data.items())
         default_cache.set(cache_key, data, 3600)
 
-    save_event.delay(
-        cache_key=cache_key, data=None, start_time=start_time, event_id=event_id,
-        project_id=project
-    )
+    _enqueue_save_event(cache_key, None, start_time, event_id, project)
 
 
 @instrumented_task(
@@ -343,19 +353,27 @@ def save_attachment(event, attachment):
     )
 
 
-@instrumented_task(name='sentry.tasks.store.save_event', queue='events.save_event')
-def save_event(cache_key=None, data=None, start_time=None, event_id=None,
-               project_id=None, **kwargs):
-    """
-    Saves an event to the database.
-    """
-    from sentry.event_manager import HashDiscarded, EventManager
-    from sentry import quotas, tsdb
-    from sentry.models import ProjectKey
+def _enqueue_save_event(cache_key, data, start_time, event_id, project_id):
+    batch_size = options.get('store.save-event-batch-size')
+
+    # Events that are not stored in the cache are passed to the task
+    # directly, and can't be batched.
+    if batch_size <= 1 or not cache_key:
+        save_event.delay(
+            cache_key=cache_key, data=data, start_time=start_time, event_id=event_id,
+            project_id=project_id
+        )
+        return
+
+    save_event_batch_queue.push(json.dumps({
+        'cache_key': cache_key,
+        'start_time': start_time,
+        'event_id': event_id,
+        'project_id': project_id,
+    }), batch_size, partition=project_id % SAVE_EVENT_BATCH_PARTITIONS)
 
-    if cache_key:
-        data = default_cache.get(cache_key)
 
+def _get_save_event_data(data, event_id, project_id):
     if data is not None:
         data = CanonicalKeyDict(data)
 
@@ -386,6 +404,80 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None,
                 'reason': 'cache',
                 'stage': 'post'},
             skip_internal=False)
+        return None, project_id
+
+    return data, project_id
+
+
+def _save_event_attachments(cache_key, event):
+    # Always load attachments from the cache so we can later prune them.
+    # Only save them if the event-attachments feature is active, though.
+    if features.has('organizations:event-attachments', event.project.organization, actor=None):
+        attachments = attachment_cache.get(cache_key) or []
+        for attachment in attachments:
+            save_attachment(event, attachment)
+
+
+def _delete_event_attachments(cache_key, event):
+    # For the unlikely case that we did not manage to persist the
+    # event we also delete the key always.
+    if event is None or \
+       features.has('organizations:event-attachments', event.project.organization, actor=None):
+        attachment_cache.delete(cache_key)
+
+
+def _discard_event(data, start_time, project_id):
+    from sentry import quotas, tsdb
+    from sentry.models import ProjectKey
+
+    increment_list = [
+        (tsdb.models.project_total_received_discarded, project_id),
+    ]
+
+    try:
+        project = Project.objects.get_from_cache(id=project_id)
+    except Project.DoesNotExist:
+        pass
+    else:
+        increment_list.extend([
+            (tsdb.models.project_total_blacklisted, project.id),
+            (tsdb.models.organization_total_blacklisted, project.organization_id),
+        ])
+
+        project_key = None
+        if data.get('key_id') is not None:
+            try:
+                project_key = ProjectKey.objects.get_from_cache(id=data['key_id'])
+            except ProjectKey.DoesNotExist:
+                pass
+            else:
+                increment_list.append((tsdb.models.key_total_blacklisted, project_key.id))
+
+        quotas.refund(
+            project,
+            key=project_key,
+            timestamp=start_time,
+        )
+
+    tsdb.incr_multi(
+        increment_list,
+        timestamp=to_datetime(start_time) if start_time is not None else None,
+    )
+
+
+@instrumented_task(name='sentry.tasks.store.save_event', queue='events.save_event')
+def save_event(cache_key=None, data=None, start_time=None, event_id=None,
+               project_id=None, **kwargs):
+    """
+    Saves an event to the database.
+    """
+    from sentry.event_manager import HashDiscarded, EventManager
+
+    if cache_key:
+        data = default_cache.get(cache_key)
+
+    data, project_id = _get_save_event_data(data, event_id, project_id)
+    if not data:
         return
 
     with configure_scope() as scope:
@@ -394,62 +486,112 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None,
     event = None
     try:
         manager = EventManager(data)
+        queries = query_counter.count
         event = manager.save(project_id, assume_normalized=True)
+        metrics.timing('events.save.queries', query_counter.count - queries)
 
-        # Always load attachments from the cache so we can later prune them.
-        # Only save them if the event-attachments feature is active, though.
-        if features.has('organizations:event-attachments', event.project.organization, actor=None):
-            attachments = attachment_cache.get(cache_key) or []
-            for attachment in attachments:
-                save_attachment(event, attachment)
+        _save_event_attachments(cache_key, event)
 
     except HashDiscarded:
-        increment_list = [
-            (tsdb.models.project_total_received_discarded, project_id),
-        ]
-
-        try:
-            project = Project.objects.get_from_cache(id=project_id)
-        except Project.DoesNotExist:
-            pass
-        else:
-            increment_list.extend([
-                (tsdb.models.project_total_blacklisted, project.id),
-                (tsdb.models.organization_total_blacklisted, project.organization_id),
-            ])
-
-            project_key = None
-            if data.get('key_id') is not None:
-                try:
-                    project_key = ProjectKey.objects.get_from_cache(id=data['key_id'])
-                except ProjectKey.DoesNotExist:
-                    pass
-                else:
-                    increment_list.append((tsdb.models.key_total_blacklisted, project_key.id))
-
-            quotas.refund(
-                project,
-                key=project_key,
-                timestamp=start_time,
-            )
-
-        tsdb.incr_multi(
-            increment_list,
-            timestamp=to_datetime(start_time) if start_time is not None else None,
-        )
+        _discard_event(data, start_time, project_id)
 
     finally:
         if cache_key:
             default_cache.delete(cache_key)
-
-            # For the unlikely case that we did not manage to persist the
-            # event we also delete the key always.
-            if event is None or \
-               features.has('organizations:event-attachments', event.project.organization, actor=None):
-                attachment_cache.delete(cache_key)
+            _delete_event_attachments(cache_key, event)
 
         if start_time:
             metrics.timing(
                 'events.time-to-process',
                 time() - start_time,
                 instance=data['platform'])
+
+
+@instrumented_task(name='sentry.tasks.store.save_event_batch', queue='events.save_event')
+def save_event_batch(partition, **kwargs):
+    """
+    Saves a batch of queued events to the database.
+
+    Projects are loaded with a single query and each release is looked up
+    once per batch. The ``Event`` rows and their nodestore payloads are
+    written in bulk once all events of the batch have been grouped.
+    """
+    from sentry.event_manager import HashDiscarded, EventManager
+
+    batch_size = max(options.get('store.save-event-batch-size'), 1)
+    items = save_event_batch_queue.pop(batch_size, partition=partition)
+    if not items:
+        return
+
+    metrics.timing('events.save-batch.size', len(items))
+
+    # Saving events of the same project one after another makes the most of
+    # the caches used while saving.
+    items = sorted(map(json.loads, items), key=lambda item: item['project_id'])
+    cache_keys = [item['cache_key'] for item in items]
+    cached = default_cache.get_many(cache_keys)
+    projects = Project.objects.select_related('organization').in_bulk(
+        set(item['project_id'] for item in items),
+    )
+
+    releases = {}
+    jobs = []
+    events = {}
+    platforms = {}
+    try:
+        queries = query_counter.count
+        for item in items:
+            cache_key = item['cache_key']
+            data, project_id = _get_save_event_data(
+                cached.get(cache_key), item['event_id'], item['project_id'],
+            )
+            if not data:
+                continue
+
+            platforms[cache_key] = data['platform']
+            try:
+                project = projects[project_id]
+                manager = EventManager(data)
+                event, job = manager.prepare_save(
+                    project, assume_normalized=True, releases=releases,
+                )
+            except HashDiscarded:
+                _discard_event(data, item['start_time'], project_id)
+            except Exception:
+                error_logger.exception('save-batch.failed', extra={'cache_key': cache_key})
+            else:
+                if job is not None:
+                    jobs.append((cache_key, job))
+
+        saved = EventManager.save_prepared([prepared for _, prepared in jobs])
+        if saved:
+            metrics.timing(
+                'events.save.queries',
+                (query_counter.count - queries) / float(len(saved)),
+            )
+
+        saved = set(id(event) for event in saved)
+        for cache_key, job in jobs:
+            if id(job['event']) in saved:
+                events[cache_key] = job['event']
+                safe_execute(_save_event_attachments, cache_key, job['event'])
+
+    finally:
+        default_cache.delete_many(cache_keys)
+
+        for item in items:
+            cache_key = item['cache_key']
+            _delete_event_attachments(cache_key, events.get(cache_key))
+
+            if item['start_time'] and cache_key in platforms:
+                metrics.timing(
+                    'events.time-to-process',
+                    time() - item['start_time'],
+                    instance=platforms[cache_key])
+
+
+save_event_batch_queue = redis.BatchQueue(
+    getattr(settings, 'SENTRY_SAVE_EVENT_BATCH_CLUSTER', 'default'),
+    u'store:save-event-batch:{partition}',
+    save_event_batch,
+)
@@ -126,6 +126,7 @@ class BaseTSDB(Service):
         'merge_frequencies',
         'delete_frequencies',
         'flush',
+        'cleanup',
     ])
 
     __all__ = frozenset([
@@ -499,3 +500,10 @@ class BaseTSDB(Service):
         Delete all data.
         """
         raise NotImplementedError
+
+    def cleanup(self, timestamp=None):
+        """
+        Release the storage used by data that is past the retention of all
+        rollups, for backends that do not expire data on their own.
+        """
+        raise NotImplementedError
@@ -0,0 +1,918 @@
+"""
+sentry.tsdb.disk
+~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import fcntl
+import math
+import mmap
+import os
+import six
+import struct
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from django.utils import timezone
+
+from sentry.tsdb.base import BaseTSDB
+from sentry.utils import json
+from sentry.utils.hashlib import md5_text
+
+BUCKET = struct.Struct('<q')
+COUNTER_CELL = struct.Struct('<qq')
+FREQUENCY_ENTRY = struct.Struct('<Id')
+
+
+class RingFile(object):
+    """
+    A memory-mapped file of fixed-width rows. Every row holds one cell per
+    sample of a rollup, and a cell is addressed by ``bucket % samples``, so
+    each row is a ring buffer that overwrites itself as time passes. Cells
+    are prefixed with the bucket they were last written for, which allows
+    telling current cells apart from those left behind by a previous lap of
+    the ring.
+    """
+
+    # Number of rows the file is grown by when a row past its end is written.
+    growth = 1024
+
+    def __init__(self, path, samples, width):
+        self.path = path
+        self.samples = samples
+        self.width = width
+        self.cell_size = BUCKET.size + width
+        self.row_size = self.cell_size * samples
+        self.empty_row = b'\x00' * self.row_size
+
+        # Any reader may remap the file (which closes the current map), so all
+        # access to the map is serialized within the process.
+        self.__lock = threading.RLock()
+        self.__file = open(path, 'a+b')
+        self.__map = None
+        self.__rows = 0
+        self.__remap()
+
+    def __remap(self, rows=0):
+        with self.__lock:
+            self.__remap_locked(rows)
+
+    def __remap_locked(self, rows):
+        fileno = self.__file.fileno()
+        size = os.fstat(fileno).st_size
+        if size < rows * self.row_size:
+            size = (rows // self.growth + 1) * self.growth * self.row_size
+            self.__file.truncate(size)
+
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+
+        # Empty files cannot be mapped.
+        if size:
+            self.__map = mmap.mmap(fileno, size)
+        self.__rows = size // self.row_size
+
+    def read(self, row):
+        """
+        Return the raw contents of a row. Rows that have never been written
+        are returned as empty (all zero) rows.
+        """
+        with self.__lock:
+            if row >= self.__rows:
+                # Another process may have grown the file since it was mapped.
+                self.__remap()
+                if row >= self.__rows:
+                    return self.empty_row
+            offset = row * self.row_size
+            return self.__map[offset:offset + self.row_size]
+
+    def get(self, row, bucket, data=None):
+        """
+        Return the payload of the cell for ``bucket``, or ``None`` if the cell
+        currently belongs to a different bucket. ``data`` can be provided
+        to avoid reading the row again when retrieving several cells.
+        """
+        if data is None:
+            data = self.read(row)
+        offset = (bucket % self.samples) * self.cell_size
+        if BUCKET.unpack_from(data, offset)[0] != bucket:
+            return None
+        offset = offset + BUCKET.size
+        return data[offset:offset + self.width]
+
+    def items(self, row, data=None):
+        """
+        Return ``(bucket, payload)`` pairs for all cells of a row that have
+        been written to.
+        """
+        if data is None:
+            data = self.read(row)
+        items = []
+        for offset in six.moves.xrange(0, self.row_size, self.cell_size):
+            bucket = BUCKET.unpack_from(data, offset)[0]
+            if bucket:
+                start = offset + BUCKET.size
+                items.append((bucket, data[start:start + self.width]))
+        return items
+
+    def set(self, row, bucket, payload):
+        with self.__lock:
+            if row >= self.__rows:
+                self.__remap(row + 1)
+            offset = row * self.row_size + (bucket % self.samples) * self.cell_size
+            self.__map[offset:offset + self.cell_size] = BUCKET.pack(bucket) + payload
+
+    def clear(self, row, buckets=None):
+        """
+        Clear the cells of a row for the provided buckets, or the entire row
+        if no buckets are provided.
+        """
+        with self.__lock:
+            if row >= self.__rows:
+                return
+            offset = row * self.row_size
+            if buckets is None:
+                self.__map[offset:offset + self.row_size] = self.empty_row
+                return
+            data = self.read(row)
+            for bucket in buckets:
+                if self.get(row, bucket, data) is not None:
+                    start = offset + (bucket % self.samples) * self.cell_size
+                    self.__map[start:start + self.cell_size] = b'\x00' * self.cell_size
+
+    def reset(self):
+        """
+        Clear all rows. The file is zeroed in place rather than truncated,
+        since reading a mapping past the end of its file raises ``SIGBUS``
+        and other processes may still have the file mapped.
+        """
+        with self.__lock:
+            # Pick up rows added by other processes since the file was mapped.
+            self.__remap_locked(0)
+            if self.__map is None:
+                return
+            step = self.growth * self.row_size
+            for offset in six.moves.xrange(0, len(self.__map), step):
+                end = min(offset + step, len(self.__map))
+                self.__map[offset:end] = b'\x00' * (end - offset)
+
+
+class KeyIndex(object):
+    """
+    Assigns identifiers to keys. The assignments are stored as an append-only
+    log of JSON values that is shared between all processes using the same
+    directory: a plain value is assigned the next identifier (so for a log
+    that has never been compacted, the line number is the identifier), while
+    objects release identifiers (``{"free": id}``) or reassign released ones
+    (``{"id": id, "value": value}``.)
+
+    Released identifiers are reused before new ones are assigned, so the
+    number of identifiers is bounded by the peak number of live keys. The log
+    itself is only bounded by calling :meth:`compact`, which replaces it with
+    a file containing just the live assignments.
+    """
+
+    # Maximum age (in seconds) of the assignments used for lookups of keys
+    # that have an identifier, since another process may have released and
+    # reassigned it in the meantime.
+    refresh_interval = 1.0
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+        # Loading shares the file position and appends to the identifiers,
+        # so it must not run concurrently within the process.
+        self.__lock = threading.RLock()
+        self.__file = open(path, 'a+b')
+        self.__reset()
+
+    def __reset(self):
+        self.__position = 0
+        self.__refreshed = 0
+        self.__next = self.offset
+        self.__ids = {}
+        self.__values = {}
+        self.__free = set()
+
+    def __load(self):
+        with self.__lock:
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                inode = None
+            if inode is not None and inode != os.fstat(self.__file.fileno()).st_ino:
+                # The log has been compacted by another process, so it needs
+                # to be read again from the start.
+                self.__file.close()
+                self.__file = open(self.path, 'a+b')
+                self.__reset()
+
+            self.__refreshed = time.time()
+            self.__file.seek(self.__position)
+            for line in self.__file:
+                if not line.endswith(b'\n'):
+                    break  # incomplete write, will be read again later
+                self.__position += len(line)
+                self.__apply(json.loads(line.decode('utf-8')))
+
+    def __apply(self, record):
+        if not isinstance(record, dict):
+            id, value = self.__next, self.__decode(record)
+            self.__next += 1
+        elif 'next' in record:
+            # Header of a compacted log: every identifier below ``next`` that
+            # is not reassigned by a later record is free.
+            self.__next = record['next']
+            self.__free.update(six.moves.xrange(self.offset, self.__next))
+            return
+        elif 'free' in record:
+            value = self.__values.pop(record['free'], None)
+            if value is not None:
+                del self.__ids[value]
+                self.__free.add(record['free'])
+            return
+        else:
+            id, value = record['id'], self.__decode(record['value'])
+            self.__free.discard(id)
+        self.__ids[value] = id
+        self.__values[id] = value
+
+    def __decode(self, value):
+        if isinstance(value, list):
+            return tuple(self.__decode(v) for v in value)
+        return value
+
+    def __normalize(self, value):
+        # JSON loads strings back as text, so bytestrings are looked up (and
+        # written) as text as well.
+        if isinstance(value, six.binary_type):
+            return value.decode('utf-8', 'replace')
+        if isinstance(value, (list, tuple)):
+            return tuple(self.__normalize(v) for v in value)
+        return value
+
+    @contextmanager
+    def __locked(self):
+        with self.__lock:
+            while True:
+                file = self.__file
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                # Another process may have changed the assignments while we
+                # were waiting for the lock. If it compacted the log, loading
+                # closes the file we locked, so the new one needs locking.
+                self.__load()
+                if self.__file is file:
+                    break
+            try:
+                yield
+            finally:
+                if not file.closed:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def __write(self, records):
+        self.__file.seek(0, os.SEEK_END)
+        self.__file.write(b''.join(json.dumps(r).encode('utf-8') + b'\n' for r in records))
+        self.__file.flush()
+        self.__load()
+
+    def refresh(self):
+        "Read any assignments made by other processes."
+        self.__load()
+
+    def get(self, value):
+        "Return the identifier for a key, or ``None`` if it has none."
+        value = self.__normalize(value)
+        if value not in self.__ids or time.time() - self.__refreshed > self.refresh_interval:
+            self.__load()
+        return self.__ids.get(value)
+
+    def get_value(self, id):
+        if id not in self.__values:
+            self.__load()
+        return self.__values[id]
+
+    def get_or_create(self, value):
+        value = self.__normalize(value)
+        id = self.get(value)
+        if id is None:
+            with self.__locked():
+                id = self.__ids.get(value)
+                if id is None:
+                    if self.__free:
+                        self.__write([{'id': min(self.__free), 'value': value}])
+                    else:
+                        self.__write([value])
+                    id = self.__ids[value]
+        return id
+
+    def items(self):
+        "Return all ``(value, id)`` pairs that are currently assigned."
+        self.__load()
+        return list(self.__ids.items())
+
+    def free(self, ids):
+        """
+        Release identifiers so they can be reassigned. Callers are responsible
+        for clearing any data stored for them first.
+        """
+        with self.__locked():
+            self.__write([{'free': id} for id in ids if id in self.__values])
+
+    def compact(self):
+        """
+        Replace the log with one that only contains the live assignments.
+        Other processes pick up the new file the next time they load it.
+        """
+        with self.__locked():
+            path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(path, 'wb') as f:
+                f.write(json.dumps({'next': self.__next}).encode('utf-8') + b'\n')
+                for id, value in sorted(self.__values.items()):
+                    f.write(json.dumps({'id': id, 'value': value}).encode('utf-8') + b'\n')
+            os.rename(path, self.path)
+            self.__load()
+
+    def truncate(self):
+        with self.__lock:
+            self.__file.truncate(0)
+            self.__reset()
+
+
+class HyperLogLog(object):
+    """
+    Estimates distinct counts from ``2 ** precision`` one byte registers.
+    """
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.size = 1 << precision
+        if self.size >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.size)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.size]
+
+    def add(self, registers, values):
+        bits = 64 - self.precision
+        for value in values:
+            h = int(md5_text(value).hexdigest()[:16], 16)
+            index = h >> bits
+            rest = h & ((1 << bits) - 1)
+            rank = bits - rest.bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, registers, other):
+        for index, value in enumerate(other):
+            if value > registers[index]:
+                registers[index] = value
+
+    def count(self, registers):
+        estimate = self.alpha * self.size ** 2 / sum(2.0 ** -r for r in registers)
+        if estimate <= 2.5 * self.size:
+            zeros = sum(1 for r in registers if not r)
+            if zeros:
+                estimate = self.size * math.log(float(self.size) / zeros)
+        return int(round(estimate))
+
+
+class FrequencySummary(object):
+    """
+    Tracks the highest scoring members of a frequency table in a fixed number
+    of ``(member, score)`` entries. When a member needs to be added and all
+    entries are in use, the lowest scoring entry is replaced and the new
+    member inherits its score ("Space-Saving" algorithm), so scores of the
+    top members are overestimated rather than lost.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.width = FREQUENCY_ENTRY.size * capacity
+        self.format = struct.Struct('<' + 'Id' * capacity)
+
+    def decode(self, payload):
+        if payload is None:
+            return {}
+        values = self.format.unpack(payload)
+        return {values[i]: values[i + 1] for i in six.moves.xrange(0, len(values), 2) if values[i]}
+
+    def encode(self, scores):
+        values = []
+        for id, score in scores.items():
+            values.extend((id, score))
+        values.extend((0, 0.0) * (self.capacity - len(scores)))
+        return self.format.pack(*values)
+
+    def update(self, scores, items):
+        for id, score in items.items():
+            if id in scores:
+                scores[id] += score
+            elif len(scores) < self.capacity:
+                scores[id] = score
+            else:
+                minimum = min(scores, key=scores.get)
+                scores[id] = scores.pop(minimum) + score
+        return scores
+
+
+class DiskTSDB(BaseTSDB):
+    """
+    A time-series storage that keeps its data in memory-mapped files on the
+    local disk, intended for single-node installations that do not want to
+    run Redis for TSDB data.
+
+    Every rollup is stored as one file per data type, containing a ring
+    buffer row of fixed-width cells for every key: counters are stored as
+    integers, distinct counts as HyperLogLog registers and frequencies as a
+    fixed-size summary of the highest scoring members, so reading a series
+    only requires reading a single row per key.
+
+    Writes are serialized through a lock file, so it is safe to share the
+    directory between the processes of a single host (but not between
+    hosts.)
+
+    Rows are only released by :meth:`cleanup` (which is called by ``sentry
+    cleanup``), once none of their cells are within the retention of any
+    rollup. Released rows are reused for new keys, so the size of the files
+    is bounded by the peak number of keys written to within the retention.
+    """
+
+    def __init__(self, path='/tmp/sentry-tsdb', distinct_precision=8,
+                 frequency_capacity=32, **options):
+        super(DiskTSDB, self).__init__(**options)
+        self.path = path
+        self.hll = HyperLogLog(distinct_precision)
+        self.summary = FrequencySummary(frequency_capacity)
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self.__lock = threading.Lock()
+        self.__lock_file = open(os.path.join(path, 'lock'), 'a+b')
+
+        self.counters = self.__open('counters', COUNTER_CELL.size - BUCKET.size)
+        self.sets = self.__open('sets', self.hll.size)
+        self.frequencies = self.__open('frequencies', self.summary.width)
+        # Member identifiers start at 1, since 0 marks unused entries.
+        self.members = KeyIndex(os.path.join(path, 'members.idx'), offset=1)
+
+    def __open(self, name, width):
+        # The layout of a file depends on the number of samples and the cell
+        # width, so changing either starts with a new file.
+        index = KeyIndex(os.path.join(self.path, '{}.idx'.format(name)))
+        rings = {}
+        for rollup, samples in self.rollups.items():
+            rings[rollup] = RingFile(
+                os.path.join(
+                    self.path,
+                    '{}-{}-{}-{}.ring'.format(name, rollup, samples, width),
+                ),
+                samples,
+                width,
+            )
+        return index, rings
+
+    @contextmanager
+    def locked(self):
+        with self.__lock:
+            fcntl.flock(self.__lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                # Rows may have been released and reassigned by another
+                # process, so writes must not use outdated assignments.
+                for index in self.get_indexes():
+                    index.refresh()
+                yield
+            finally:
+                fcntl.flock(self.__lock_file.fileno(), fcntl.LOCK_UN)
+
+    def get_indexes(self):
+        return [index for index, _ in (self.counters, self.sets, self.frequencies)] + \
+            [self.members]
+
+    def get_row(self, storage, model, key, environment_id, create=False):
+        index, _ = storage
+        value = (model.value, key, environment_id)
+        if create:
+            return index.get_or_create(value)
+        return index.get(value)
+
+    def get_buckets(self, series, rollup):
+        return [self.normalize_ts_to_rollup(timestamp, rollup) for timestamp in series]
+
+    def read_rows(self, storage, model, key, environment_ids, rollup):
+        """
+        Return the raw rows for a key in all of the provided environments,
+        skipping environments that have no data.
+        """
+        _, rings = storage
+        ring = rings.get(rollup)
+        if ring is None:
+            return []
+        rows = []
+        for environment_id in environment_ids:
+            row = self.get_row(storage, model, key, environment_id)
+            if row is not None:
+                rows.append(ring.read(row))
+        return rows
+
+    def update(self, storage, model, key, environment_ids, timestamp, func):
+        """
+        Update the cell for ``timestamp`` in every rollup, for each of the
+        environments. ``func`` is called with the current payload of the cell
+        (or ``None``) and returns the new payload.
+        """
+        _, rings = storage
+        for environment_id in environment_ids:
+            row = self.get_row(storage, model, key, environment_id, create=True)
+            for rollup, ring in rings.items():
+                bucket = self.normalize_to_rollup(timestamp, rollup)
+                ring.set(row, bucket, func(ring.get(row, bucket)))
+
+    def merge_rows(self, storage, model, destination, sources, environment_ids, func):
+        """
+        Combine the cells of the source rows into the destination row and
+        clear the source rows. ``func`` is called with the destination and
+        source payloads of every cell that exists in both rows.
+        """
+        _, rings = storage
+        for environment_id in environment_ids:
+            target = self.get_row(storage, model, destination, environment_id, create=True)
+            for source in sources:
+                row = self.get_row(storage, model, source, environment_id)
+                if row is None:
+                    continue
+                for ring in rings.values():
+                    data = ring.read(target)
+                    for bucket, payload in ring.items(row):
+                        offset = (bucket % ring.samples) * ring.cell_size
+                        current = BUCKET.unpack_from(data, offset)[0]
+                        if current == bucket:
+                            ring.set(target, bucket, func(ring.get(target, bucket, data), payload))
+                        elif current < bucket:
+                            ring.set(target, bucket, payload)
+                    ring.clear(row)
+
+    def delete_rows(self, storage, models, keys, start, end, timestamp, environment_ids):
+        _, rings = storage
+        for rollup, series in self.get_active_series(start, end, timestamp).items():
+            ring = rings[rollup]
+            buckets = [self.normalize_to_rollup(t, rollup) for t in series]
+            for model in models:
+                for key in keys:
+                    for environment_id in environment_ids:
+                        row = self.get_row(storage, model, key, environment_id)
+                        if row is not None:
+                            ring.clear(row, buckets)
+
+    def get_environment_ids(self, environment_ids):
+        return (set(environment_ids) if environment_ids is not None else set()).union([None])
+
+    def incr(self, model, key, timestamp=None, count=1, environment_id=None):
+        self.incr_multi([(model, key)], timestamp, count, environment_id)
+
+    def incr_multi(self, items, timestamp=None, count=1, environment_id=None):
+        self.validate_arguments([model for model, key in items], [environment_id])
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        def increment(payload):
+            value = BUCKET.unpack(payload)[0] if payload is not None else 0
+            return BUCKET.pack(value + count)
+
+        with self.locked():
+            for model, key in items:
+                self.update(
+                    self.counters, model, key, set([environment_id, None]),
+                    timestamp, increment,
+                )
+
+    def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments([model], environment_ids)
+
+        def combine(payload, other):
+            return BUCKET.pack(BUCKET.unpack(payload)[0] + BUCKET.unpack(other)[0])
+
+        with self.locked():
+            self.merge_rows(self.counters, model, destination, sources, environment_ids, combine)
+
+    def delete(self, models, keys, start=None, end=None, timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments(models, environment_ids)
+
+        with self.locked():
+            self.delete_rows(self.counters, models, keys, start, end, timestamp, environment_ids)
+
+    def get_range(self, model, keys, start, end, rollup=None, environment_ids=None):
+        # Like the Redis backend, this only supports a single environment.
+        if environment_ids is not None and len(environment_ids) > 1:
+            raise NotImplementedError
+        environment_ids = [environment_ids[0] if environment_ids else None]
+
+        self.validate_arguments([model], environment_ids)
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key in keys:
+            values = [0] * len(buckets)
+            for data in self.read_rows(self.counters, model, key, environment_ids, rollup):
+                # Decode the entire row at once: even positions contain the
+                # bucket of a cell and odd positions contain its value.
+                cells = struct.unpack('<%dq' % (len(data) // BUCKET.size), data)
+                samples = len(cells) // 2
+                for i, bucket in enumerate(buckets):
+                    position = (bucket % samples) * 2
+                    if cells[position] == bucket:
+                        values[i] += cells[position + 1]
+            results[key] = list(zip(series, values))
+
+        return results
+
+    def record(self, model, key, values, timestamp=None, environment_id=None):
+        self.record_multi([(model, key, values)], timestamp, environment_id)
+
+    def record_multi(self, items, timestamp=None, environment_id=None):
+        self.validate_arguments([model for model, key, values in items], [environment_id])
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        with self.locked():
+            for model, key, values in items:
+                def add(payload):
+                    registers = bytearray(payload or self.hll.size)
+                    self.hll.add(registers, values)
+                    return bytes(registers)
+
+                self.update(self.sets, model, key, set([environment_id, None]), timestamp, add)
+
+    def get_registers(self, model, key, buckets, rollup, environment_id):
+        """
+        Return the registers for each of the buckets of a distinct counter.
+        """
+        _, rings = self.sets
+        results = [bytearray(self.hll.size) for i in range(len(buckets))]
+        for data in self.read_rows(self.sets, model, key, [environment_id], rollup):
+            for registers, bucket in zip(results, buckets):
+                payload = rings[rollup].get(None, bucket, data)
+                if payload is not None:
+                    self.hll.merge(registers, bytearray(payload))
+        return results
+
+    def get_distinct_counts_series(self, model, keys, start, end=None,
+                                   rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key in keys:
+            registers = self.get_registers(model, key, buckets, rollup, environment_id)
+            results[key] = [
+                (timestamp, self.hll.count(r)) for timestamp, r in zip(series, registers)
+            ]
+
+        return results
+
+    def get_distinct_counts_totals(self, model, keys, start, end=None,
+                                   rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key in keys:
+            total = bytearray(self.hll.size)
+            for registers in self.get_registers(model, key, buckets, rollup, environment_id):
+                self.hll.merge(total, registers)
+            results[key] = self.hll.count(total)
+
+        return results
+
+    def get_distinct_counts_union(self, model, keys, start, end=None,
+                                  rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        total = bytearray(self.hll.size)
+        for key in keys:
+            for registers in self.get_registers(model, key, buckets, rollup, environment_id):
+                self.hll.merge(total, registers)
+
+        return self.hll.count(total)
+
+    def merge_distinct_counts(self, model, destination, sources,
+                              timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments([model], environment_ids)
+
+        def combine(payload, other):
+            registers = bytearray(payload)
+            self.hll.merge(registers, bytearray(other))
+            return bytes(registers)
+
+        with self.locked():
+            self.merge_rows(self.sets, model, destination, sources, environment_ids, combine)
+
+    def delete_distinct_counts(self, models, keys, start=None, end=None,
+                               timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments(models, environment_ids)
+
+        with self.locked():
+            self.delete_rows(self.sets, models, keys, start, end, timestamp, environment_ids)
+
+    def record_frequency_multi(self, requests, timestamp=None, environment_id=None):
+        self.validate_arguments([model for model, request in requests], [environment_id])
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        with self.locked():
+            for model, request in requests:
+                for key, items in six.iteritems(request):
+                    items = {
+                        self.members.get_or_create(member): float(score)
+                        for member, score in items.items()
+                    }
+
+                    def add(payload):
+                        scores = self.summary.decode(payload)
+                        return self.summary.encode(self.summary.update(scores, items))
+
+                    self.update(
+                        self.frequencies, model, key, set([environment_id, None]),
+                        timestamp, add,
+                    )
+
+    def get_scores(self, model, key, buckets, rollup, environment_id):
+        """
+        Return the scores (by member identifier) for each of the buckets of a
+        frequency table.
+        """
+        _, rings = self.frequencies
+        results = [{} for i in range(len(buckets))]
+        for data in self.read_rows(self.frequencies, model, key, [environment_id], rollup):
+            results = [
+                self.summary.decode(rings[rollup].get(None, bucket, data))
+                for bucket in buckets
+            ]
+        return results
+
+    def get_most_frequent(self, model, keys, start, end=None,
+                          rollup=None, limit=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key in keys:
+            result = Counter()
+            for scores in self.get_scores(model, key, buckets, rollup, environment_id):
+                result.update(scores)
+            results[key] = [
+                (self.members.get_value(id), score) for id, score in result.most_common(limit)
+            ]
+
+        return results
+
+    def get_most_frequent_series(self, model, keys, start, end=None,
+                                 rollup=None, limit=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key in keys:
+            result = results[key] = []
+            for timestamp, scores in zip(
+                    series, self.get_scores(model, key, buckets, rollup, environment_id)):
+                result.append((timestamp, {
+                    self.members.get_value(id): score
+                    for id, score in Counter(scores).most_common(limit)
+                }))
+
+        return results
+
+    def get_frequency_series(self, model, items, start, end=None, rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_buckets(series, rollup)
+
+        results = {}
+        for key, members in items.items():
+            ids = {member: self.members.get(member) for member in members}
+            result = results[key] = []
+            for timestamp, scores in zip(
+                    series, self.get_scores(model, key, buckets, rollup, environment_id)):
+                result.append((timestamp, {
+                    member: scores.get(id, 0.0) for member, id in ids.items()
+                }))
+
+        return results
+
+    def get_frequency_totals(self, model, items, start, end=None, rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        results = {}
+
+        for key, series in six.iteritems(
+            self.get_frequency_series(model, items, start, end, rollup, environment_id)
+        ):
+            result = results[key] = {}
+            for timestamp, scores in series:
+                for member, score in scores.items():
+                    result[member] = result.get(member, 0.0) + score
+
+        return results
+
+    def merge_frequencies(self, model, destination, sources, timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments([model], environment_ids)
+
+        def combine(payload, other):
+            scores = self.summary.decode(payload)
+            return self.summary.encode(self.summary.update(scores, self.summary.decode(other)))
+
+        with self.locked():
+            self.merge_rows(self.frequencies, model, destination, sources, environment_ids, combine)
+
+    def delete_frequencies(self, models, keys, start=None, end=None,
+                           timestamp=None, environment_ids=None):
+        environment_ids = self.get_environment_ids(environment_ids)
+
+        self.validate_arguments(models, environment_ids)
+
+        with self.locked():
+            self.delete_rows(self.frequencies, models, keys, start, end, timestamp, environment_ids)
+
+    def flush(self):
+        # This discards all data. Ring files are cleared in place, but the
+        # key indexes are truncated, so this is only safe to use when no other
+        # processes are using the same directory.
+        with self.locked():
+            for index, rings in (self.counters, self.sets, self.frequencies):
+                index.truncate()
+                for ring in rings.values():
+                    ring.reset()
+            self.members.truncate()
+
+    def cleanup(self, timestamp=None):
+        """
+        Release the rows of keys that have no cells within the retention of
+        any rollup (and the frequency table members no longer referenced by
+        any cell), and compact the key indexes.
+        """
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        with self.locked():
+            members = set()
+            for storage in (self.counters, self.sets, self.frequencies):
+                index, rings = storage
+                expired = []
+                for _, row in index.items():
+                    live = False
+                    for rollup, ring in rings.items():
+                        cutoff = self.normalize_to_rollup(timestamp, rollup) - ring.samples
+                        buckets = []
+                        for bucket, payload in ring.items(row):
+                            if bucket <= cutoff:
+                                buckets.append(bucket)
+                                continue
+                            live = True
+                            if storage is self.frequencies:
+                                members.update(self.summary.decode(payload))
+                        # Cells past the retention could still be read by
+                        # queries for old ranges, so they are cleared to not
+                        # refer to members that are released below.
+                        if buckets:
+                            ring.clear(row, buckets)
+                    if not live:
+                        expired.append(row)
+                index.free(expired)
+
+            self.members.free([id for _, id in self.members.items() if id not in members])
+
+            for index in self.get_indexes():
+                index.compact()
@@ -22,6 +22,7 @@ from pkg_resources import resource_string
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options
 from sentry.utils.versioning import Version
@@ -36,6 +37,11 @@ CountMinScript = Script(
     resource_string('sentry', 'scripts/tsdb/cmsketch.lua'),
 )
 
+IncrScript = Script(
+    None,
+    resource_string('sentry', 'scripts/tsdb/incr.lua'),
+)
+
 
 class SuppressionWrapper(object):
     """\
@@ -124,6 +130,18 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop('enable_frequency_sketches', False)
+
+        # Counts of buckets that have ended can optionally be cached in process
+        # by ``get_range``. Increments to these buckets (such as for late
+        # events, or merges and deletions performed by other processes) may
+        # take up to ``range_cache_ttl`` seconds to become visible.
+        range_cache_ttl = options.pop('range_cache_ttl', 0)
+        range_cache_size = options.pop('range_cache_size', 100000)
+        if range_cache_ttl > 0:
+            self.range_cache = LRUCache(range_cache_size, ttl=range_cache_ttl)
+        else:
+            self.range_cache = None
+
         super(RedisTSDB, self).__init__(**options)
 
     def validate(self):
@@ -226,21 +244,39 @@ class RedisTSDB(BaseTSDB):
 
         for (cluster, durable), environment_ids in self.get_cluster_groups(
                 set([None, environment_id])):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+            get_host_for_key = cluster.get_router().get_host_for_key
+
+            # All of the counters that are stored on the same host are
+            # incremented by a single script invocation, so the fields are
+            # grouped by host and hash key first.
+            hosts = defaultdict(dict)
+            for rollup, max_values in six.iteritems(self.rollups):
+                expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                for model, key in items:
+                    for environment_id in environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id)
+                        hashes = hosts[get_host_for_key(hash_key)]
+                        if hash_key not in hashes:
+                            hashes[hash_key] = (expiry, [])
+                        hashes[hash_key][1].append(hash_field)
 
-            with manager as client:
-                for rollup, max_values in six.iteritems(self.rollups):
-                    for model, key in items:
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id)
-                            client.hincrby(hash_key, hash_field, count)
-                            client.expireat(
-                                hash_key,
-                                self.calculate_expiry(rollup, max_values, timestamp),
-                            )
+            commands = {}
+            for hashes in hosts.values():
+                keys = []
+                arguments = [count]
+                for hash_key, (expiry, fields) in six.iteritems(hashes):
+                    keys.append(hash_key)
+                    arguments.extend((expiry, len(fields)))
+                    arguments.extend(fields)
+                # Any of the keys can be used to route the command to the host.
+                commands[keys[0]] = [(IncrScript, keys, arguments)]
+
+            try:
+                cluster.execute_commands(commands)
+            except Exception:
+                if durable:
+                    raise
 
     def get_range(self, model, keys, start, end, rollup=None, environment_ids=None):
         """
@@ -261,20 +297,43 @@ class RedisTSDB(BaseTSDB):
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = map(to_datetime, series)
 
-        results = []
-        cluster, _ = self.get_cluster(environment_id)
-        with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id)
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(
-                            hash_key, hash_field)))
+        # Buckets that started before this timestamp have ended.
+        closed = to_timestamp(timezone.now()) - rollup
 
         results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+
+        # Fields that are stored in the same hash are fetched together.
+        fields_by_hash_key = defaultdict(list)
+        for key in keys:
+            for timestamp in series:
+                epoch = to_timestamp(timestamp)
+                if self.range_cache is not None and epoch < closed:
+                    count = self.range_cache.get(
+                        (model.value, rollup, epoch, key, environment_id),
+                    )
+                    if count is not None:
+                        results_by_key[key][epoch] = count
+                        continue
+
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id)
+                fields_by_hash_key[hash_key].append((epoch, key, hash_field))
+
+        cluster, _ = self.get_cluster(environment_id)
+        with cluster.map() as client:
+            results = []
+            for hash_key, fields in six.iteritems(fields_by_hash_key):
+                results.append((fields, client.hmget(hash_key, [f[2] for f in fields])))
+
+        for fields, counts in results:
+            for (epoch, key, _), count in zip(fields, counts.value):
+                count = int(count or 0)
+                results_by_key[key][epoch] = count
+                if self.range_cache is not None and epoch < closed:
+                    self.range_cache.set(
+                        (model.value, rollup, epoch, key, environment_id),
+                        count,
+                    )
 
         for key, points in six.iteritems(results_by_key):
             results_by_key[key] = sorted(points.items())
@@ -340,6 +399,9 @@ class RedisTSDB(BaseTSDB):
                                     ),
                                 )
 
+        if self.range_cache is not None:
+            self.range_cache.clear()
+
     def delete(self, models, keys, start=None, end=None, timestamp=None, environment_ids=None):
         environment_ids = (
             set(environment_ids) if environment_ids is not None else set()).union(
@@ -373,6 +435,9 @@ class RedisTSDB(BaseTSDB):
                                         hash_field,
                                     )
 
+        if self.range_cache is not None:
+            self.range_cache.clear()
+
     def record(self, model, key, values, timestamp=None, environment_id=None):
         self.validate_arguments([model], [environment_id])
 
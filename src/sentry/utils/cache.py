@@ -7,10 +7,13 @@ sentry.utils.cache
 """
 from __future__ import absolute_import, print_function
 
+import copy
 import functools
 
 from django.core.cache import cache
 
+from sentry.utils.datastructures import LRUCache
+
 default_cache = cache
 
 
@@ -79,3 +82,55 @@ class cached_for_request(memoize):
 
     def __get__(self, obj, type=None):
         return functools.partial(self.__call__, obj)
+
+
+class LocalCache(object):
+    """
+    A bounded, per-process cache in front of the shared cache.
+
+    Values are read from the process memory when possible and from the shared
+    cache otherwise, and written to both. Every caller gets its own copy of a
+    value, so changing it does not affect other callers.
+
+    Deleting a key only removes the local copy held by the current process.
+    Other processes keep serving the old value for up to ``ttl`` seconds, so
+    only values that are safe to use for that long after they were deleted
+    can be stored here.
+    """
+
+    def __init__(self, max_size, ttl, cache=cache):
+        self.local = LRUCache(max_size, ttl=ttl)
+        self.cache = cache
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self.cache.get(key)
+            if value is not None:
+                self.local.set(key, copy.copy(value))
+            return value
+        return copy.copy(value)
+
+    def set(self, key, value, timeout):
+        self.local.set(key, copy.copy(value))
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.cache.delete(key)
+
+    def clear(self):
+        self.local.clear()
+
+
+#: Caches environments and their project associations, which are looked up
+#: for every saved event and are only deleted together with their project or
+#: organization. A deleted environment can be served by other processes for
+#: up to a minute.
+relation_cache = LocalCache(10000, ttl=60)
+
+#: Caches the associations of groups and releases with environments, which
+#: are looked up for every saved event. They are deleted along with their
+#: group or release, so they are only kept in process memory for a few
+#: seconds: other processes can use a deleted association for that long.
+transient_relation_cache = LocalCache(10000, ttl=5)
@@ -12,35 +12,95 @@ import six
 from six.moves.urllib.parse import urlsplit, urlunsplit
 
 from sentry.constants import DEFAULT_SCRUBBED_FIELDS, FILTER_MASK, NOT_SCRUBBED_VALUES
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.safe import get_path
 
+# Marks the end of a container's children on the ``varmap`` stack.
+_LEAVE = object()
+
+# Compiled filters, keyed by the scrubbing options they were built from.
+_filter_cache = LRUCache(1000)
+
 
 def varmap(func, var, context=None, name=None):
     """
     Executes ``func(key_name, value)`` on all values
     recurisively discovering dict and list scoped
     values.
+
+    Containers are walked with an explicit stack rather than recursion, so
+    deeply nested values can't exhaust the interpreter's recursion limit.
     """
     if context is None:
         context = set()
 
-    objid = id(var)
-    if objid in context:
-        return func(name, '<...>')
-    context.add(objid)
-
-    if isinstance(var, dict):
-        ret = dict((k, varmap(func, v, context, k)) for k, v in six.iteritems(var))
-    elif isinstance(var, (list, tuple)):
-        # treat it like a mapping
-        if all(isinstance(v, (list, tuple)) and len(v) == 2 for v in var):
-            ret = [[k, varmap(func, v, context, k)] for k, v in var]
+    root = [None]
+    stack = [(var, name, root, 0)]
+    while stack:
+        value, name, parent, index = stack.pop()
+        if value is _LEAVE:
+            # All children of the container have been visited.
+            context.remove(name)
+            continue
+
+        objid = id(value)
+        if objid in context:
+            parent[index] = func(name, '<...>')
+            continue
+
+        if isinstance(value, dict):
+            ret = parent[index] = {}
+            children = [(v, k, ret, k) for k, v in six.iteritems(value)]
+        elif isinstance(value, (list, tuple)):
+            # treat it like a mapping
+            if all(isinstance(v, (list, tuple)) and len(v) == 2 for v in value):
+                ret = parent[index] = [[k, None] for k, _ in value]
+                children = [(v, k, ret[i], 1) for i, (k, v) in enumerate(value)]
+            else:
+                ret = parent[index] = [None] * len(value)
+                children = [(v, name, ret, i) for i, v in enumerate(value)]
         else:
-            ret = [varmap(func, f, context, name) for f in var]
-    else:
-        ret = func(name, var)
-    context.remove(objid)
-    return ret
+            parent[index] = func(name, value)
+            continue
+
+        context.add(objid)
+        stack.append((_LEAVE, objid, None, None))
+        # Children are pushed in reverse so they are visited in order.
+        stack.extend(reversed(children))
+
+    return root[0]
+
+
+def compile_fields(fields):
+    """
+    Compiles a set of field names into a single regular expression that
+    matches any string containing at least one of them.
+
+    The names are merged into a prefix tree first, so every position of the
+    input is only tested against the characters that can continue a match
+    rather than against every field in turn. Returns ``None`` if there are
+    no fields.
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        for char in field:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def build(node):
+        # A field that is a prefix of another one already matches any string
+        # the longer field would, so the remainder of the branch is dropped.
+        if None in node:
+            return ''
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:%s)' % '|'.join(branches)
+
+    if not tree:
+        return None
+    return re.compile(build(tree))
 
 
 class SensitiveDataFilter(object):
@@ -72,6 +132,24 @@ class SensitiveDataFilter(object):
             fields += DEFAULT_SCRUBBED_FIELDS
         self.exclude_fields = {f.lower() for f in exclude_fields}
         self.fields = set(fields)
+        self.fields_re = compile_fields(self.fields)
+
+    @classmethod
+    def for_options(cls, fields=None, include_defaults=True, exclude_fields=()):
+        """
+        Returns a filter for the given options, reusing a previously
+        compiled one if the options have not changed since.
+        """
+        key = (
+            tuple(sorted(set(f.lower() for f in filter(None, fields or ())))),
+            bool(include_defaults),
+            tuple(sorted(set(f.lower() for f in exclude_fields))),
+        )
+        instance = _filter_cache.get(key)
+        if instance is None:
+            instance = cls(key[0], key[1], key[2])
+            _filter_cache.set(key, instance)
+        return instance
 
     def apply(self, data):
         # TODO(dcramer): move this into each interface
@@ -130,11 +208,12 @@ class SensitiveDataFilter(object):
         else:
             str_value = ''
 
-        for field in self.fields:
-            if field in str_value:
-                return FILTER_MASK
-            if field in key and value not in NOT_SCRUBBED_VALUES:
-                return FILTER_MASK
+        if self.fields_re is None:
+            return value
+        if str_value and self.fields_re.search(str_value):
+            return FILTER_MASK
+        if key and self.fields_re.search(key) and value not in NOT_SCRUBBED_VALUES:
+            return FILTER_MASK
         return value
 
     def filter_stacktrace(self, data):
@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
-from collections import Hashable, MutableMapping
+from collections import Hashable, MutableMapping, OrderedDict
+from threading import Lock
+from time import time
 
 __unset__ = object()
 
@@ -61,3 +63,77 @@ class BidirectionalMapping(MutableMapping):
 
     def inverse(self):
         return self.__inverse.copy()
+
+
+class LRUCache(object):
+    """\
+    A bounded, thread safe associative data structure which evicts the least
+    recently used items once the total weight of its items exceeds
+    ``max_size``.
+
+    By default every item has a weight of one, so ``max_size`` is the maximum
+    number of items. A ``weigher`` function can be provided to bound the cache
+    by an approximate size (for example, bytes) instead. Items that are
+    heavier than ``max_size`` are never stored. If ``ttl`` is provided, items
+    expire that many seconds after they were last set.
+    """
+
+    def __init__(self, max_size, weigher=None, ttl=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.weigher = weigher
+        self.ttl = ttl
+        self.weight = 0
+        self.__data = OrderedDict()
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __contains__(self, key):
+        return self.get(key, __unset__) is not __unset__
+
+    def get(self, key, default=None):
+        with self.__lock:
+            item = self.__data.pop(key, None)
+            if item is None:
+                return default
+
+            value, weight, expires = item
+            if expires is not None and expires <= time():
+                self.weight -= weight
+                return default
+
+            # Reinserting the item marks it as the most recently used.
+            self.__data[key] = item
+            return value
+
+    def set(self, key, value):
+        weight = self.weigher(value) if self.weigher is not None else 1
+        expires = time() + self.ttl if self.ttl is not None else None
+
+        with self.__lock:
+            previous = self.__data.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[1]
+
+            if weight > self.max_size:
+                return
+
+            self.__data[key] = (value, weight, expires)
+            self.weight += weight
+
+            while self.weight > self.max_size:
+                _, (_, evicted_weight, _) = self.__data.popitem(last=False)
+                self.weight -= evicted_weight
+
+    def delete(self, key):
+        with self.__lock:
+            previous = self.__data.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[1]
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.weight = 0
@@ -8,6 +8,7 @@ sentry.utils.db
 from __future__ import absolute_import
 
 import six
+import threading
 from contextlib import contextmanager, closing
 
 from django.conf import settings
@@ -15,6 +16,17 @@ from django.db import connections, DEFAULT_DB_ALIAS
 from django.db.models.fields.related import SingleRelatedObjectDescriptor
 
 
+class QueryCounter(threading.local):
+    """
+    Counts the queries executed by the current thread. Only queries executed
+    through the ``sentry.db.postgres`` backend are counted.
+    """
+    count = 0
+
+
+query_counter = QueryCounter()
+
+
 def get_db_engine(alias='default'):
     value = settings.DATABASES[alias]['ENGINE']
     if value == 'mysql.connector.django':
@@ -37,3 +37,11 @@ def mad(values, K=1.4826):
     # http://en.wikipedia.org/wiki/Median_absolute_deviation
     med = median(values)
     return K * median([abs(val - med) for val in values])
+
+
+def percentile(values, p):
+    "Return the ``p``th percentile of a sorted list of values."
+    if not values:
+        return 0
+    index = int(round(p / 100.0 * (len(values) - 1)))
+    return values[index]
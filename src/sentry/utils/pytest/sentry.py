@@ -258,3 +258,10 @@ def pytest_runtest_teardown(item):
     from sentry.models import OrganizationOption, ProjectOption, UserOption
     for model in (OrganizationOption, ProjectOption, UserOption):
         model.objects.clear_local_cache()
+
+    from sentry.lang.javascript.processor import parsed_source_cache
+    parsed_source_cache.clear()
+
+    from sentry.utils.cache import transient_relation_cache, relation_cache
+    relation_cache.clear()
+    transient_relation_cache.clear()
@@ -235,3 +235,56 @@ def load_script(path):
         return script(keys, args, client)
 
     return call_script
+
+
+class BatchQueue(object):
+    """
+    A Redis list which collects items for ``task`` to process in batches.
+
+    The first item pushed to an empty queue schedules the task after
+    ``countdown`` seconds, so that items are processed even if the batch
+    never fills up, and every full batch schedules it right away. The task
+    is called with the keyword arguments that identify the queue and is
+    expected to ``pop`` the next batch, which schedules it again while items
+    remain.
+
+    >>> queue = BatchQueue('default', u'example:{project_id}', task)
+    >>> queue.push(item, batch_size=100, project_id=project.id)
+    """
+
+    def __init__(self, cluster, key_format, task, countdown=1, ttl=60 * 60):
+        self.cluster = cluster
+        self.key_format = key_format
+        self.task = task
+        self.countdown = countdown
+        self.ttl = ttl
+
+    def _get_client(self, key):
+        return clusters.get(self.cluster).get_local_client_for_key(key)
+
+    def push(self, item, batch_size, **kwargs):
+        key = self.key_format.format(**kwargs)
+        with self._get_client(key).pipeline() as pipe:
+            pipe.rpush(key, item)
+            pipe.expire(key, self.ttl)
+            length = pipe.execute()[0]
+
+        if length == 1:
+            self.task.apply_async(kwargs=kwargs, countdown=self.countdown)
+        elif length % batch_size == 0:
+            self.task.delay(**kwargs)
+
+    def pop(self, batch_size, **kwargs):
+        key = self.key_format.format(**kwargs)
+        with self._get_client(key).pipeline() as pipe:
+            pipe.lrange(key, 0, batch_size - 1)
+            pipe.ltrim(key, batch_size, -1)
+            pipe.llen(key)
+            items, _, remaining = pipe.execute()
+
+        if remaining >= batch_size:
+            self.task.delay(**kwargs)
+        elif remaining:
+            self.task.apply_async(kwargs=kwargs, countdown=self.countdown)
+
+        return items
@@ -186,6 +186,7 @@ def process_event(event_manager, project, key, remote_addr, helper, attachments)
         project.organization_id)
 
     data = event_manager.get_data()
+    data_size = event_manager.get_data_size()
     del event_manager
 
     event_id = data['event_id']
@@ -220,7 +221,7 @@ def process_event(event_manager, project, key, remote_addr, helper, attachments)
         scrub_defaults = (org_options.get('sentry:require_scrub_defaults', False) or
                           project.get_option('sentry:scrub_defaults', True))
 
-        SensitiveDataFilter(
+        SensitiveDataFilter.for_options(
             fields=sensitive_fields,
             include_defaults=scrub_defaults,
             exclude_fields=exclude_fields,
@@ -231,7 +232,9 @@ def process_event(event_manager, project, key, remote_addr, helper, attachments)
         helper.ensure_does_not_have_ip(data)
 
     # mutates data (strips a lot of context if not queued)
-    helper.insert_data_to_database(data, start_time=start_time, attachments=attachments)
+    helper.insert_data_to_database(
+        data, start_time=start_time, attachments=attachments, data_size=data_size,
+    )
 
     cache.set(cache_key, '', 60 * 5)
 
@@ -66,3 +66,34 @@ class BufferTest(TestCase):
         self.buf.process(ReleaseProject, columns, filters)
         release_project_ = ReleaseProject.objects.get(id=release_project.id)
         assert release_project_.new_groups == 1
+
+    def test_process_batch_saves_data(self):
+        project = self.create_project()
+        group = self.create_group(project=project)
+        other = self.create_group(project=project)
+        the_date = (timezone.now() + timedelta(days=5)).replace(microsecond=0)
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'id': group.id}, {'last_seen': the_date}),
+            ({'times_seen': 1}, {'id': other.id}, {'last_seen': the_date}),
+            ({'times_seen': 1}, {'message': 'foo bar', 'project_id': project.id}, None),
+        ])
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen.replace(microsecond=0) == the_date
+        assert Group.objects.get(id=other.id).times_seen == other.times_seen + 1
+        assert Group.objects.get(message='foo bar').times_seen == 2
+
+    @mock.patch('sentry.buffer.base.Buffer.process')
+    def test_process_batch_falls_back_for_missing_rows(self, process):
+        self.buf.process_batch(Group, [
+            ({'times_seen': 1}, {'id': 0}, None),
+        ])
+        process.assert_called_once_with(self.buf, Group, {'times_seen': 1}, {'id': 0}, {})
+
+    @mock.patch('sentry.buffer.base.bulk_update_values', mock.Mock(side_effect=Exception))
+    def test_process_batch_falls_back_when_bulk_update_fails(self):
+        group = self.create_group()
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'id': group.id}, None),
+        ])
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 2
@@ -2,7 +2,6 @@
 
 from __future__ import absolute_import
 
-import pytest
 import mock
 
 from datetime import datetime
@@ -10,6 +9,7 @@ from django.utils import timezone
 from sentry.buffer.redis import RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
+from sentry.utils import json
 
 
 class RedisBufferTest(TestCase):
@@ -93,8 +93,58 @@ class RedisBufferTest(TestCase):
         self.buf.process('foo')
         process.assert_called_once_with(Group, columns, filters, extra)
 
-    # this test should be passing once we no longer serialize using pickle
-    @pytest.mark.xfail
+    @mock.patch('sentry.buffer.redis.process_incr')
+    @mock.patch('sentry.buffer.base.Buffer.process_batch')
+    def test_process_pending_bulk(self, process_batch, process_incr):
+        self.buf.bulk_flush = True
+        with self.buf.cluster.map() as client:
+            client.hmset('foo', {
+                'f': '{"pk": ["i","1"]}',
+                'i+times_seen': '2',
+                'm': 'sentry.models.Group',
+            })
+            client.hmset('bar', {
+                'e+foo': '["s","bar"]',
+                'f': '{"pk": ["i","2"]}',
+                'i+times_seen': '1',
+                'm': 'sentry.models.Group',
+            })
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2, 'bar')
+            client.zadd('b:p', 3, 'baz')
+        self.buf.process_pending()
+        assert len(process_incr.apply_async.mock_calls) == 0
+        process_batch.assert_called_once_with(Group, [
+            ({'times_seen': 2}, {'pk': 1}, {}),
+            ({'times_seen': 1}, {'pk': 2}, {'foo': 'bar'}),
+        ])
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == []
+        assert not client.exists('foo')
+        assert not client.exists('bar')
+
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    @mock.patch('sentry.buffer.base.Buffer.process_batch')
+    def test_process_pending_bulk_skips_invalid_payloads(self, process_batch):
+        self.buf.bulk_flush = True
+        with self.buf.cluster.map() as client:
+            client.hmset('foo', {
+                'f': '{"pk": ["i","1"]}',
+                'i+times_seen': '2',
+                'm': 'sentry.models.DoesNotExist',
+            })
+            client.hmset('bar', {
+                'f': '{"pk": ["i","2"]}',
+                'i+times_seen': '1',
+                'm': 'sentry.models.Group',
+            })
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2, 'bar')
+        self.buf.process_pending()
+        process_batch.assert_called_once_with(Group, [
+            ({'times_seen': 1}, {'pk': 2}, {}),
+        ])
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
     def test_incr_saves_to_redis(self):
@@ -106,10 +156,13 @@ class RedisBufferTest(TestCase):
         filters = {'pk': 1, 'datetime': now}
         self.buf.incr(model, columns, filters, extra={'foo': 'bar', 'datetime': now})
         result = client.hgetall('foo')
+        assert json.loads(result.pop('f')) == {
+            'pk': ['i', '1'],
+            'datetime': ['d', '1493791566.000000'],
+        }
         assert result == {
             'e+foo': '["s","bar"]',
             'e+datetime': '["d","1493791566.000000"]',
-            'f': '{"pk":["i","1"],"datetime":["d","1493791566.000000"]}',
             'i+times_seen': '1',
             'm': 'mock.mock.Mock',
         }
@@ -117,16 +170,58 @@ class RedisBufferTest(TestCase):
         assert pending == ['foo']
         self.buf.incr(model, columns, filters, extra={'foo': 'baz'})
         result = client.hgetall('foo')
+        assert json.loads(result.pop('f')) == {
+            'pk': ['i', '1'],
+            'datetime': ['d', '1493791566.000000'],
+        }
         assert result == {
             'e+foo': '["s","baz"]',
             'e+datetime': '["d","1493791566.000000"]',
-            'f': '{"pk":["i","1"],"datetime":["d","1493791566.000000"]}',
             'i+times_seen': '2',
             'm': 'mock.mock.Mock',
         }
         pending = client.zrange('b:p', 0, -1)
         assert pending == ['foo']
 
+    @mock.patch('sentry.buffer.redis.RedisBuffer.connect_signals', mock.Mock())
+    def test_incr_coalesces_locally(self):
+        buf = RedisBuffer(local_buffer_size=2, local_buffer_interval=60)
+        client = buf.cluster.get_routing_client()
+        buf.incr(Group, {'times_seen': 1}, {'pk': 1}, extra={'message': 'foo'})
+        buf.incr(Group, {'times_seen': 2}, {'pk': 1}, extra={'message': 'bar'})
+        assert client.zrange('b:p', 0, -1) == []
+
+        # a second distinct key fills up the local buffer
+        buf.incr(Group, {'times_seen': 1}, {'pk': 2})
+        key = buf._make_key(Group, {'pk': 1})
+        assert sorted(client.zrange('b:p', 0, -1)) == sorted([key, buf._make_key(Group, {'pk': 2})])
+        assert client.hget(key, 'i+times_seen') == '3'
+        assert client.hget(key, 'e+message') == '["s","bar"]'
+        assert buf.local_buffer.entries == {}
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer.connect_signals', mock.Mock())
+    def test_flush_local_buffer(self):
+        buf = RedisBuffer(local_buffer_size=10, local_buffer_interval=60)
+        client = buf.cluster.get_routing_client()
+        buf.incr(Group, {'times_seen': 1}, {'pk': 1})
+        buf.maybe_flush_local_buffer()
+        assert client.zrange('b:p', 0, -1) == []
+        buf.flush_local_buffer()
+        key = buf._make_key(Group, {'pk': 1})
+        assert client.zrange('b:p', 0, -1) == [key]
+        assert client.hget(key, 'i+times_seen') == '1'
+
+    def test_dump_value_roundtrip(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, 123456, tzinfo=timezone.utc)
+        for value in ('bar', 1, 0.1, True, False, None, now, {'type': 'default'}):
+            payload = json.loads(json.dumps(self.buf._dump_value(value)))
+            assert self.buf._load_value(payload) == value
+
+    def test_dump_value_non_ascii_bytes(self):
+        for value, expected in ((b'\xe2\x80\x9d', u'\u201d'), (b'foo\xff', u'foo\ufffd')):
+            payload = json.loads(json.dumps(self.buf._dump_value(value)))
+            assert self.buf._load_value(payload) == expected
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.redis.process_incr')
     @mock.patch('sentry.buffer.redis.process_pending')
@@ -2,16 +2,24 @@
 
 from __future__ import absolute_import
 
+import base64
+import gzip
+import mock
 import six
 import pytest
+import zlib
 
 from sentry.coreapi import (
     APIError,
+    APIPayloadTooLarge,
     APIUnauthorized,
     Auth,
     ClientApiHelper,
     ClientAuthHelper,
+    decode_and_decompress_data,
     decode_data,
+    decompress_deflate,
+    decompress_gzip,
     safely_load_json_string
 )
 from sentry.interfaces.base import get_interface
@@ -55,6 +63,102 @@ class ProjectIdFromAuthTest(BaseAPITest):
             self.helper.project_id_from_auth(auth)
 
 
+class InsertDataToDatabaseTest(BaseAPITest):
+    def setUp(self):
+        super(InsertDataToDatabaseTest, self).setUp()
+        self.data = {
+            'project': self.project.id,
+            'event_id': 'a' * 32,
+            'message': 'hello world',
+        }
+
+    @mock.patch('sentry.coreapi.preprocess_event')
+    @mock.patch('sentry.coreapi.default_cache')
+    def test_cached(self, mock_default_cache, mock_preprocess_event):
+        self.helper.insert_data_to_database(self.data, start_time=1)
+
+        cache_key = u'e:{}:{}'.format(self.data['event_id'], self.project.id)
+        mock_default_cache.set.assert_called_once_with(cache_key, self.data, 3600)
+        mock_preprocess_event.delay.assert_called_once_with(
+            cache_key=cache_key, start_time=1, event_id=self.data['event_id'],
+        )
+
+    @mock.patch('sentry.coreapi.preprocess_event')
+    @mock.patch('sentry.coreapi.default_cache')
+    def test_inline(self, mock_default_cache, mock_preprocess_event):
+        with self.options({'store.inline-event-max-size': 1000}):
+            self.helper.insert_data_to_database(self.data, start_time=1, data_size=100)
+
+        assert not mock_default_cache.set.called
+        mock_preprocess_event.delay.assert_called_once_with(
+            data=self.data, start_time=1, event_id=self.data['event_id'],
+        )
+
+    @mock.patch('sentry.coreapi.preprocess_event')
+    @mock.patch('sentry.coreapi.default_cache')
+    def test_inline_too_large(self, mock_default_cache, mock_preprocess_event):
+        with self.options({'store.inline-event-max-size': 10}):
+            self.helper.insert_data_to_database(self.data, start_time=1, data_size=100)
+
+        assert mock_default_cache.set.call_count == 1
+        assert 'cache_key' in mock_preprocess_event.delay.call_args[1]
+
+    @mock.patch('sentry.coreapi.preprocess_event')
+    @mock.patch('sentry.coreapi.default_cache')
+    def test_inline_unknown_size(self, mock_default_cache, mock_preprocess_event):
+        with self.options({'store.inline-event-max-size': 1000}):
+            self.helper.insert_data_to_database(self.data, start_time=1)
+
+        assert mock_default_cache.set.call_count == 1
+        assert 'cache_key' in mock_preprocess_event.delay.call_args[1]
+
+
+class DecompressTest(TestCase):
+    def gzip(self, data):
+        fp = six.BytesIO()
+        with gzip.GzipFile(fileobj=fp, mode='wb') as f:
+            f.write(data)
+        return fp.getvalue()
+
+    def test_deflate(self):
+        assert decompress_deflate(zlib.compress(b'{"foo": "bar"}')) == u'{"foo": "bar"}'
+
+        with pytest.raises(APIError):
+            decompress_deflate(b'{"foo": "bar"}')
+
+    def test_gzip(self):
+        assert decompress_gzip(self.gzip(b'{"foo": "bar"}')) == u'{"foo": "bar"}'
+
+        # Concatenated members are decompressed as a whole.
+        assert decompress_gzip(self.gzip(b'{"foo": ') + self.gzip(b'"bar"}')) == \
+            u'{"foo": "bar"}'
+
+        with pytest.raises(APIError):
+            decompress_gzip(b'{"foo": "bar"}')
+
+    def test_base64(self):
+        data = b'{"foo": "bar"}'
+        assert decode_and_decompress_data(base64.b64encode(zlib.compress(data))) == \
+            u'{"foo": "bar"}'
+        assert decode_and_decompress_data(base64.b64encode(data)) == u'{"foo": "bar"}'
+
+    def test_max_size(self):
+        data = b'{"foo": "%s"}' % (b'x' * 1024 * 1024, )
+
+        with self.settings(SENTRY_MAX_EVENT_SIZE=1024 * 1024):
+            with pytest.raises(APIPayloadTooLarge):
+                decompress_deflate(zlib.compress(data))
+            with pytest.raises(APIPayloadTooLarge):
+                decompress_gzip(self.gzip(data))
+            with pytest.raises(APIPayloadTooLarge):
+                decode_and_decompress_data(base64.b64encode(zlib.compress(data)))
+            with pytest.raises(APIPayloadTooLarge):
+                decode_data(data)
+
+        with self.settings(SENTRY_MAX_EVENT_SIZE=2 * 1024 * 1024):
+            assert len(decompress_deflate(zlib.compress(data))) == len(data)
+
+
 def test_safely_load_json_string_valid_payload():
     data = safely_load_json_string('{"foo": "bar"}')
     assert data == {'foo': 'bar'}
@@ -24,6 +24,7 @@ from sentry.models import (
 )
 from sentry.signals import event_discarded, event_saved
 from sentry.testutils import assert_mock_called_once_with_partial, TransactionTestCase
+from sentry.utils import json
 from sentry.utils.data_filters import FilterStatKeys
 
 
@@ -54,6 +55,12 @@ class EventManagerTest(TransactionTestCase):
         event = manager.save(1)
         assert event.data['key_id'] == 12345
 
+    def test_data_size(self):
+        payload = json.dumps(make_event())
+        assert EventManager(payload).get_data_size() == len(payload)
+        assert EventManager(payload.encode('utf-8')).get_data_size() == len(payload)
+        assert EventManager(make_event()).get_data_size() is None
+
     def test_similar_message_prefix_doesnt_group(self):
         # we had a regression which caused the default hash to just be
         # 'event.message' instead of '[event.message]' which caused it to
@@ -1228,6 +1235,37 @@ class EventManagerTest(TransactionTestCase):
             signal=event_discarded,
         )
 
+    def test_cached_hashes_of_deleted_group(self):
+        for event_id in ('a' * 32, 'b' * 32):
+            manager = EventManager(
+                make_event(
+                    message='foo',
+                    event_id=event_id,
+                    fingerprint=['a' * 32],
+                )
+            )
+            with self.tasks():
+                event = manager.save(1)
+
+        # The second event cached the association of the hash with the group,
+        # which is now removed without clearing the cache.
+        group_id = event.group_id
+        GroupHash.objects.filter(group_id=group_id).delete()
+        Group.objects.filter(id=group_id).delete()
+
+        manager = EventManager(
+            make_event(
+                message='foo',
+                event_id='c' * 32,
+                fingerprint=['a' * 32],
+            )
+        )
+        with self.tasks():
+            event = manager.save(1)
+
+        assert event.group_id != group_id
+        assert GroupHash.objects.filter(group_id=event.group_id).exists()
+
     def test_event_saved_signal(self):
         mock_event_saved = mock.Mock()
         event_saved.connect(mock_event_saved)
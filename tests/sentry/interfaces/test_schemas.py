@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+import copy
+import mock
+import pytest
+
+from sentry.interfaces import schemas
+from sentry.interfaces.schemas import (
+    INTERFACE_SCHEMAS, UnsupportedSchema, compile_schema, compiled_validator_for_interface,
+    validate_and_default_interface, validator_for_interface
+)
+from sentry.testutils import TestCase
+
+EVENTS = [
+    {
+        'event_id': 'a' * 32,
+        'platform': 'python',
+        'level': 'error',
+        'message': 'hello world',
+        'timestamp': 1500000000.0,
+        'tags': [['foo', 'bar']],
+        'fingerprint': ['{{ default }}'],
+        'extra': {'foo': 'bar'},
+    },
+    {
+        'event_id': 'a' * 32,
+        'platform': 'python',
+        'timestamp': '2018-01-01T00:00:00Z',
+        'level': 40,
+        'sdk': {'name': 'sentry-python', 'version': '1.0'},
+    },
+    {
+        'event_id': 'a' * 32,
+        'platform': 'not-a-platform',
+        'level': 'bad level',
+        'environment': 'a/b',
+        'release': 'a' * 201,
+        'time_spent': -1,
+        'fingerprint': [1],
+        'extra': 'not an object',
+    },
+    {'event_id': 'a' * 32, 'platform': 'python', 'timestamp': 'yesterday'},
+]
+
+TAGS = [
+    [['foo', 'bar'], ['baz', 'qux']],
+    [['foo', 'bar', 'baz']],
+    [['release', '1.0']],
+    [['foo bar', 'baz']],
+    [['foo', 'bar\nbaz']],
+    [['foo', True]],
+]
+
+FRAMES = [
+    {'filename': 'foo.py', 'lineno': 1, 'in_app': True, 'vars': {'foo': 'bar'}},
+    {'filename': 'foo.py', 'lineno': True},
+    {'filename': 'foo.py', 'unknown': 'key'},
+    {'platform': 'not-a-platform'},
+]
+
+
+def test_compile_schema():
+    validate = compile_schema({
+        'type': 'object',
+        'properties': {
+            'number': {'type': 'number', 'minimum': 0},
+            'string': {'type': 'string', 'pattern': '^[a-z]+$', 'maxLength': 3},
+            'pair': {'type': 'array', 'minItems': 2, 'maxItems': 2},
+        },
+        'patternProperties': {'^x-': {'enum': ['x', 'y']}},
+        'required': ['number'],
+        'additionalProperties': False,
+    })
+    assert validate({'number': 1, 'string': 'abc', 'pair': [1, 2], 'x-foo': 'x'})
+    assert not validate({'string': 'abc'})
+    assert not validate({'number': -1})
+    assert not validate({'number': True})
+    assert not validate({'number': 1, 'string': 'abcd'})
+    assert not validate({'number': 1, 'string': 'ABC'})
+    assert not validate({'number': 1, 'pair': [1]})
+    assert not validate({'number': 1, 'x-foo': 'z'})
+    assert not validate({'number': 1, 'other': None})
+    assert not validate('not an object')
+
+
+def test_compile_schema_unsupported():
+    with pytest.raises(UnsupportedSchema):
+        compile_schema({'oneOf': [{'type': 'string'}, {'type': 'number'}]})
+
+
+@pytest.mark.parametrize('name', sorted(INTERFACE_SCHEMAS))
+def test_all_interfaces_compile(name):
+    assert compiled_validator_for_interface(name) is not None
+
+
+@pytest.mark.parametrize('interface,data', (
+    [('event', event) for event in EVENTS] +
+    [('tags', tags) for tags in TAGS] +
+    [('frame', frame) for frame in FRAMES]
+))
+def test_compiled_validator_matches_jsonschema(interface, data):
+    validator = validator_for_interface(interface)
+    assert compiled_validator_for_interface(interface)(data) == validator.is_valid(data)
+
+
+class ValidateAndDefaultInterfaceTest(TestCase):
+    def validate(self, data, interface):
+        data = copy.deepcopy(data)
+        result = validate_and_default_interface(data, interface)
+        return data, result
+
+    def test_same_result_without_compiled_validators(self):
+        for interface, data in (
+            [('event', event) for event in EVENTS] +
+            [('tags', tags) for tags in TAGS] +
+            [('frame', frame) for frame in FRAMES]
+        ):
+            result = self.validate(data, interface)
+            with mock.patch.object(schemas, 'ENABLE_COMPILED_VALIDATORS', False):
+                assert self.validate(data, interface) == result
+
+    def test_valid_data_skips_jsonschema(self):
+        validator = validator_for_interface('event')
+        with mock.patch.object(validator, 'iter_errors') as mock_iter_errors:
+            _, (is_valid, errors) = self.validate(EVENTS[0], 'event')
+
+        assert is_valid
+        assert errors == []
+        assert not mock_iter_errors.called
@@ -1,9 +1,12 @@
 from __future__ import absolute_import
 
+import os
 import pytest
 import re
 import responses
+import shutil
 import six
+import tempfile
 from symbolic import SourceMapTokenMatch
 
 from copy import deepcopy
@@ -23,10 +26,14 @@ from sentry.lang.javascript.processor import (
     get_max_age,
     CACHE_CONTROL_MAX,
     CACHE_CONTROL_MIN,
+    CACHE_MAX_VALUE_SIZE,
+    release_file_disk_cache,
 )
+from sentry.lang.javascript.cache import ReleaseFileDiskCache
 from sentry.lang.javascript.errormapping import (rewrite_exception, REACT_MAPPING_URL)
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
+from sentry.utils.cache import cache
 from sentry.utils.strings import truncatechars
 
 base64_sourcemap = 'data:application/json;base64,eyJ2ZXJzaW9uIjozLCJmaWxlIjoiZ2VuZXJhdGVkLmpzIiwic291cmNlcyI6WyIvdGVzdC5qcyJdLCJuYW1lcyI6W10sIm1hcHBpbmdzIjoiO0FBQUEiLCJzb3VyY2VzQ29udGVudCI6WyJjb25zb2xlLmxvZyhcImhlbGxvLCBXb3JsZCFcIikiXX0='
@@ -55,6 +62,51 @@ class JavaScriptStacktraceProcessorTest(TestCase):
         r = JavaScriptStacktraceProcessor({}, None, project)
         assert not r.allow_scraping
 
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_parsed_source_cache(self, fetch_file):
+        fetch_file.return_value = http.UrlResult(
+            'http://example.com/file.min.js',
+            {},
+            b'console.log("hello, World!")',
+            200,
+            None,
+        )
+        project = self.create_project()
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        for _ in range(2):
+            r = JavaScriptStacktraceProcessor({}, None, project)
+            r.release = release
+            r.cache_source('http://example.com/file.min.js')
+            assert r.cache.get('http://example.com/file.min.js') is not None
+
+        # the parsed source is shared between processors of the same release
+        assert fetch_file.call_count == 1
+
+        r = JavaScriptStacktraceProcessor({}, None, project)
+        r.cache_source('http://example.com/file.min.js')
+        assert fetch_file.call_count == 2
+
+        # other projects of the same release do not see the parsed source
+        other_project = self.create_project(organization=project.organization)
+        release.add_project(other_project)
+        r = JavaScriptStacktraceProcessor({}, None, other_project)
+        r.release = release
+        r.cache_source('http://example.com/file.min.js')
+        assert fetch_file.call_count == 3
+
+        # neither does the same project once scraping is disabled
+        project.update_option('sentry:scrape_javascript', False)
+        r = JavaScriptStacktraceProcessor({}, None, project)
+        r.release = release
+        assert not r.allow_scraping
+        r.cache_source('http://example.com/file.min.js')
+        assert fetch_file.call_count == 4
+
 
 class FetchReleaseFileTest(TestCase):
     def test_unicode(self):
@@ -188,6 +240,147 @@ class FetchReleaseFileTest(TestCase):
             'utf-8',
         )
 
+    def test_disk_cache(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js',
+            type='release.file',
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+        )
+
+        binary_body = unicode_body.encode('utf-8')
+        file.putfile(six.BytesIO(binary_body))
+
+        ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        cache_path = tempfile.mkdtemp()
+        try:
+            with self.options({
+                'releasefile.cache-path': cache_path,
+                'releasefile.cache-limit': 1024 * 1024,
+            }):
+                result = fetch_release_file('file.min.js', release)
+                assert release_file_disk_cache.get(file.checksum) is not None
+
+                # the blob is only read once, later reads are served from disk
+                with patch.object(File, 'getfile') as getfile:
+                    cache.clear()
+                    new_result = fetch_release_file('file.min.js', release)
+                    assert not getfile.called
+
+            assert result == new_result
+        finally:
+            shutil.rmtree(cache_path)
+
+    def test_large_file_without_disk_cache(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js',
+            type='release.file',
+            headers={'Content-Type': 'application/octet-stream'},
+        )
+
+        # random data doesn't compress, so this stays above the limit
+        binary_body = os.urandom(CACHE_MAX_VALUE_SIZE + 1024)
+        file.putfile(six.BytesIO(binary_body))
+
+        ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        result = fetch_release_file('file.min.js', release)
+        assert result.body == binary_body
+
+        # the disk cache is disabled, so the body is kept in the shared cache
+        with patch.object(File, 'getfile') as getfile:
+            new_result = fetch_release_file('file.min.js', release)
+            assert not getfile.called
+
+        assert result == new_result
+
+
+class ReleaseFileDiskCacheTest(TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.disk_cache = ReleaseFileDiskCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path)
+
+    def test_disabled(self):
+        with self.options({'releasefile.cache-path': self.cache_path}):
+            self.disk_cache.set('a' * 40, b'foo')
+            assert self.disk_cache.get('a' * 40) is None
+
+    def test_eviction(self):
+        with self.options({
+            'releasefile.cache-path': self.cache_path,
+            'releasefile.cache-limit': 8,
+        }):
+            self.disk_cache.set('a' * 40, b'foo')
+            self.disk_cache.set('b' * 40, b'bar')
+            assert self.disk_cache.get('a' * 40) == b'foo'
+
+            # make sure the first entry is the least recently used one
+            os.utime(self.disk_cache.get_path('a' * 40), (0, 0))
+            self.disk_cache.set('c' * 40, b'baz')
+            assert self.disk_cache.get('a' * 40) is None
+            assert self.disk_cache.get('b' * 40) == b'bar'
+            assert self.disk_cache.get('c' * 40) == b'baz'
+
+    def test_eviction_is_not_run_on_every_write(self):
+        with self.options({
+            'releasefile.cache-path': self.cache_path,
+            'releasefile.cache-limit': 1024,
+        }), patch.object(self.disk_cache, 'evict', wraps=self.disk_cache.evict) as evict:
+            self.disk_cache.set('a' * 40, b'foo')
+            assert evict.call_count == 1
+
+            self.disk_cache.set('b' * 40, b'bar')
+            assert evict.call_count == 1
+
+            self.disk_cache.set('c' * 40, b'x' * 100)
+            assert evict.call_count == 2
+
+    def test_eviction_skips_temporary_files(self):
+        with self.options({
+            'releasefile.cache-path': self.cache_path,
+            'releasefile.cache-limit': 8,
+        }):
+            self.disk_cache.set('a' * 40, b'foo')
+            tmp_path = os.path.join(self.cache_path, 'aa', 'tmpfoo')
+            with open(tmp_path, 'wb') as f:
+                f.write(b'x' * 16)
+
+            self.disk_cache.evict()
+            assert os.path.exists(tmp_path)
+            assert self.disk_cache.get('a' * 40) == b'foo'
+
+            # abandoned temporary files are cleaned up
+            os.utime(tmp_path, (0, 0))
+            self.disk_cache.evict()
+            assert not os.path.exists(tmp_path)
+
 
 class FetchFileTest(TestCase):
     @responses.activate
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from sentry.models import GroupHash
 from sentry.testutils import TestCase
+from sentry.utils.cache import cache
 
 
 class GroupTest(TestCase):
@@ -22,3 +23,42 @@ class GroupTest(TestCase):
         assert GroupHash.fetch_last_processed_event_id(
             [grouphash.id, -1],
         ) == ['event', None]
+
+    def test_get_or_create_many(self):
+        group = self.group
+        project = group.project
+        GroupHash.objects.create(project=project, group=group, hash='a' * 32)
+
+        hashes = GroupHash.get_or_create_many(project, ['a' * 32, 'b' * 32])
+        assert [h.hash for h in hashes] == ['a' * 32, 'b' * 32]
+        assert [h.group_id for h in hashes] == [group.id, None]
+        assert GroupHash.objects.filter(project=project, hash='b' * 32).exists()
+
+        # Only hashes associated with a group are served from the cache.
+        GroupHash.objects.filter(project=project).update(group=None)
+        GroupHash.objects.filter(project=project, hash='b' * 32).update(group=group)
+        with self.assertNumQueries(1):
+            hashes = GroupHash.get_or_create_many(project, ['a' * 32, 'b' * 32])
+        assert [h.group_id for h in hashes] == [group.id, group.id]
+
+        GroupHash.clear_cache(project.id, ['a' * 32])
+        hashes = GroupHash.get_or_create_many(project, ['a' * 32, 'b' * 32])
+        assert [h.group_id for h in hashes] == [None, group.id]
+
+    def test_get_or_create_many_ignores_outdated_associations(self):
+        group = self.group
+        project = group.project
+        grouphash = GroupHash.objects.create(project=project, group=group, hash='a' * 32)
+
+        assert GroupHash.get_or_create_many(project, ['a' * 32])[0].group_id == group.id
+
+        # An association read before it was changed, but cached afterwards.
+        GroupHash.objects.filter(id=grouphash.id).update(group=None)
+        GroupHash.clear_cache(project.id, ['a' * 32])
+        cache.set(
+            GroupHash.get_cache_key(project.id, 'a' * 32),
+            (None, grouphash.id, group.id, None, None),
+            3600,
+        )
+
+        assert GroupHash.get_or_create_many(project, ['a' * 32])[0].group_id is None
@@ -56,3 +56,37 @@ class GetOrCreateTest(TestCase):
 
         assert grouprelease.first_seen == datetime
         assert grouprelease.last_seen == datetime_new
+
+    def test_cached(self):
+        project = self.create_project()
+        group = self.create_group(project=project)
+        release = Release.objects.create(version='abc', organization_id=project.organization_id)
+        release.add_project(project)
+        env = Environment.objects.create(
+            project_id=project.id, organization_id=project.organization_id, name='prod'
+        )
+        datetime = timezone.now()
+
+        grouprelease = GroupRelease.get_or_create(
+            group=group,
+            release=release,
+            environment=env,
+            datetime=datetime,
+        )
+
+        with self.assertNumQueries(0):
+            assert GroupRelease.get_or_create(
+                group=group,
+                release=release,
+                environment=env,
+                datetime=datetime,
+            ).id == grouprelease.id
+
+        grouprelease.delete()
+
+        assert GroupRelease.get_or_create(
+            group=group,
+            release=release,
+            environment=env,
+            datetime=datetime,
+        ).id != grouprelease.id
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import threading
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.cached.backend import CachedNodeStorage
+from sentry.testutils import TestCase
+
+
+class InMemoryBackend(NodeStorage):
+    def __init__(self):
+        self._data = {}
+        self.reads = 0
+
+    def set(self, id, data):
+        self._data[id] = data
+
+    def get(self, id):
+        self.reads += 1
+        return self._data.get(id)
+
+    def delete(self, id):
+        self._data.pop(id, None)
+
+
+class CachedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.ns = CachedNodeStorage((InMemoryBackend, {}), cache_size=10)
+
+    def test_get_reads_through(self):
+        self.ns.backend.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.backend.reads == 1
+
+    def test_get_returns_copies(self):
+        self.ns.set('a', {'foo': 'bar'})
+        self.ns.get('a')['foo'] = 'baz'
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+    def test_get_multi(self):
+        self.ns.set_multi({
+            'a': {'foo': 'bar'},
+            'b': {'foo': 'baz'},
+        })
+        assert self.ns.get_multi(['a', 'b', 'c']) == {
+            'a': {'foo': 'bar'},
+            'b': {'foo': 'baz'},
+        }
+        # only the missing node had to be fetched
+        assert self.ns.backend.reads == 1
+
+    def test_set_updates_cache(self):
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+        self.ns.set('a', {'foo': 'baz'})
+        assert self.ns.get('a') == {'foo': 'baz'}
+        assert self.ns.backend.reads == 0
+
+    def test_delete_invalidates_cache(self):
+        self.ns.set('a', {'foo': 'bar'})
+        self.ns.delete('a')
+        assert self.ns.get('a') is None
+
+    def test_local_cache_shared_between_threads(self):
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+        def update():
+            self.ns.set('a', {'foo': 'baz'})
+
+        thread = threading.Thread(target=update)
+        thread.start()
+        thread.join()
+
+        assert self.ns.get('a') == {'foo': 'baz'}
+        assert self.ns.backend.reads == 0
+
+    def test_shared_cache(self):
+        ns = CachedNodeStorage((InMemoryBackend, {}), cache_size=None, cluster='default')
+        ns.set('a', {'foo': 'bar'})
+        assert ns.get('a') == {'foo': 'bar'}
+        assert ns.backend.reads == 0
+
+        ns.delete('a')
+        assert ns.get('a') is None
+        assert ns.backend.reads == 1
@@ -39,3 +39,23 @@ class CassandraNodeStorageTest(TestCase):
         assert result[node_id2] == {
             'foo': 'bar',
         }
+
+        self.ns.set_multi({
+            node_id: {
+                'foo': 'qux',
+            },
+            node_id2: {
+                'foo': 'quux',
+            },
+        })
+
+        result = self.ns.get_multi([node_id, node_id2])
+        assert result[node_id] == {
+            'foo': 'qux',
+        }
+        assert result[node_id2] == {
+            'foo': 'quux',
+        }
+
+        self.ns.delete_multi([node_id, node_id2])
+        assert self.ns.get_multi([node_id, node_id2]) == {}
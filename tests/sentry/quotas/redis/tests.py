@@ -10,6 +10,7 @@ from exam import fixture, patcher
 
 from sentry.quotas.redis import (
     is_rate_limited,
+    lease_quota,
     BasicRedisQuota,
     RedisQuota,
 )
@@ -68,6 +69,42 @@ def test_is_rate_limited_script():
     ))) == [False, ]
 
 
+def test_lease_quota_script():
+    now = int(time.time())
+
+    cluster = clusters.get('default')
+    client = cluster.get_local_client(six.next(iter(cluster.hosts)))
+
+    # The lease is bounded by half of the smallest remaining quota.
+    granted, rejections = lease_quota(
+        client, ('foo', 'r:foo', 'bar', 'r:bar'), (100, now + 60, 10, now + 120, 20))
+    assert granted == 5
+    assert list(map(bool, rejections)) == [False, False]
+    assert client.get('foo') == '5'
+    assert client.get('bar') == '5'
+    assert 119 <= client.ttl('bar') <= 120
+
+    # The final items are granted one at a time.
+    for expected in (3, 1, 1):
+        granted, rejections = lease_quota(
+            client, ('foo', 'r:foo', 'bar', 'r:bar'), (100, now + 60, 10, now + 120, 20))
+        assert granted == expected
+    assert client.get('bar') == '10'
+
+    # Once any quota is exhausted nothing is granted or counted.
+    granted, rejections = lease_quota(
+        client, ('foo', 'r:foo', 'bar', 'r:bar'), (100, now + 60, 10, now + 120, 20))
+    assert granted == 0
+    assert list(map(bool, rejections)) == [False, True]
+    assert client.get('foo') == '10'
+
+    # Refunds make room for further leases.
+    client.set('r:bar', 2)
+    granted, rejections = lease_quota(
+        client, ('foo', 'r:foo', 'bar', 'r:bar'), (100, now + 60, 10, now + 120, 20))
+    assert granted == 1
+
+
 class RedisQuotaTest(TestCase):
     quota = fixture(RedisQuota)
 
@@ -251,3 +288,46 @@ class RedisQuotaTest(TestCase):
             timestamp=timestamp,
             # the - 1 is because we refunded once
         ) == [n - 1 for _ in quotas] + [None, 0]
+
+    def test_caches_quotas(self):
+        quota = RedisQuota(quota_cache_ttl=10)
+        self.get_project_quota.return_value = (200, 60)
+        self.get_organization_quota.return_value = (300, 60)
+
+        quotas = quota.get_quotas_with_limits(self.project)
+        assert [q.limit for q in quotas] == [200, 300]
+
+        self.get_project_quota.return_value = (100, 60)
+        assert quota.get_quotas_with_limits(self.project) is quotas
+        assert self.get_project_quota.call_count == 1
+
+        key = self.create_project_key(project=self.project)
+        assert [q.limit for q in quota.get_quotas_with_limits(self.project, key=key)] == [100, 300]
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited')
+    def test_leases_quota(self, mock_is_rate_limited):
+        quota = RedisQuota(lease_size=5)
+        timestamp = time.time()
+        self.get_project_quota.return_value = (7, 60)
+
+        with mock.patch('sentry.quotas.redis.lease_quota', wraps=lease_quota) as mock_lease_quota:
+            results = [
+                quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+                for _ in xrange(10)
+            ]
+
+        assert results == [False] * 7 + [True] * 3
+        assert not mock_is_rate_limited.called
+        # leases of 4, 2 and 1 items, followed by a rejection per request
+        assert mock_lease_quota.call_count == 6
+
+        result = quota.is_rate_limited(self.project, timestamp=timestamp)
+        assert result.reason_code == 'project_quota'
+        assert 0 < result.retry_after <= 60
+
+        quotas = quota.get_quotas(self.project)
+        assert quota.get_usage(
+            self.project.organization_id,
+            quotas,
+            timestamp=timestamp,
+        ) == [7, None]
@@ -2,9 +2,12 @@
 
 from __future__ import absolute_import
 
+import mock
+
 from datetime import timedelta
 from django.utils import timezone
 
+from sentry import tsdb
 from sentry.models import GroupRuleStatus, Rule
 from sentry.plugins import plugins
 from sentry.testutils import TestCase
@@ -12,6 +15,20 @@ from sentry.rules.processor import EventCompatibilityProxy, RuleProcessor
 
 
 class RuleProcessorTest(TestCase):
+    def create_rules(self, project, count, conditions):
+        Rule.objects.filter(project=project).delete()
+        return [
+            Rule.objects.create(
+                project=project,
+                data={
+                    'conditions': conditions,
+                    'actions': [{
+                        'id': 'sentry.rules.actions.notify_event.NotifyEventAction',
+                    }],
+                },
+            ) for _ in range(count)
+        ]
+
     # this test relies on a few other tests passing
     def test_integrated(self):
         event = self.create_event()
@@ -59,6 +76,52 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 1
 
+    def test_rule_statuses_fetched_in_bulk(self):
+        event = self.create_event()
+        rules = self.create_rules(event.project, 3, [{
+            'id': 'sentry.rules.conditions.every_event.EveryEventCondition',
+        }])
+
+        rp = RuleProcessor(
+            event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True)
+        assert len(list(rp.apply())[0][1]) == 3
+        assert GroupRuleStatus.objects.filter(group=event.group).count() == 3
+
+        GroupRuleStatus.objects.filter(group=event.group).update(
+            last_active=timezone.now() - timedelta(minutes=Rule.DEFAULT_FREQUENCY + 1),
+        )
+        with mock.patch.object(
+            GroupRuleStatus.objects, 'get_or_create',
+            side_effect=AssertionError('statuses should be prefetched'),
+        ):
+            results = list(rp.apply())
+        assert sorted(future.rule.id for future in results[0][1]) == \
+            sorted(rule.id for rule in rules)
+
+    @mock.patch.object(tsdb, 'get_sums')
+    def test_frequency_conditions_share_rates(self, mock_get_sums):
+        event = self.create_event()
+        mock_get_sums.return_value = {event.group_id: 10}
+        self.create_rules(event.project, 3, [{
+            'id': 'sentry.rules.conditions.event_frequency.EventFrequencyCondition',
+            'interval': '1h',
+            'value': '5',
+        }])
+
+        rp = RuleProcessor(
+            event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True)
+        results = list(rp.apply())
+        assert len(results[0][1]) == 3
+        assert mock_get_sums.call_count == 1
+
 
 class EventCompatibilityProxyTest(TestCase):
     def test_simple(self):
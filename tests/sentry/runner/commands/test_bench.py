@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from sentry.models import Event
+from sentry.testutils import CliTestCase
+from sentry.runner.commands.bench import bench
+from sentry.utils import json
+
+
+class BenchTest(CliTestCase):
+    command = bench
+
+    def test_stages(self):
+        rv = self.invoke(
+            '--project=%s' % self.project.id,
+            '--platform=python',
+            '--stage=normalize',
+            '--stage=process',
+            '--stage=save',
+            '--iterations=2',
+            '--format=json',
+        )
+        assert rv.exit_code == 0, rv.output
+        results = json.loads(rv.output)
+        assert [r['stage'] for r in results] == ['normalize', 'process', 'save']
+        for result in results:
+            assert result['events'] == 2
+            assert result['p50_ms'] <= result['p99_ms']
+            assert result['allocated_bytes'] is None
+        assert Event.objects.filter(project_id=self.project.id).count() == 2
+
+    def test_human_output(self):
+        rv = self.invoke(
+            '--project=%s' % self.project.id,
+            '--platform=python',
+            '--stage=normalize',
+            '--iterations=1',
+        )
+        assert rv.exit_code == 0, rv.output
+        lines = rv.output.splitlines()
+        assert lines[0].split()[:3] == ['stage', 'events', 'events/s']
+        assert lines[1].split()[:2] == ['normalize', '1']
+
+    def test_unknown_platform(self):
+        rv = self.invoke('--platform=not-a-platform', '--iterations=1')
+        assert rv.exit_code != 0
+        assert 'No sample event' in rv.output
@@ -169,6 +169,38 @@ class DjangoSearchBackendTest(TestCase):
         results = self.backend.query([self.project], query='bar')
         assert set(results) == set([self.group2])
 
+    def test_query_with_trigram_index(self):
+        backend = DjangoSearchBackend(use_trigram_index=True)
+
+        results = backend.query([self.project], query='foo')
+        assert set(results) == set([self.group1])
+
+        results = backend.query([self.project], query='bar')
+        assert set(results) == set([self.group2])
+
+        # Wildcards are matched literally.
+        results = backend.query([self.project], query='%')
+        assert set(results) == set([])
+
+    def test_query_result_cache(self):
+        backend = DjangoSearchBackend(result_cache_ttl=60)
+
+        results = backend.query([self.project], query='foo')
+        assert list(results) == [self.group1]
+
+        # Matching groups are cached, but are always fetched from the
+        # database so their attributes are up to date.
+        self.group1.update(message='baz')
+        results = backend.query([self.project], query='foo')
+        assert list(results) == [self.group1]
+        assert results[0].message == 'baz'
+
+        results = backend.query([self.project], query='baz')
+        assert list(results) == [self.group1]
+
+        results = self.backend.query([self.project], query='foo')
+        assert list(results) == []
+
     def test_query_with_environment(self):
         results = self.backend.query(
             [self.project],
@@ -216,6 +216,17 @@ class MinHashIndexBackendTestMixin(object):
             ('2', [0.5]),
         ]
 
+    def test_record_multi(self):
+        self.index.record_multi('example', [
+            ('1', [('index', ['foo', 'bar'])]),
+            ('2', [('index', ['foo', 'bar']), ('index', ['baz'])]),
+            ('3', []),
+        ])
+        assert self.index.classify('example', [('index', 0, ['foo', 'bar'])]) == [
+            ('1', [1.0]),
+            ('2', [0.5]),
+        ]
+
     def test_flush_scoped(self):
         self.index.record('example', '1', [('index', ['foo', 'bar'])])
         assert self.index.classify('example', [('index', 0, ['foo', 'bar'])]) == [
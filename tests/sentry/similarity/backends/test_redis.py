@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import mock
 import time
 
 import msgpack
@@ -29,6 +30,35 @@ class RedisScriptMinHashIndexBackendTestCase(MinHashIndexBackendTestMixin, TestC
             10,
         )
 
+    def test_signature_cache(self):
+        builder = mock.Mock(side_effect=signature_builder)
+        index = RedisScriptMinHashIndexBackend(
+            redis.clusters.get('default').get_local_client(0),
+            'sim',
+            builder,
+            16,
+            60 * 60,
+            12,
+            10,
+            signature_cache_size=10,
+        )
+
+        index.record('example', '1', [('index', ['foo', 'bar'])])
+        index.record('example', '2', [('index', ['bar', 'foo', 'foo'])])
+        assert builder.call_count == 1
+
+        assert index.classify('example', [('index', 0, ['foo', 'bar'])]) == [
+            ('1', [1.0]),
+            ('2', [1.0]),
+        ]
+        assert builder.call_count == 1
+
+        index.record('example', '3', [('index', ['baz'])])
+        assert builder.call_count == 2
+
+        # The cache is bounded by the number of features it holds.
+        assert index.signature_cache.weight == 3
+
     def test_export_import(self):
         self.index.record('example', '1', [('index', 'hello world')])
 
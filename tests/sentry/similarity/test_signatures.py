@@ -38,3 +38,9 @@ class MinHashSignatureBuilderTestCase(TestCase):
             estimation,
             delta=0.1,  # totally made up constant, seems reasonable
         )
+
+    def test_signatures_ignore_duplicates(self):
+        get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+        features = ['foo', 'bar', 'baz']
+        assert get_signature(features) == get_signature(features * 3)
+        assert get_signature(features) == get_signature(iter(features))
@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+from mock import ANY, Mock, patch
+
+from sentry.similarity import features
+from sentry.tasks.similarity import record, record_batch
+from sentry.testutils import TestCase
+
+
+class RecordTest(TestCase):
+    def setUp(self):
+        self.group2 = self.create_group(project=self.project)
+        self.event = self.create_event(message='hello world')
+        self.event2 = self.create_event(group=self.group2, message='jello world')
+
+    @patch('sentry.tasks.similarity.features.record')
+    def test_unbatched(self, mock_record):
+        record(self.event)
+        mock_record.assert_called_once_with([self.event])
+
+    def test_nothing_to_record(self):
+        with patch.object(features, 'encode', return_value=('1', {})):
+            assert features.record([self.event]) == []
+
+    @patch('sentry.tasks.similarity.record_batch.apply_async')
+    @patch('sentry.tasks.similarity.record_batch.delay')
+    def test_batched(self, mock_delay, mock_apply_async):
+        with self.options({'similarity.record-batch-size': 2}):
+            record(self.event)
+            mock_apply_async.assert_called_once_with(
+                kwargs={'project_id': self.project.id},
+                countdown=1,
+            )
+            assert not mock_delay.called
+
+            record(self.event2)
+            mock_delay.assert_called_once_with(project_id=self.project.id)
+
+            scope, items = features.encode([self.event, self.event2])
+            with patch.object(features.index, 'record_multi') as mock_record_multi:
+                record_batch(project_id=self.project.id)
+
+            assert mock_record_multi.call_count == 1
+            (batch_scope, batch_items), _ = mock_record_multi.call_args
+            assert batch_scope == scope
+            assert batch_items == list(items.items())
+
+            # The batch has been consumed.
+            with patch.object(features.index, 'record_multi') as mock_record_multi:
+                record_batch(project_id=self.project.id)
+            assert not mock_record_multi.called
+
+    @patch('sentry.tasks.similarity.record_batch.apply_async', Mock())
+    def test_batched_binary_values(self):
+        items = {'group': [('alias', [b'\xff\x00', b'\x80'])]}
+        with self.options({'similarity.record-batch-size': 2}), \
+                patch.object(features, 'encode', return_value=('1', items)):
+            record(self.event)
+
+        with patch.object(features.index, 'record_multi') as mock_record_multi:
+            record_batch(project_id=self.project.id)
+
+        mock_record_multi.assert_called_once_with('1', list(items.items()), timestamp=ANY)
@@ -7,7 +7,11 @@ from time import time
 from sentry import quotas, tsdb
 from sentry.event_manager import EventManager, HashDiscarded
 from sentry.plugins import Plugin2
-from sentry.tasks.store import preprocess_event, process_event, save_event
+from sentry.cache import default_cache
+from sentry.models import Event
+from sentry.tasks.store import (
+    SAVE_EVENT_BATCH_PARTITIONS, preprocess_event, process_event, save_event, save_event_batch
+)
 from sentry.testutils import PluginTestCase
 from sentry.utils.dates import to_datetime
 
@@ -47,6 +51,7 @@ class StoreTasksTest(PluginTestCase):
 
         data = {
             'project': project.id,
+            'event_id': uuid.uuid4().hex,
             'platform': 'mattlang',
             'logentry': {
                 'formatted': 'test',
@@ -61,6 +66,10 @@ class StoreTasksTest(PluginTestCase):
         assert mock_process_event.delay.call_count == 1
         assert mock_save_event.delay.call_count == 0
 
+        # Events passed inline are stored in the cache for processing.
+        cache_key = mock_process_event.delay.call_args[1]['cache_key']
+        assert default_cache.get(cache_key) == data
+
     @mock.patch('sentry.tasks.store.save_event')
     @mock.patch('sentry.tasks.store.process_event')
     def test_move_to_save_event(self, mock_process_event, mock_save_event):
@@ -187,6 +196,101 @@ class StoreTasksTest(PluginTestCase):
             project_id=project.id
         )
 
+    @mock.patch('sentry.tasks.store.save_event_batch.apply_async')
+    @mock.patch('sentry.tasks.store.save_event_batch.delay')
+    @mock.patch('sentry.tasks.store.save_event')
+    @mock.patch('sentry.tasks.store.default_cache')
+    def test_process_event_batched(self, mock_default_cache, mock_save_event,
+                                   mock_delay, mock_apply_async):
+        project = self.create_project()
+        partition = project.id % SAVE_EVENT_BATCH_PARTITIONS
+
+        mock_default_cache.get.return_value = {
+            'project': project.id,
+            'platform': 'noop',
+            'logentry': {
+                'formatted': 'test',
+            },
+        }
+
+        with self.options({'store.save-event-batch-size': 2}):
+            process_event(cache_key='e:1', start_time=1)
+            mock_apply_async.assert_called_once_with(
+                kwargs={'partition': partition},
+                countdown=1,
+            )
+            assert not mock_delay.called
+
+            process_event(cache_key='e:2', start_time=1)
+            mock_delay.assert_called_once_with(partition=partition)
+
+        assert not mock_save_event.delay.called
+
+    def _queue_batched_event(self, project, event_id):
+        manager = EventManager({
+            'platform': 'python',
+            'event_id': event_id,
+            'logentry': {
+                'formatted': 'test',
+            },
+        })
+        manager.normalize()
+        data = dict(manager.get_data().items())
+        data['project'] = project.id
+
+        cache_key = 'e:{}:{}'.format(event_id, uuid.uuid4().hex)
+        default_cache.set(cache_key, data, 3600)
+        preprocess_event(cache_key=cache_key, start_time=time(), event_id=event_id)
+        return cache_key
+
+    @mock.patch('sentry.tasks.store.save_event_batch.apply_async')
+    @mock.patch('sentry.tasks.store.save_event_batch.delay')
+    def test_save_event_batch(self, mock_delay, mock_apply_async):
+        project = self.create_project()
+        partition = project.id % SAVE_EVENT_BATCH_PARTITIONS
+
+        event_ids = [uuid.uuid4().hex for _ in range(3)]
+        with self.options({'store.save-event-batch-size': 2}):
+            cache_keys = [
+                self._queue_batched_event(project, event_id) for event_id in event_ids
+            ]
+
+            save_event_batch(partition=partition)
+
+            # The remaining event is left for a delayed drain.
+            mock_apply_async.assert_called_with(
+                kwargs={'partition': partition},
+                countdown=1,
+            )
+            assert Event.objects.filter(project_id=project.id).count() == 2
+            assert default_cache.get(cache_keys[0]) is None
+
+            save_event_batch(partition=partition)
+
+        events = Event.objects.filter(project_id=project.id)
+        assert set(event.event_id for event in events) == set(event_ids)
+        for event in events:
+            assert event.group_id is not None
+            Event.objects.bind_nodes([event], 'data')
+            assert event.data['logentry']['formatted'] == 'test'
+
+    @mock.patch('sentry.tasks.store.save_event_batch.apply_async')
+    @mock.patch('sentry.tasks.store.save_event_batch.delay')
+    def test_save_event_batch_duplicate(self, mock_delay, mock_apply_async):
+        project = self.create_project()
+        partition = project.id % SAVE_EVENT_BATCH_PARTITIONS
+
+        event_ids = [uuid.uuid4().hex] * 2 + [uuid.uuid4().hex]
+        with self.options({'store.save-event-batch-size': 3}):
+            for event_id in event_ids:
+                self._queue_batched_event(project, event_id)
+
+            save_event_batch(partition=partition)
+
+        assert set(
+            Event.objects.filter(project_id=project.id).values_list('event_id', flat=True)
+        ) == set(event_ids)
+
     @mock.patch.object(tsdb, 'incr_multi')
     @mock.patch.object(quotas, 'refund')
     def test_hash_discarded_raised(self, mock_refund, mock_incr):
@@ -0,0 +1,392 @@
+from __future__ import absolute_import
+
+import pytest
+import pytz
+import shutil
+import tempfile
+import threading
+
+from datetime import datetime, timedelta
+
+from sentry.testutils import TestCase
+from sentry.tsdb.base import TSDBModel, ONE_MINUTE, ONE_HOUR, ONE_DAY
+from sentry.tsdb.disk import DiskTSDB, FrequencySummary, HyperLogLog
+from sentry.utils.dates import to_timestamp
+
+
+def test_hyperloglog():
+    hll = HyperLogLog(8)
+    registers = bytearray(hll.size)
+    assert hll.count(registers) == 0
+
+    hll.add(registers, ['foo', 'bar', 'baz', 'foo'])
+    assert hll.count(registers) == 3
+
+    other = bytearray(hll.size)
+    hll.add(other, ['%s' % i for i in range(1000)])
+    hll.merge(registers, other)
+    assert 900 < hll.count(registers) < 1100
+
+
+def test_frequency_summary():
+    summary = FrequencySummary(2)
+    scores = summary.update({}, {1: 1.0, 2: 2.0})
+    assert summary.decode(summary.encode(scores)) == {1: 1.0, 2: 2.0}
+
+    # The lowest scoring member is replaced, and its score is inherited.
+    assert summary.update(scores, {3: 1.0}) == {2: 2.0, 3: 2.0}
+    assert summary.decode(None) == {}
+
+
+class DiskTSDBTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.db = self.create_db()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def create_db(self):
+        return DiskTSDB(
+            path=self.path,
+            rollups=(
+                # time in seconds, samples to keep
+                (10, 30),  # 5 minutes at 10 seconds
+                (ONE_MINUTE, 120),  # 2 hours at 1 minute
+                (ONE_HOUR, 24),  # 1 days at 1 hour
+                (ONE_DAY, 30),  # 30 days at 1 day
+            ),
+        )
+
+    def test_simple(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.incr(TSDBModel.project, 1, dts[0])
+        self.db.incr(TSDBModel.project, 1, dts[1], count=2)
+        self.db.incr(TSDBModel.project, 1, dts[1], environment_id=1)
+        self.db.incr(TSDBModel.project, 1, dts[2])
+        self.db.incr_multi(
+            [
+                (TSDBModel.project, 1),
+                (TSDBModel.project, 2),
+            ], dts[3], count=3, environment_id=1
+        )
+        self.db.incr_multi(
+            [
+                (TSDBModel.project, 1),
+                (TSDBModel.project, 2),
+            ], dts[3], count=1, environment_id=2
+        )
+
+        results = self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1])
+        assert results == {
+            1: [
+                (timestamp(dts[0]), 1),
+                (timestamp(dts[1]), 3),
+                (timestamp(dts[2]), 1),
+                (timestamp(dts[3]), 4),
+            ],
+        }
+
+        results = self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_ids=[1])
+        assert results == {
+            1: [
+                (timestamp(dts[0]), 0),
+                (timestamp(dts[1]), 1),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 3),
+            ],
+            2: [
+                (timestamp(dts[0]), 0),
+                (timestamp(dts[1]), 0),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 3),
+            ],
+        }
+
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {
+            1: 9,
+            2: 4,
+        }
+
+        assert self.db.get_sums(
+            TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=0) == {
+            1: 0,
+            2: 0,
+        }
+
+        self.db.merge(TSDBModel.project, 1, [2], now, environment_ids=[0, 1, 2])
+
+        results = self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1])
+        assert results == {
+            1: [
+                (timestamp(dts[0]), 1),
+                (timestamp(dts[1]), 3),
+                (timestamp(dts[2]), 1),
+                (timestamp(dts[3]), 8),
+            ],
+            2: [(timestamp(dts[i]), 0) for i in range(0, 4)],
+        }
+
+        assert self.db.get_sums(
+            TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1) == {
+            1: 7,
+            2: 0,
+        }
+
+        self.db.delete([TSDBModel.project], [1, 2], dts[0], dts[-1], environment_ids=[0, 1, 2])
+
+        assert self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {
+            1: 0,
+            2: 0,
+        }
+
+    def test_get_range_multiple_environments(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        with pytest.raises(NotImplementedError):
+            self.db.get_range(TSDBModel.project, [1], now, now, environment_ids=[1, 2])
+
+    def test_concurrent_reads_and_writes(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        keys = range(200)
+        errors = []
+
+        def write():
+            for key in keys:
+                self.db.incr(TSDBModel.project, key, now, count=key + 1)
+
+        def read():
+            # Readers share the instance with the writer, so they load the
+            # indexes and remap the files while they grow.
+            try:
+                for _ in range(10):
+                    for key, value in self.db.get_sums(
+                            TSDBModel.project, keys, now, now).items():
+                        assert value in (0, key + 1)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)]
+        threads.extend(threading.Thread(target=read) for _ in range(4))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert self.db.get_sums(TSDBModel.project, keys, now, now) == {
+            key: key + 1 for key in keys
+        }
+        assert self.create_db().get_sums(TSDBModel.project, keys, now, now) == {
+            key: key + 1 for key in keys
+        }
+
+    def test_ring_overwrites_expired_buckets(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+
+        # 10 second rollups only keep 30 samples, so this lands in the same
+        # cell as the current bucket.
+        self.db.incr(TSDBModel.project, 1, now - timedelta(seconds=300), count=5)
+        self.db.incr(TSDBModel.project, 1, now)
+
+        assert self.db.get_range(
+            TSDBModel.project, [1], now, now, rollup=10,
+        )[1][-1][1] == 1
+
+    def test_distinct_counts(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+        model = TSDBModel.users_affected_by_group
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.record(model, 1, ('foo', 'bar'), dts[0])
+        self.db.record(model, 1, ('baz', ), dts[1], environment_id=1)
+        self.db.record_multi(
+            (
+                (model, 1, ('foo', 'bar')),
+                (model, 2, ('bar', )),
+            ), dts[2]
+        )
+        self.db.record(model, 2, ('baz', ), dts[3])
+
+        assert self.db.get_distinct_counts_series(model, [1], dts[0], dts[-1], rollup=3600) == {
+            1: [
+                (timestamp(dts[0]), 2),
+                (timestamp(dts[1]), 1),
+                (timestamp(dts[2]), 2),
+                (timestamp(dts[3]), 0),
+            ],
+        }
+
+        assert self.db.get_distinct_counts_totals(model, [1, 2], dts[0], dts[-1], rollup=3600) == {
+            1: 3,
+            2: 2,
+        }
+
+        assert self.db.get_distinct_counts_totals(
+            model, [1, 2], dts[0], dts[-1], rollup=3600, environment_id=1) == {
+            1: 1,
+            2: 0,
+        }
+
+        assert self.db.get_distinct_counts_union(model, [1, 2], dts[0], dts[-1], rollup=3600) == 3
+
+        self.db.merge_distinct_counts(model, 1, [2], dts[0])
+
+        assert self.db.get_distinct_counts_totals(model, [1, 2], dts[0], dts[-1], rollup=3600) == {
+            1: 3,
+            2: 0,
+        }
+
+        self.db.delete_distinct_counts([model], [1], dts[0], dts[-1])
+
+        assert self.db.get_distinct_counts_totals(model, [1], dts[0], dts[-1], rollup=3600) == {
+            1: 0,
+        }
+
+    def test_frequency_tables(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        model = TSDBModel.frequent_projects_by_organization
+
+        self.db.record_frequency_multi(
+            ((model, {
+                'organization:1': {
+                    "project:1": 1,
+                    "project:2": 1,
+                    "project:3": 3,
+                },
+            }), ), now
+        )
+
+        self.db.record_frequency_multi(
+            ((model, {
+                'organization:1': {
+                    "project:1": 1,
+                    "project:4": 1,
+                },
+                'organization:2': {
+                    "project:5": 1,
+                },
+            }), ), now - timedelta(hours=1)
+        )
+
+        assert self.db.get_most_frequent(
+            model, ('organization:1', 'organization:2'), now - timedelta(hours=1), now,
+            rollup=3600, limit=2,
+        ) == {
+            'organization:1': [
+                ('project:3', 3.0),
+                ('project:1', 2.0),
+            ],
+            'organization:2': [
+                ('project:5', 1.0),
+            ],
+        }
+
+        assert self.db.get_frequency_totals(
+            model, {'organization:1': ('project:1', 'project:5')},
+            now - timedelta(hours=1), now, rollup=3600,
+        ) == {
+            'organization:1': {
+                'project:1': 2.0,
+                'project:5': 0.0,
+            },
+        }
+
+        self.db.merge_frequencies(model, 'organization:1', ['organization:2'], now)
+
+        results = self.db.get_most_frequent(
+            model, ('organization:1', 'organization:2'), now - timedelta(hours=1), now,
+            rollup=3600,
+        )
+        assert dict(results['organization:1']) == {
+            'project:1': 2.0,
+            'project:2': 1.0,
+            'project:3': 3.0,
+            'project:4': 1.0,
+            'project:5': 1.0,
+        }
+        assert results['organization:2'] == []
+
+        self.db.delete_frequencies([model], ['organization:1'], now - timedelta(hours=1), now)
+
+        assert self.db.get_most_frequent(
+            model, ('organization:1', ), now - timedelta(hours=1), now, rollup=3600,
+        ) == {
+            'organization:1': [],
+        }
+
+    def test_persistence(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        self.db.incr(TSDBModel.project, 'foo', now, count=3)
+        self.db.record(TSDBModel.users_affected_by_project, 1, ('foo', 'bar'), now)
+
+        db = self.create_db()
+        assert db.get_sums(TSDBModel.project, ['foo'], now, now) == {'foo': 3}
+        assert db.get_distinct_counts_totals(
+            TSDBModel.users_affected_by_project, [1], now, now) == {1: 2}
+
+        # Keys created by other instances are picked up by existing ones.
+        db.incr(TSDBModel.project, 'bar', now)
+        assert self.db.get_sums(TSDBModel.project, ['bar'], now, now) == {'bar': 1}
+
+        self.db.flush()
+        assert self.db.get_sums(TSDBModel.project, ['foo'], now, now) == {'foo': 0}
+
+        # Instances that still have the files mapped read the cleared rows.
+        assert db.get_sums(TSDBModel.project, ['bar'], now, now) == {'bar': 0}
+
+    def test_non_ascii_bytes_keys(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        key = u'f\xf6\xf6'.encode('utf-8')
+        self.db.incr(TSDBModel.project, key, now, count=2)
+        self.db.incr(TSDBModel.project, key, now)
+        assert self.db.get_sums(TSDBModel.project, [key], now, now) == {key: 3}
+
+        db = self.create_db()
+        assert db.get_sums(TSDBModel.project, [key], now, now) == {key: 3}
+
+    def test_cleanup(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        model = TSDBModel.frequent_projects_by_organization
+        # Older than the retention of the longest rollup (30 days.)
+        expired = now - timedelta(days=31)
+
+        self.db.incr(TSDBModel.project, 'old', expired, count=5)
+        self.db.incr(TSDBModel.project, 'new', now, count=2)
+        self.db.record_frequency_multi(((model, {
+            'organization:1': {'project:1': 1},
+            'organization:2': {'project:2': 1},
+        }), ), expired)
+        self.db.record_frequency_multi(((model, {
+            'organization:2': {'project:3': 1},
+        }), ), now)
+
+        db = self.create_db()
+        self.db.cleanup(now)
+
+        index, _ = self.db.counters
+        assert set(value[1] for value, _ in index.items()) == set(['new'])
+        assert set(value for value, _ in self.db.members.items()) == set(['project:3'])
+
+        # Released rows are cleared before they are reused for new keys, and
+        # instances that loaded the indexes before they were compacted see
+        # the new assignments.
+        db.incr(TSDBModel.project, 'other', now)
+        assert len(index.items()) == 2
+        assert self.db.get_sums(TSDBModel.project, ['new', 'other', 'old'], now, now) == {
+            'new': 2,
+            'other': 1,
+            'old': 0,
+        }
+        assert db.get_most_frequent(model, ['organization:2'], now, now) == {
+            'organization:2': [('project:3', 1.0)],
+        }
@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 
+import mock
 import pytest
 import pytz
+import time
 
 from contextlib import contextmanager
 from datetime import (
@@ -11,7 +13,7 @@ from datetime import (
 
 from sentry.testutils import TestCase
 from sentry.tsdb.base import TSDBModel, ONE_MINUTE, ONE_HOUR, ONE_DAY
-from sentry.tsdb.redis import RedisTSDB, CountMinScript, SuppressionWrapper
+from sentry.tsdb.redis import RedisTSDB, CountMinScript, IncrScript, SuppressionWrapper
 from sentry.utils.dates import to_datetime, to_timestamp
 
 
@@ -207,6 +209,85 @@ class RedisTSDBTest(TestCase):
             2: 0,
         }
 
+    def test_incr_multi_expiry(self):
+        timestamp = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        rollup, max_values = ONE_HOUR, 24
+        expiry = self.db.calculate_expiry(rollup, max_values, timestamp)
+
+        with mock.patch.object(
+            self.db.cluster, 'execute_commands', wraps=self.db.cluster.execute_commands,
+        ) as execute_commands:
+            self.db.incr_multi(
+                [
+                    (TSDBModel.project, 1),
+                    (TSDBModel.project, 2),
+                    (TSDBModel.group, 3),
+                ],
+                timestamp,
+                count=2,
+                environment_id=1,
+            )
+
+        # One script invocation per host that stores any of the counters.
+        assert execute_commands.call_count == 1
+        commands = execute_commands.call_args[0][0]
+        assert all(
+            len(host_commands) == 1 and host_commands[0][0] is IncrScript
+            for host_commands in commands.values()
+        )
+        assert len(commands) <= len(self.db.cluster.hosts)
+
+        hash_key, hash_field = self.db.make_counter_key(
+            TSDBModel.project, rollup, timestamp, 2, 1)
+        client = self.db.cluster.get_local_client_for_key(hash_key)
+        assert client.hget(hash_key, hash_field) == '2'
+        remaining = expiry - int(time.time())
+        assert remaining - 2 <= client.ttl(hash_key) <= remaining
+
+        # The expiration time is restored if the key doesn't have one.
+        client.persist(hash_key)
+        self.db.incr(TSDBModel.project, 2, timestamp, environment_id=1)
+        assert client.hget(hash_key, hash_field) == '3'
+        assert client.ttl(hash_key) > 0
+
+    def test_get_range_cache(self):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24), ),
+            vnodes=64,
+            range_cache_ttl=60,
+            hosts={i - 6: {
+                'db': i
+            } for i in range(6, 9)},
+        )
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        dts = [now - timedelta(hours=i) for i in (2, 1, 0)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        for dt in dts:
+            db.incr(TSDBModel.project, 1, dt)
+
+        expected = {
+            1: [(timestamp(dt), 1) for dt in dts],
+            2: [(timestamp(dt), 0) for dt in dts],
+        }
+        assert db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1]) == expected
+
+        # Buckets that have ended are served from the cache, the current
+        # bucket is always read.
+        for dt in dts:
+            db.incr(TSDBModel.project, 1, dt)
+        expected[1][-1] = (timestamp(dts[-1]), 2)
+        assert db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1]) == expected
+
+        db.delete([TSDBModel.project], [1], dts[0], dts[-1])
+        assert db.get_range(TSDBModel.project, [1], dts[0], dts[-1]) == {
+            1: [(timestamp(dt), 0) for dt in dts],
+        }
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -0,0 +1,47 @@
+from __future__ import absolute_import
+
+from django.core.cache import cache
+
+from sentry.models import Environment
+from sentry.testutils import TestCase
+from sentry.utils.cache import LocalCache
+
+
+class LocalCacheTest(TestCase):
+    def test_get_set_delete(self):
+        local_cache = LocalCache(10, ttl=60)
+        assert local_cache.get('foo') is None
+
+        local_cache.set('foo', 'bar', 60)
+        assert local_cache.get('foo') == 'bar'
+        assert cache.get('foo') == 'bar'
+
+        # Values are served from process memory once they have been seen.
+        cache.delete('foo')
+        assert local_cache.get('foo') == 'bar'
+
+        local_cache.delete('foo')
+        assert local_cache.get('foo') is None
+
+    def test_reads_through_shared_cache(self):
+        local_cache = LocalCache(10, ttl=60)
+        cache.set('foo', 'bar', 60)
+        assert local_cache.get('foo') == 'bar'
+
+        cache.set('foo', 'baz', 60)
+        assert local_cache.get('foo') == 'bar'
+
+        local_cache.clear()
+        assert local_cache.get('foo') == 'baz'
+
+    def test_returns_copies(self):
+        local_cache = LocalCache(10, ttl=60)
+        value = Environment(name='prod')
+        local_cache.set('foo', value, 60)
+
+        value.name = 'staging'
+        first = local_cache.get('foo')
+        assert first.name == 'prod'
+
+        first.name = 'staging'
+        assert local_cache.get('foo').name == 'prod'
@@ -2,7 +2,7 @@
 
 from __future__ import absolute_import
 
-from sentry.constants import FILTER_MASK
+from sentry.constants import DEFAULT_SCRUBBED_FIELDS, FILTER_MASK
 from sentry.testutils import TestCase
 from sentry.utils.data_scrubber import SensitiveDataFilter
 
@@ -504,3 +504,39 @@ class SensitiveDataFilterTest(TestCase):
         proc.apply(data)
 
         assert data['breadcrumbs']['values'][0]['message'] == FILTER_MASK
+
+    def test_deeply_nested_extra(self):
+        extra = value = {}
+        for _ in range(5000):
+            value['nested'] = {}
+            value = value['nested']
+        value['password'] = 'hello'
+
+        data = {'extra': extra}
+        proc = SensitiveDataFilter()
+        proc.apply(data)
+
+        value = data['extra']
+        for _ in range(5000):
+            value = value['nested']
+        assert value == {'password': FILTER_MASK}
+
+    def test_recursive_extra(self):
+        extra = {'foo': 'bar'}
+        extra['self'] = extra
+
+        data = {'extra': extra}
+        proc = SensitiveDataFilter()
+        proc.apply(data)
+
+        assert data['extra'] == {'foo': 'bar', 'self': '<...>'}
+
+    def test_for_options(self):
+        proc = SensitiveDataFilter.for_options(fields=['Foo', 'bar'], exclude_fields=['baz'])
+        assert proc is SensitiveDataFilter.for_options(fields=['bar', 'foo'], exclude_fields=['BAZ'])
+        assert proc is not SensitiveDataFilter.for_options(fields=['bar'], exclude_fields=['baz'])
+        assert proc.fields == set(('foo', 'bar') + DEFAULT_SCRUBBED_FIELDS)
+
+        data = {'extra': {'a_foo': 'hello', 'baz': 'secret', 'other': 'a bar value'}}
+        proc.apply(data)
+        assert data['extra'] == {'a_foo': FILTER_MASK, 'baz': 'secret', 'other': FILTER_MASK}
@@ -1,8 +1,9 @@
 from __future__ import absolute_import
 
+import mock
 import pytest
 
-from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.datastructures import BidirectionalMapping, LRUCache
 
 
 def test_bidirectional_mapping():
@@ -38,3 +39,50 @@ def test_bidirectional_mapping():
     del value['c']
 
     assert len(value) == len(value.inverse()) == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    # 'b' is the least recently used item and is evicted
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+    cache.delete('a')
+    assert cache.get('a') is None
+    assert cache.get('a', 0) == 0
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.weight == 0
+
+
+def test_lru_cache_weigher():
+    cache = LRUCache(10, weigher=len)
+    cache.set('a', 'x' * 4)
+    cache.set('b', 'x' * 4)
+    cache.set('c', 'x' * 4)
+    assert 'a' not in cache
+    assert cache.weight == 8
+
+    # items heavier than the cache itself are not stored
+    cache.set('d', 'x' * 11)
+    assert 'd' not in cache
+    assert cache.weight == 8
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(10, ttl=60)
+    with mock.patch('sentry.utils.datastructures.time', return_value=0):
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+
+    with mock.patch('sentry.utils.datastructures.time', return_value=60):
+        assert cache.get('a') is None
+        assert cache.weight == 0
@@ -0,0 +1,12 @@
+from __future__ import absolute_import
+
+from sentry.utils.math import percentile
+
+
+def test_percentile():
+    assert percentile([], 50) == 0
+    assert percentile([1], 99) == 1
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 51
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100